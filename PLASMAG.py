@@ -2,6 +2,9 @@ import sys
 from PyQt6.QtWidgets import QApplication
 import json
 from src.view.gui import MainGUI
+from src.model.strategies.backend import set_backend
+from src.model.strategies.spice_simulation import DEFAULT_CACHE_DIRECTORY, DEFAULT_CACHE_DISK_BYTES, \
+    set_spice_cache_directory
 version = "1.2.2"
 
 if __name__ == "__main__":
@@ -10,6 +13,13 @@ if __name__ == "__main__":
     with open("config.json", "r") as f:
         config_dict = json.load(f)
 
+    if "backend" in config_dict:
+        set_backend(config_dict["backend"])
+
+    if "spice_cache_directory" in config_dict or "spice_cache_max_disk_bytes" in config_dict:
+        set_spice_cache_directory(config_dict.get("spice_cache_directory", DEFAULT_CACHE_DIRECTORY),
+                                  config_dict.get("spice_cache_max_disk_bytes", DEFAULT_CACHE_DISK_BYTES))
+
 
 
     window = MainGUI(config_dict=config_dict, version=version)
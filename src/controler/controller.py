@@ -5,7 +5,7 @@
 import numpy as np
 from src.controler.models.scm_model import STRATEGY_MAP
 from src.model.input_parameters import InputParameters
-from src.model.engine import CalculationEngine
+from src.model.engine import CalculationEngine, DEFAULT_CACHE_SIZE
 
 
 class CalculationController:
@@ -14,7 +14,7 @@ class CalculationController:
         of the engine. This controller is the main interface between the user interface and the calculation engine.
         It can be used to run the engine headless or to update the parameters and run the calculations.
     """
-    def __init__(self, params_dict=None, backups_count=3):
+    def __init__(self, params_dict=None, backups_count=3, cache_size=DEFAULT_CACHE_SIZE):
         """
                 Initializes the CalculationController with optional parameters. This controller
                 sets up the calculation engine.
@@ -24,9 +24,13 @@ class CalculationController:
                 Parameters:
                 - params_dict (dict, optional): A dictionary of parameters to initialize the
                 input parameters of the engine.
+                - backups_count (int): The number of saved results slots.
+                - cache_size (int): The memory budget of the result cache of the engine in bytes, 0 to disable
+                it (controllers evaluating new designs only : optimisations, sweeps, pool workers).
         """
-        self.engine = CalculationEngine(backups_count=backups_count)
+        self.engine = CalculationEngine(backups_count=backups_count, cache_size=cache_size)
         self.backup_count = backups_count
+        self.cache_size = cache_size
         self.is_data_ready = False
         self.params = None
         self.STRATEGY_MAP = STRATEGY_MAP
@@ -38,8 +42,18 @@ class CalculationController:
         if params_dict:
             self.update_parameters(params_dict)
 
-    def swap_strategy_map(self, strategy_map):
-        self.engine = CalculationEngine(backups_count=self.backup_count)
+    def swap_strategy_map(self, strategy_map, cache_size=None):
+        """
+                Rebuilds the engine with the default strategies of another strategy map.
+
+                Parameters:
+                - strategy_map (dict): The strategy map, see src/controler/models.
+                - cache_size (int, optional): The memory budget of the result cache of the new engine, the one of
+                the controller by default.
+        """
+        if cache_size is not None:
+            self.cache_size = cache_size
+        self.engine = CalculationEngine(backups_count=self.backup_count, cache_size=self.cache_size)
         self.STRATEGY_MAP = strategy_map
 
         for node_name, info in self.STRATEGY_MAP.items():
@@ -106,6 +120,41 @@ class CalculationController:
             return None
         return self.engine.current_output_data.results
 
+    def get_cache_statistics(self):
+        """
+                Retrieves the statistics (hit rate, memory usage) of the engine result cache.
+
+                Returns:
+                - dict or None: The cache statistics, None if the cache is disabled.
+        """
+        if self.engine.result_cache is None:
+            return None
+        return self.engine.result_cache.get_statistics()
+
+    def run_monte_carlo(self, attributes, nb_samples=1000, **options):
+        """
+               Monte-Carlo tolerance analysis around the current parameters : evaluates nb_samples designs drawn
+               from the tolerances declared in the parameters file with the model of this controller (strategy
+               map and node strategies) and returns the percentile envelopes of the outputs (NEMI, CLTF and
+               impedance by default). The current results are left unchanged.
+
+               Parameters:
+               - attributes (dict): The attributes of the parameters with their "tolerance", see load_parameters.
+               - nb_samples (int): The number of designs to evaluate.
+               - options: outputs, quantiles, chunk_size, n_workers, seed, nb_bins, see run_monte_carlo in
+               src/model/monte_carlo.py.
+
+               Returns:
+               - dict: The envelopes of each output, see run_monte_carlo.
+           """
+        if self.params is None:
+            raise ValueError("The parameters must be set before running a Monte-Carlo analysis")
+        # imported here : the Monte-Carlo analysis creates controllers of its own
+        from src.model.monte_carlo import run_monte_carlo
+        node_strategies = {node_name: node.get_strategy() for node_name, node in self.engine.nodes.items()}
+        return run_monte_carlo(dict(self.params), attributes, nb_samples, strategy_map=self.STRATEGY_MAP,
+                               node_strategies=node_strategies, **options)
+
     def get_old_results(self):
         """
                Retrieves the previous set of results from the calculation engine.
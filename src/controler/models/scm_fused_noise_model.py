@@ -0,0 +1,45 @@
+from src.controler.models.scm_model import STRATEGY_MAP as SCM_STRATEGY_MAP
+from src.model.strategies.strategy_lib.fused_noise import FusedNoiseModel, Fused_NSD_normalisation, Fused_CLTF, \
+    Fused_NSD_R_cr, Fused_NSD_R_Coil, Fused_NSD_e_en, Fused_NSD_e_in, Fused_NSD_Total, Fused_NEMI
+
+# The SCM model with the noise chain computed in a single pass by the noise_model node, the noise nodes only
+# expose its columns. Use it with CalculationController.swap_strategy_map.
+FUSED_NOISE_STRATEGY_MAP = dict(SCM_STRATEGY_MAP)
+FUSED_NOISE_STRATEGY_MAP.update({
+    "noise_model": {
+        "default": FusedNoiseModel,
+        "strategies": [FusedNoiseModel]
+    },
+    "NSD_normalisation": {
+        "default": Fused_NSD_normalisation,
+        "strategies": [Fused_NSD_normalisation]
+    },
+    "CLTF": {
+        "default": Fused_CLTF,
+        "strategies": [Fused_CLTF]
+    },
+    "PSD_R_cr": {
+        "default": Fused_NSD_R_cr,
+        "strategies": [Fused_NSD_R_cr]
+    },
+    "PSD_R_Coil": {
+        "default": Fused_NSD_R_Coil,
+        "strategies": [Fused_NSD_R_Coil]
+    },
+    "PSD_e_en": {
+        "default": Fused_NSD_e_en,
+        "strategies": [Fused_NSD_e_en]
+    },
+    "PSD_e_in": {
+        "default": Fused_NSD_e_in,
+        "strategies": [Fused_NSD_e_in]
+    },
+    "PSD_Total": {
+        "default": Fused_NSD_Total,
+        "strategies": [Fused_NSD_Total]
+    },
+    "NEMI": {
+        "default": Fused_NEMI,
+        "strategies": [Fused_NEMI]
+    },
+})
@@ -9,7 +9,7 @@ from src.model.strategies.strategy_lib.TF_ASIC import TF_ASIC_Stage_1_Strategy_l
 
 from src.model.strategies.strategy_lib.Nz import AnalyticalNzStrategy, AnalyticalNzDiaboloStrategy
 from src.model.strategies.strategy_lib.capacitance import AnalyticalCapacitanceStrategy
-from src.model.strategies.strategy_lib.frequency import FrequencyVectorStrategy
+from src.model.strategies.strategy_lib.frequency import FrequencyVectorStrategy, AdaptiveFrequencyVectorStrategy
 from src.model.strategies.strategy_lib.impedance import AnalyticalImpedanceStrategy
 from src.model.strategies.strategy_lib.inductance import AnalyticalInductanceStrategy
 from src.model.strategies.strategy_lib.lambda_strategy import LukoschusAnalyticalLambdaStrategy, \
@@ -25,7 +25,7 @@ STRATEGY_MAP = {
     },
     "frequency_vector": {
         "default": FrequencyVectorStrategy,
-        "strategies": [FrequencyVectorStrategy]
+        "strategies": [FrequencyVectorStrategy, AdaptiveFrequencyVectorStrategy]
     },
     "Nz": {
         "default": AnalyticalNzStrategy,
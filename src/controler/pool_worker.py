@@ -0,0 +1,59 @@
+"""
+ src/controler/pool_worker.py
+ PLASMAG 2024 Software, LPP
+"""
+from src.controler.controller import CalculationController
+
+# Calculation controller of a process pool worker and the fixed arguments of its tasks, see init_worker
+_worker_controller = None
+_worker_arguments = ()
+
+
+def create_worker_controller(strategy_map=None, node_strategies=None):
+    """
+    Builds a controller evaluating new designs only (sweeps, Monte-Carlo analyses, optimisations) : its engine has
+    no result cache, the designs it evaluates are seldom evaluated twice.
+
+    Parameters:
+        strategy_map (dict, optional): The strategy map of the model, the default SCM model if None.
+        node_strategies (dict, optional): The strategy of each node, by node name, to reproduce a modified model :
+            they replace the default strategies, and the nodes missing from it are deleted.
+
+    Returns:
+        CalculationController: The controller, without parameters.
+    """
+    controller = CalculationController(cache_size=0)
+    if strategy_map is not None:
+        controller.swap_strategy_map(strategy_map)
+    if node_strategies is not None:
+        for node_name in set(controller.engine.nodes) - set(node_strategies):
+            controller.engine.delete_node(node_name)
+        for node_name, strategy in node_strategies.items():
+            controller.engine.add_or_update_node(node_name, strategy)
+    return controller
+
+
+def init_worker(arguments=(), strategy_map=None, node_strategies=None, initializer=None):
+    """
+    Initializes a process pool worker : each worker holds its own calculation controller (see
+    create_worker_controller), built once and reused for all the tasks it runs (see call_in_worker).
+
+    Parameters:
+        arguments (tuple): The fixed arguments of the tasks, given after the controller.
+        strategy_map (dict, optional): The strategy map of the controller.
+        node_strategies (dict, optional): The strategies replacing the default ones, by node name.
+        initializer (callable, optional): Called first, to prepare the worker process.
+    """
+    global _worker_controller, _worker_arguments
+    if initializer is not None:
+        initializer()
+    _worker_controller = create_worker_controller(strategy_map, node_strategies)
+    _worker_arguments = tuple(arguments)
+
+
+def call_in_worker(function, *arguments, **keywords):
+    """
+    Runs a task in the current pool worker : function(controller, *fixed arguments, *arguments, **keywords), with
+    the controller and the fixed arguments of init_worker.
+    """
+    return function(_worker_controller, *_worker_arguments, *arguments, **keywords)
@@ -1,159 +1,55 @@
-import json
-
-import numpy as np
-
-from controler.controller import CalculationController
-from scipy.optimize import minimize
-
-def determine_resonance_freq(freq_vector, impedance_vector):
-    """
-    Function to determine the resonance frequency of the impedance curve
-    :param freq_vector: frequency vector
-    :param impedance_vector: impedance vector
-    :return: resonance frequency
-    """
-    # Find the index of the minimum impedance value
-    max = impedance_vector.argmax()
-    # Return the frequency at the index of the minimum impedance value
-    return freq_vector[max]
-
-def objective_function(x):
-    params = parameters_dict.copy()
-    params['len_coil'] = x[0]
-    params['diam_wire'] = x[1]
-    params['nb_spire'] = int(x[2])
-
-    controller.update_parameters(params)
-    results = controller.get_current_results()
-    impedance = results['impedance']["data"]
-    current_resonance_freq = determine_resonance_freq(impedance[:,0], impedance[:,1])
+"""
+ src/main_headless.py
+ PLASMAG 2024 Software, LPP
 
-    target_resonance_freq = 1993
-    return (current_resonance_freq - target_resonance_freq)**2
+Headless batch runs of the SCM model : evaluates the designs of a parameter sweep or of a design of experiments
+and streams the results to disk, without the GUI.
 
-if __name__ == "__main__":
-    # Ensure 'B' is included in the parameters for calculating 'Z'
-    # Initialize the calculation engine with a set of parameters, including all necessary inputs for the calculations
-    parameters_dict = {
-        'f_start': 1,
-        'f_stop': 1000000,
-        'nb_points_per_decade': 100,
-        # Add other parameters required by the strategies
-        'mu_insulator': 1,
-        'len_coil': 155 * 10 ** -3,
-        'kapthon_thick': 30 * 10 ** -6,
-        'insulator_thick': 10 * 10 ** -6,
-        'diam_out_mandrel': 3.2 * 10 ** -3,
-        'diam_wire': 90 * 10 ** -6,
-        'capa_tuning': 1 * 10 ** -12,
-        'capa_triwire': 150 * 10 ** -12,
-        'len_core': 20 * 10 ** -2,
-        'diam_core': 3.2 * 10 ** -3,
-        'mu_r': 100000,
-        'nb_spire': 10000,
-        'ray_spire': 5 * 10 ** -3,
-        'rho_wire': 1.6,
-        'coeff_expansion': 1,
-        'stage_1_cutting_freq': 20000,
-        'stage_2_cutting_freq': 20000,
-        'gain_1_linear': 1,
-        'gain_2_linear': 1,
-        'mutual_inductance': 0.1,
-        'feedback_resistance': 1000,
-        'temperature': 300,
-        "spice_resistance_test": 1000,
-        "Para_A": 1,
-        "Para_B": 1,
-        "e_en": 1,
-        "e_in": 1,
-        "Alpha": 1,
-    }
-
-    print(parameters_dict)
-
-    controller = CalculationController()
+Usage (from the root of the repository)::
 
-    controller.update_parameters(parameters_dict)
+    python -m src.main_headless data/default.json sweep.json -o results.h5 --workers 4 --chunk-size 256
 
-    results = controller.get_current_results()
-    impedance = results['impedance']["data"]
-
-    resonnance_freq = determine_resonance_freq(impedance[:,0], impedance[:,1])
+See src/model/sweep.py for the format of the sweep specification and src/model/result_writer.py for the
+format of the result file.
+"""
+import argparse
+import json
+import time
 
+from src.model.sweep import DEFAULT_OUTPUTS, generate_designs, load_parameters, run_sweep
 
-    # print(results)
-    # # plot impedance vs frequency
-    # import matplotlib.pyplot as plt
-    #
-    # #two subplots stacked vertically
-    # fig, axs = plt.subplots(1, 1, figsize=(10, 10))
-    # fig.suptitle('TF ASIC')
-    # axs.plot(impedance[:,0], impedance[:,1], label='Impedance')
-    #
-    # #plot vertical line freq resonnance
-    # axs.axvline(x=resonnance_freq, color='r', linestyle='--', label='Resonance frequency')
-    #
-    #
-    # axs.set_xscale('log')
-    # axs.set_yscale('log')
-    # axs.grid("both")
-    # axs.set_title('Linear scale')
-    # axs.set_xlabel('Frequency [Hz]')
-    # axs.set_ylabel('Gain linear')
-    # axs.legend()
-    #
-    # plt.show()
-    #
-    # print("Resonance frequency: ", resonnance_freq)
 
-    initial_guess = [
-        parameters_dict['len_coil'],  # Initial length of coil
-        parameters_dict['diam_wire'],  # Initial diameter of wire
-        parameters_dict['nb_spire'],  # Initial number of spires
-        parameters_dict['rho_wire'],
-        parameters_dict['diam_core'],
-        parameters_dict['len_core'],
-        parameters_dict['mu_r'],
-        parameters_dict['capa_tuning'],
-        parameters_dict['capa_triwire'],
-    ]
+def parse_arguments(arguments=None):
+    parser = argparse.ArgumentParser(description="Evaluates a parameter sweep or a design of experiments of the "
+                                                 "SCM model and streams the results to disk.")
+    parser.add_argument("parameters", help="parameters file, in the format of data/default.json")
+    parser.add_argument("sweep", help="sweep specification file (JSON), see src/model/sweep.py")
+    parser.add_argument("-o", "--output", required=True, help="result file (HDF5)")
+    parser.add_argument("--outputs", nargs="+", default=None,
+                        help=f"nodes to save (default: the 'outputs' of the sweep file, or {DEFAULT_OUTPUTS})")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes (default: 1)")
+    parser.add_argument("--chunk-size", type=int, default=256,
+                        help="number of designs evaluated at once (default: 256)")
+    return parser.parse_args(arguments)
 
-    # Bounds for each parameter
-    bounds = [
-        (1e-3, 200e-3),  # Bounds for len_coil
-        (10e-6, 300e-6),  # Bounds for diam_wire
-        (1000, 20000),  # Bounds for nb_spire
-        (1,10), # Bounds for rho_wire
-        (1e-3, 100e-3), # Bounds for diam_core
-        (1e-2, 200e-2), # Bounds for len_core
-        (1, 1000000), # Bounds for mu_r
-        (1e-12, 1000e-12), # Bounds for capa_tuning
-        (10e-12, 1000e-12), # Bounds for capa_triwire
 
+def main(arguments=None):
+    args = parse_arguments(arguments)
 
-    ]
+    parameters, attributes = load_parameters(args.parameters)
+    with open(args.sweep, "r") as file:
+        sweep = json.load(file)
 
-    # Perform the optimization
-    result = minimize(objective_function, initial_guess, bounds=bounds, method='Nelder-Mead')
-    optimized_params = result.x
+    designs = generate_designs(sweep, attributes)
+    outputs = args.outputs or sweep.get("outputs", DEFAULT_OUTPUTS)
+    nb_designs = len(next(iter(designs.values())))
+    print(f"Evaluating {nb_designs} designs ({sweep.get('method', 'grid')}) with {args.workers} worker(s)")
 
-    print("Optimized length of coil: ", optimized_params[0])
-    print("Optimized diameter of wire: ", optimized_params[1])
-    print("Optimized number of spires: ", int(optimized_params[2]))
-    print("Optimized resistance: ", optimized_params[3])
-    print("Optimized diameter of core: ", optimized_params[4])
-    print("Optimized length of core: ", optimized_params[5])
-    print("Optimized mu_r: ", optimized_params[6])
-    print("Optimized capa_tuning: ", optimized_params[7])
-    print("Optimized capa_triwire: ", optimized_params[8])
+    start = time.time()
+    nb_written = run_sweep(parameters, designs, args.output, outputs=outputs, chunk_size=args.chunk_size,
+                           n_workers=args.workers, sweep=sweep)
+    print(f"{nb_written} designs evaluated in {time.time() - start:.1f} s and written to {args.output}")
 
 
-    # Update the parameters with the optimized values to check the final resonance frequency
-    parameters_dict['len_coil'] = optimized_params[0]
-    parameters_dict['diam_wire'] = optimized_params[1]
-    parameters_dict['nb_spire'] = int(optimized_params[2])
-    controller.update_parameters(parameters_dict)
-    results = controller.get_current_results()
-    impedance = results['impedance']["data"]
-    final_resonance_freq = determine_resonance_freq(impedance[:, 0], impedance[:, 1])
-    print("Final resonance frequency: ", final_resonance_freq)
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
 import json
-import copy
+from concurrent.futures import FIRST_COMPLETED, wait
 
+import numpy as np
+
+from src.model.result_cache import ResultCache
 from src.model.results import CalculationResults
 from src.model.input_parameters import InputParameters
 from src.model.node import CalculationNode
 
+# Memory budget of the result cache of an engine, in bytes
+DEFAULT_CACHE_SIZE = 256 * 1024 ** 2
+
+
+class CalculationCancelled(Exception):
+    """Raised by CalculationEngine.run_calculations when its cancel_check asks to stop the calculations"""
+
 
 class CalculationEngine:
     """
@@ -20,18 +30,39 @@ class CalculationEngine:
         nodes (dict): A dictionary of calculation nodes, keyed by their unique names.
         old_output_data (CalculationResults, optional): The previous set of calculation results.
         current_output_data (CalculationResults): The current set of calculation results being populated.
+        execution_plan (list): The compiled, topologically sorted list of calculation steps. Each step is a tuple
+                               (node, slot, dependency_slots) where dependency_slots pairs every dependency name
+                               with the index of its value in `slot_values`.
+        leaf_slots (list): The (parameter name, slot) pairs of the leaf nodes, filled from the input parameters.
+        node_slots (dict): The slot of every node of the plan, keyed by node name.
+        slot_values (list): The flat storage of the node values used while executing the plan.
+        slot_keys (list): The content keys of the node values (see ResultCache), parallel to `slot_values`.
+        result_cache (ResultCache, optional): The memoisation store of the node results, None when disabled.
+        cancel_check (callable, optional): Called before each node calculation, the calculations are cancelled
+                                           (CalculationCancelled is raised) when it returns True.
+        executor (concurrent.futures.Executor, optional): Runs the calculations of the expensive nodes (see
+                                                          CalculationStrategy.expensive) in the background, None
+                                                          to run them with the other nodes.
+        pending_nodes (dict): The background calculations not merged yet, (future, cache key) pairs keyed by node
+                              name (see collect_background_results).
 
     Methods:
         get_or_create_node: Retrieves an existing calculation node or creates a new one if not present.
         add_or_update_node: Adds a new calculation node or updates an existing node's strategy.
         update_parameters: Updates the calculation parameters and archives the current results.
+        compile_execution_plan: Compiles the graph into a flat execution plan, once per topology change.
         run_calculations: Executes the calculations across all nodes in the graph.
+        collect_background_results: Merges the results of the background calculations that are done.
     """
 
-    def __init__(self, backups_count=3):
+    def __init__(self, backups_count=3, cache_size=DEFAULT_CACHE_SIZE):
         """
                Initializes the calculation engine, setting up internal storage for parameters, nodes,
                and calculation results.
+
+               Parameters:
+                   backups_count (int): The number of saved results slots.
+                   cache_size (int): The memory budget of the result cache in bytes, 0 to disable it.
        """
         self.current_parameters = None
         self.old_parameters = None
@@ -40,6 +71,15 @@ class CalculationEngine:
         self.current_output_data = CalculationResults()
         self.inverse_dependencies = {}
         self.build_inverse_dependencies()
+        self.execution_plan = []
+        self.leaf_slots = []
+        self.node_slots = {}
+        self.slot_values = []
+        self.slot_keys = []
+        self.result_cache = ResultCache(cache_size) if cache_size else None
+        self.cancel_check = None
+        self.executor = None
+        self.pending_nodes = {}
         self.first_run = True
 
         self.saved_data_results = [CalculationResults() for _ in range(backups_count)]
@@ -49,7 +89,7 @@ class CalculationEngine:
         """
         Saves the current calculation results to a specific index in the saved_data_results list.
         """
-        self.saved_data_results[index] = copy.deepcopy(self.current_output_data)
+        self.saved_data_results[index] = self.current_output_data.snapshot()
         print("Results saved to index: ", index)
 
     def clear_calculation_results(self):
@@ -261,6 +301,11 @@ class CalculationEngine:
         # Check for cycles in the graph after adding or updating a node
         self.check_for_cycles()
         self.build_inverse_dependencies()
+        self.compile_execution_plan()
+
+        # Results of the nodes depending on this one are no longer valid with the new strategy
+        for affected_node in self.get_downstream_nodes([node_name]):
+            self.nodes[affected_node].mark_for_recalculation()
 
     def delete_node(self, node_name):
         """
@@ -274,6 +319,7 @@ class CalculationEngine:
                 self.nodes.pop(node_name)
                 self.build_inverse_dependencies()
                 self.check_for_cycles()
+                self.compile_execution_plan()
 
                 # Delete from the current_output_data
                 self.current_output_data.results.pop(node_name)
@@ -282,6 +328,50 @@ class CalculationEngine:
         else:
             print(f"Node {node_name} not found in the calculation graph.")
 
+    def compile_execution_plan(self):
+        """
+        Compiles the calculation graph into a flat execution plan sorted in topological order.
+
+        Every node (including the leaf nodes holding the input parameters) gets a slot in `slot_values`, and each
+        step of the plan stores the slots of its dependencies. Executing the plan is then a single loop over the
+        steps, without recursion nor name lookups for each edge of the graph.
+
+        Note:
+            This method is called every time the graph topology changes (node added, updated or deleted). It
+            expects the graph to be acyclic, `check_for_cycles` must be called beforehand.
+        """
+        order = []
+        visited = set()
+
+        def visit(node_name):
+            if node_name in visited:
+                return
+            visited.add(node_name)
+            node = self.get_or_create_node(node_name)
+            if node.get_strategy():
+                for dep_name in node.get_strategy().get_dependencies():
+                    visit(dep_name)
+            order.append(node)
+
+        for node_name in list(self.nodes):
+            visit(node_name)
+
+        slots = {node.name: slot for slot, node in enumerate(order)}
+        self.node_slots = slots
+
+        self.execution_plan = []
+        self.leaf_slots = []
+        for slot, node in enumerate(order):
+            strategy = node.get_strategy()
+            if strategy:
+                dependency_slots = tuple((dep_name, slots[dep_name]) for dep_name in strategy.get_dependencies())
+                self.execution_plan.append((node, slot, dependency_slots))
+            else:
+                self.leaf_slots.append((node.name, slot))
+
+        self.slot_values = [None] * len(order)
+        self.slot_keys = [None] * len(order)
+
     def get_affected_nodes(self, changed_params : dict):
         """
         Identifies nodes affected by the changed parameters.
@@ -292,17 +382,7 @@ class CalculationEngine:
         Returns:
             Set[str]: A set of node names that are affected by the changed parameters.
         """
-        # Initialize an empty set to collect affected node names
-        affected_nodes = set()
-
-        # Loop through each changed parameter to find affected nodes
-        for changed_param in changed_params.keys():
-            if changed_param in self.inverse_dependencies:
-                # If the changed parameter has inverse dependencies, add all nodes
-                # that are dependent on this parameter to the affected nodes set
-                affected_nodes.update(self.inverse_dependencies[changed_param])
-
-        return affected_nodes
+        return set(self.get_downstream_nodes(changed_params.keys()))
 
     def get_nodes_affected_by_strategy_swap(self, node_name):
         """
@@ -315,18 +395,38 @@ class CalculationEngine:
             Set[str]: A set of node names affected by the strategy swap, including the node itself and all dependent nodes.
         """
         affected_nodes = {node_name}
-        # Add all nodes that are indirectly affected through inverse dependencies
-        to_check = [node_name]
-        while to_check:
-            current_node = to_check.pop(0)
-            if current_node in self.inverse_dependencies:
-                downstream_nodes = self.inverse_dependencies[current_node]
-                affected_nodes.update(downstream_nodes)
-                to_check.extend(downstream_nodes)
+        affected_nodes.update(self.get_downstream_nodes([node_name]))
 
         print(f"Affected nodes : {affected_nodes}")
         return affected_nodes
 
+    def get_downstream_nodes(self, names) -> list:
+        """
+        Identifies the transitive downstream closure of the given nodes or parameters.
+
+        A single pass over the execution plan is enough : since the plan is sorted in topological order, the
+        dependencies of a step are always flagged before the step itself is checked.
+
+        Parameters:
+            names (iterable): Names of the changed parameters or nodes. Unknown names are ignored.
+
+        Returns:
+            list[str]: The names of the calculation nodes depending (directly or not) on `names`, in topological
+                       order. A calculation node listed in `names` is part of its own closure.
+        """
+        dirty = [False] * len(self.slot_values)
+        for name in names:
+            slot = self.node_slots.get(name)
+            if slot is not None:
+                dirty[slot] = True
+
+        downstream_nodes = []
+        for node, slot, dependency_slots in self.execution_plan:
+            if dirty[slot] or any(dirty[dep_slot] for _, dep_slot in dependency_slots):
+                dirty[slot] = True
+                downstream_nodes.append(node.name)
+        return downstream_nodes
+
     def update_parameters(self, new_parameters: InputParameters):
         """
         Updates the parameters used for calculations and archives the current results.
@@ -344,14 +444,19 @@ class CalculationEngine:
         if self.current_parameters is not None:
             for param, new_value in new_parameters.data.items():
                 old_value = self.current_parameters.data.get(param, None)
-                if new_value != old_value:
+                if isinstance(new_value, np.ndarray) or isinstance(old_value, np.ndarray):
+                    # batch mode, see InputParameters
+                    changed = not np.array_equal(new_value, old_value)
+                else:
+                    changed = new_value != old_value
+                if changed:
                     changed_params[param] = {'old': old_value, 'new': new_value}
 
         self.old_parameters = self.current_parameters
         self.current_parameters = new_parameters
 
         if self.current_output_data.results:
-            self.old_output_data = copy.deepcopy(self.current_output_data)
+            self.old_output_data = self.current_output_data.snapshot()
 
         if changed_params:
             affected_nodes = self.get_affected_nodes(changed_params)
@@ -367,12 +472,147 @@ class CalculationEngine:
         Iterates over each node, performing calculations based on their strategies
         and the current set of parameters. Results are stored in `current_output_data`.
 
+        The compiled execution plan is walked in topological order : a node is calculated only if it is marked
+        for recalculation (or listed in `node_names`) or if it has no stored result yet, otherwise its stored
+        result is reused. Before calculating a node, the result cache is looked up with the key of its strategy and
+        dependencies : a result already calculated for the same inputs is reused instead.
+
+        If cancel_check is set, it is called before each node calculation and the calculations stop with
+        CalculationCancelled when it returns True (a newer calculation was requested by the GUI ...).
+
+        If executor is set, the expensive nodes (SPICE simulations ...) are submitted to it instead of being
+        calculated, and the nodes depending on them are skipped : they keep their previous result, and stay marked
+        for recalculation, until collect_background_results merges the background results. The rest of the graph
+        is calculated without waiting for them. A node already running in the background on the same inputs (same
+        cache key) isn't submitted again.
+
         THIS METHOD shouldn't be called directly, it should be called by update_parameters method
+
+        Parameters:
+            node_names (iterable, optional): Names of the nodes to recalculate in any case.
+        """
+        if node_names is not None:
+            for name in node_names:
+                self.nodes[name].mark_for_recalculation()
+
+        values = self.slot_values
+        keys = self.slot_keys
+        cache = self.result_cache
+        parameters = self.current_parameters.data
+        missing_parameters = set()
+        for name, slot in self.leaf_slots:
+            value = parameters.get(name)
+            if value is None:
+                missing_parameters.add(name)
+            values[slot] = value
+            if cache is not None:
+                keys[slot] = cache.parameter_key(name, value)
+
+        results = self.current_output_data.results
+        executor = self.executor
+        # the nodes running in the background and the nodes waiting for them
+        deferred = set(self.pending_nodes)
+        for node, slot, dependency_slots in self.execution_plan:
+            if cache is not None:
+                keys[slot] = cache.node_key(node.name, node.get_strategy(),
+                                            [keys[dep_slot] for _, dep_slot in dependency_slots])
+
+            if not node.needs_recalculation:
+                value = results.get(node.name)
+                if value is not None:
+                    values[slot] = value
+                    continue
+
+            if deferred and any(dep_name in deferred for dep_name, _ in dependency_slots):
+                deferred.add(node.name)
+                continue
+
+            if missing_parameters:
+                for dep_name, _ in dependency_slots:
+                    if dep_name in missing_parameters:
+                        raise ValueError(f"Calculation for {dep_name} node returned None")
+
+            if cache is not None:
+                value = cache.get(keys[slot])
+                if value is not None:
+                    self.cancel_background_calculation(node.name)
+                    deferred.discard(node.name)
+                    self.current_output_data.set_result(node.name, value)
+                    node.needs_recalculation = False
+                    values[slot] = value
+                    continue
+
+            if self.cancel_check is not None and self.cancel_check():
+                # the nodes not calculated yet stay marked for recalculation, the next run calculates them
+                raise CalculationCancelled(f"Calculations cancelled before the {node.name} node")
+
+            dependencies = {dep_name: values[dep_slot] for dep_name, dep_slot in dependency_slots}
+            if executor is not None and node.get_strategy().expensive:
+                key = keys[slot] if cache is not None else None
+                pending = self.pending_nodes.get(node.name)
+                if pending is None or key is None or pending[1] != key:
+                    self.cancel_background_calculation(node.name)
+                    future = executor.submit(node.get_strategy().calculate, dependencies, self.current_parameters)
+                    self.pending_nodes[node.name] = (future, key)
+                deferred.add(node.name)
+                continue
+            values[slot] = node.compute(dependencies)
+            if cache is not None:
+                cache.put(keys[slot], values[slot])
+
+    def cancel_background_calculation(self, node_name):
+        """
+        Forgets the background calculation of a node, if any, its result won't be merged.
+        """
+        pending = self.pending_nodes.pop(node_name, None)
+        if pending is not None:
+            pending[0].cancel()
+
+    def collect_background_results(self, timeout=None):
+        """
+        Merges the results of the background calculations that are done (see executor), waiting at most timeout
+        seconds for one of them, then calculates the nodes that were waiting for them.
+
+        Parameters:
+            timeout (float, optional): The maximum waiting time in seconds, None to wait for a result.
+
+        Returns:
+            list: The names of the merged nodes, empty if no background calculation was done.
+        """
+        if not self.pending_nodes:
+            return []
+        done, _ = wait([future for future, _ in self.pending_nodes.values()], timeout=timeout,
+                       return_when=FIRST_COMPLETED)
+        merged = []
+        for node_name, (future, key) in list(self.pending_nodes.items()):
+            if future not in done:
+                continue
+            del self.pending_nodes[node_name]
+            if node_name not in self.nodes or future.cancelled():
+                continue  # deleted since, or executor shut down : calculated by the next run
+            try:
+                value = future.result()
+            except Exception as e:
+                raise Exception(f"Error calculating {node_name}: {e}")
+            self.current_output_data.set_result(node_name, value)
+            self.nodes[node_name].needs_recalculation = False
+            if key is not None and self.result_cache is not None:
+                self.result_cache.put(key, value)
+            merged.append(node_name)
+            # the nodes depending on it were calculated, or submitted, with its previous result
+            for dependent_name in self.inverse_dependencies.get(node_name, ()):
+                if dependent_name in self.nodes:
+                    self.nodes[dependent_name].mark_for_recalculation()
+        if merged:
+            self.run_calculations()
+        return merged
+
+    def wait_background_results(self):
+        """
+        Waits for all the background calculations and merges their results.
         """
-        if node_names is None:
-            node_names = list(self.nodes.keys())
-        for name in node_names:
-            self.nodes[name].calculate()
+        while self.pending_nodes:
+            self.collect_background_results()
 
     def __repr__(self):
         """
@@ -396,7 +636,8 @@ class CalculationEngine:
         self.current_parameters = InputParameters(new_parameters)
 
         if self.current_output_data.results:
-            self.old_output_data = copy.deepcopy(self.current_output_data)
+            # The current results are replaced below, they don't need to be copied
+            self.old_output_data = self.current_output_data
 
         self.current_output_data = CalculationResults()
 
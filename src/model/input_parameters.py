@@ -2,6 +2,7 @@
  src/engine/input_parameters.py
  PLASMAG 2024 Software, LPP
 """
+import numpy as np
 
 
 class InputParameters:
@@ -17,11 +18,22 @@ class InputParameters:
                      the calculation process to provide necessary input values
                      for different calculation strategies and nodes.
 
+        batch_size (int, optional): The number of designs held by the parameters in batch mode,
+                                    None when every parameter is a scalar.
+
     Note:
         The `data` dictionary should contain all the necessary parameters
         required by the calculation strategies employed in the calculation
         engine. Missing parameters may result in calculation errors or
         incomplete results.
+
+    Batch mode:
+        Any parameter can be given as an array of shape (n_designs,) to evaluate
+        several designs at once. Such arrays are stored as (n_designs, 1) columns
+        so that they broadcast against the frequency vector : scalar nodes then
+        hold (n_designs, 1) values and vector nodes (n_designs, n_freq) tensors.
+        The frequency parameters (`f_start`, `f_stop`, `nb_points_per_decade`)
+        define the axis shared by all the designs and must stay scalar.
     """
 
     def __init__(self, data: dict):
@@ -29,4 +41,16 @@ class InputParameters:
         Initializes the InputParameters object with the provided data.
         :param data:
         """
+        self.batch_size = None
+        for value in data.values():
+            if isinstance(value, np.ndarray) and value.ndim == 1:
+                if self.batch_size is None:
+                    self.batch_size = len(value)
+                elif len(value) != self.batch_size:
+                    raise ValueError(f"Batch parameters must all have the same size, got {len(value)} "
+                                     f"and {self.batch_size}")
+
+        if self.batch_size is not None:
+            data = {key: value.reshape(-1, 1) if isinstance(value, np.ndarray) and value.ndim == 1 else value
+                    for key, value in data.items()}
         self.data = data
@@ -0,0 +1,335 @@
+"""
+ src/model/monte_carlo.py
+ PLASMAG 2024 Software, LPP
+"""
+from functools import partial
+from multiprocessing import Pool
+
+import numpy as np
+
+from src.controler.pool_worker import call_in_worker, create_worker_controller, init_worker
+from src.model.result_writer import extract_output
+from src.model.sweep import convert_to_target_unit, evaluate_designs
+
+DISTRIBUTIONS = ["normal", "uniform", "lognormal"]
+DEFAULT_OUTPUTS = ["NEMI", "CLTF", "impedance"]
+DEFAULT_QUANTILES = [0.01, 0.05, 0.5, 0.95, 0.99]
+
+
+def get_tolerances(attributes):
+    """
+    Returns the tolerances declared in a parameters file, next to the min and max of the parameters::
+
+        "diam_wire": {
+            "default": 90.0,
+            "min": 10,
+            "max": 300,
+            ...
+            "tolerance": {"distribution": "normal", "spread": 0.02, "relative": true}
+        }
+
+    The spread is the standard deviation of a normal distribution, the half width of a uniform distribution or
+    the standard deviation of the logarithm (natural) of a lognormal distribution. A relative spread is a
+    fraction of the nominal value, otherwise it is given in the input unit of the parameter. The spread of a
+    lognormal distribution is always relative. The samples of a tolerance with "integer": true (numbers of turns
+    like nb_spire) are rounded to the nearest integer.
+
+    Parameters:
+        attributes (dict): The attributes of the parameters, see load_parameters.
+
+    Returns:
+        dict: The tolerance of each parameter that declares one.
+    """
+    tolerances = {}
+    for name, attrs in attributes.items():
+        tolerance = attrs.get("tolerance")
+        if tolerance is None:
+            continue
+        if tolerance.get("distribution") not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution {tolerance.get('distribution')} for {name}, expected one of "
+                             f"{DISTRIBUTIONS}")
+        if tolerance.get("spread", -1) < 0:
+            raise ValueError(f"The tolerance of {name} must have a positive spread")
+        tolerances[name] = tolerance
+    return tolerances
+
+
+def sample_parameters(parameters, attributes, tolerances, nb_samples, rng):
+    """
+    Draws samples of the parameters around their nominal values, rounded for the integer ones and clipped to their
+    min and max.
+
+    Parameters:
+        parameters (dict): The nominal parameters (target units).
+        attributes (dict): The attributes of the parameters, see load_parameters.
+        tolerances (dict): The tolerances of the sampled parameters, see get_tolerances.
+        nb_samples (int): The number of samples.
+        rng (numpy.random.Generator): The random generator.
+
+    Returns:
+        dict: The values of each sampled parameter (target units), arrays of shape (nb_samples,).
+    """
+    samples = {}
+    for name, tolerance in tolerances.items():
+        nominal = parameters[name]
+        spread = tolerance["spread"]
+        if tolerance["distribution"] == "lognormal":
+            values = nominal * rng.lognormal(0, spread, nb_samples)
+        else:
+            if tolerance.get("relative", False):
+                spread = spread * abs(nominal)
+            else:
+                spread = convert_to_target_unit(spread, attributes[name])
+            if tolerance["distribution"] == "normal":
+                values = rng.normal(nominal, spread, nb_samples)
+            else:
+                values = rng.uniform(nominal - spread, nominal + spread, nb_samples)
+        if tolerance.get("integer", False):
+            values = np.rint(values)
+        low = convert_to_target_unit(float(attributes[name]["min"]), attributes[name])
+        high = convert_to_target_unit(float(attributes[name]["max"]), attributes[name])
+        samples[name] = np.clip(values, low, high)
+    return samples
+
+
+def generate_chunks(parameters, attributes, tolerances, nb_samples, chunk_size, seed=None):
+    """
+    Generates the samples of a Monte-Carlo analysis by chunks of chunk_size samples. Each chunk has its own
+    random stream derived from seed : the samples don't depend on the number of workers evaluating them.
+    """
+    nb_chunks = -(-nb_samples // chunk_size)
+    for index, seed_sequence in enumerate(np.random.SeedSequence(seed).spawn(nb_chunks)):
+        size = min(chunk_size, nb_samples - index * chunk_size)
+        yield sample_parameters(parameters, attributes, tolerances, size, np.random.default_rng(seed_sequence))
+
+
+class StreamingQuantiles:
+    """
+    Streaming estimator of the quantiles of a curve over an unbounded number of samples.
+
+    Each point of the curve (frequency, column) has a histogram of nb_bins bins, of log10 of the values when the
+    first samples are all positive (NEMI, gains, impedances ...). The memory used is nb_points * nb_bins counts,
+    whatever the number of samples. A sample outside the range of a histogram doubles this range, merging its
+    bins by pairs, so the range stays within twice the spread of the samples : a quantile is estimated within
+    one bin, that is at most about 1/256 of the spread of the samples with the default nb_bins.
+
+    Samples holding NaN or infinite values (failed designs) are ignored. In log scale, the values lower or equal to
+    0 are counted in the lowest bin.
+
+    Attributes:
+        nb_bins (int): The number of bins of the histograms, a power of 2.
+        log (bool): True if the histograms are built over log10 of the values.
+        counts (numpy.ndarray): The histograms, (nb_points, nb_bins).
+        low (numpy.ndarray): The lower edge of each histogram.
+        width (numpy.ndarray): The bin width of each histogram.
+        minimum (numpy.ndarray): The lowest value of each point.
+        maximum (numpy.ndarray): The highest value of each point.
+        nb_samples (int): The number of samples given to update.
+    """
+
+    def __init__(self, nb_bins=512):
+        if nb_bins < 2 or nb_bins & (nb_bins - 1):
+            raise ValueError("The number of bins must be a power of 2")
+        self.nb_bins = nb_bins
+        self.log = None
+        self.shape = None
+        self.counts = None
+        self.low = None
+        self.width = None
+        self.minimum = None
+        self.maximum = None
+        self.nb_samples = 0
+
+    def transform(self, values):
+        """Returns the values in the scale of the histograms, NaN for the values lower or equal to 0 in log scale"""
+        if not self.log:
+            return values
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.log10(np.where(values > 0, values, np.nan))
+
+    def initialize(self, values):
+        """Sets the range of the histograms from the first samples, (nb_samples, nb_points) values"""
+        self.log = bool(np.all(values > 0))
+        transformed = self.transform(values)
+        low = np.fmin.reduce(transformed, axis=0)
+        high = np.fmax.reduce(transformed, axis=0)
+        low = np.where(np.isfinite(low), low, 0.)
+        high = np.where(np.isfinite(high), high, low)
+        # a quarter of the spread on both sides, and a range even when all the first samples are equal
+        span = np.maximum((high - low) * 1.5, np.maximum(np.abs(low), 1.) * 1e-9)
+        self.low = (low + high - span) / 2
+        self.width = span / self.nb_bins
+        self.counts = np.zeros((values.shape[1], self.nb_bins), dtype=np.int64)
+        self.minimum = np.full(values.shape[1], np.inf)
+        self.maximum = np.full(values.shape[1], -np.inf)
+
+    def expand(self, transformed):
+        """Doubles the range of the histograms until they hold all the samples"""
+        lowest = np.fmin.reduce(transformed, axis=0)
+        highest = np.fmax.reduce(transformed, axis=0)
+        half = self.nb_bins // 2
+        while True:
+            below = lowest < self.low
+            above = highest >= self.low + self.width * self.nb_bins
+            if not (below.any() or above.any()):
+                return
+            expanded = below | above
+            merged = self.counts[expanded].reshape(-1, half, 2).sum(axis=2)
+            counts = np.zeros_like(merged, shape=(len(merged), self.nb_bins))
+            # the range grows downward for the points with samples below it, upward for the others
+            downward = below[expanded]
+            counts[downward, half:] = merged[downward]
+            counts[~downward, :half] = merged[~downward]
+            self.counts[expanded] = counts
+            self.low[below] -= self.width[below] * self.nb_bins
+            self.width[expanded] *= 2
+
+    def update(self, values):
+        """
+        Adds samples to the estimator.
+
+        Parameters:
+            values (numpy.ndarray): The samples, (nb_samples, ...) : one row per sample, any shape per sample.
+        """
+        values = np.asarray(values, dtype=float)
+        if self.shape is None:
+            self.shape = values.shape[1:]
+        values = values.reshape(len(values), -1)
+        valid = np.isfinite(values).all(axis=1)
+        values = values[valid]
+        if len(values) == 0:
+            return
+        if self.counts is None:
+            self.initialize(values)
+
+        transformed = self.transform(values)
+        self.expand(transformed)
+        index = np.floor((transformed - self.low) / self.width)
+        index = np.clip(np.nan_to_num(index, nan=0.), 0, self.nb_bins - 1).astype(np.int64)
+        index += np.arange(values.shape[1]) * self.nb_bins
+        self.counts += np.bincount(index.ravel(), minlength=self.counts.size).reshape(self.counts.shape)
+        self.minimum = np.minimum(self.minimum, values.min(axis=0))
+        self.maximum = np.maximum(self.maximum, values.max(axis=0))
+        self.nb_samples += len(values)
+
+    def get_quantiles(self, quantiles):
+        """
+        Estimates quantiles of the samples, interpolating linearly inside the bins.
+
+        Parameters:
+            quantiles (list): The quantiles, between 0 and 1.
+
+        Returns:
+            numpy.ndarray: The estimated quantiles, (len(quantiles), ...) with the shape of a sample.
+        """
+        if not self.nb_samples:
+            raise ValueError("No samples to estimate the quantiles from")
+        cumulative = np.cumsum(self.counts, axis=1)
+        rows = np.arange(len(self.counts))
+        estimates = []
+        for quantile in quantiles:
+            if not 0 <= quantile <= 1:
+                raise ValueError(f"Quantile {quantile} isn't between 0 and 1")
+            target = quantile * self.nb_samples
+            bins = np.minimum((cumulative < target).sum(axis=1), self.nb_bins - 1)
+            before = cumulative[rows, bins] - self.counts[rows, bins]
+            fraction = (target - before) / np.maximum(self.counts[rows, bins], 1)
+            estimate = self.low + (bins + np.clip(fraction, 0, 1)) * self.width
+            if self.log:
+                estimate = 10 ** estimate
+            estimates.append(np.clip(estimate, self.minimum, self.maximum))
+        return np.stack(estimates).reshape((len(quantiles),) + self.shape)
+
+
+def run_monte_carlo(parameters, attributes, nb_samples, outputs=None, quantiles=None, chunk_size=256, n_workers=1,
+                    seed=None, nb_bins=512, strategy_map=None, node_strategies=None):
+    """
+    Monte-Carlo tolerance analysis : evaluates nb_samples designs drawn from the tolerances of the parameters (see
+    get_tolerances) and returns the percentile envelopes of the outputs.
+
+    The samples are evaluated by chunks of chunk_size designs in the batch mode of the engine, by n_workers
+    processes, and each chunk is added to the quantile estimators (see StreamingQuantiles) as soon as it is
+    evaluated : the memory used doesn't depend on nb_samples.
+
+    Parameters:
+        parameters (dict): The nominal parameters, see load_parameters.
+        attributes (dict): The attributes of the parameters, with their tolerances.
+        nb_samples (int): The number of designs to evaluate.
+        outputs (list, optional): The names of the nodes to analyse, DEFAULT_OUTPUTS by default.
+        quantiles (list, optional): The quantiles of the envelopes, DEFAULT_QUANTILES by default.
+        chunk_size (int): The number of designs evaluated at once.
+        n_workers (int): The number of processes evaluating the chunks, 1 to run in the current process.
+        seed (int, optional): The seed of the random samples.
+        nb_bins (int): The number of bins of the quantile estimators.
+        strategy_map (dict, optional): The strategy map of the model, the default SCM model if None.
+        node_strategies (dict, optional): The strategy of each node, by node name, when the model was modified
+            (see create_worker_controller).
+
+    Returns:
+        dict: The results of the analysis::
+
+            {
+                "nb_samples": 10000,
+                "quantiles": [0.01, 0.05, 0.5, 0.95, 0.99],
+                "tolerances": {...},
+                "frequency_vector": (nb_points,),
+                "outputs": {
+                    "NEMI": {
+                        "labels": [...], "units": [...],
+                        "nominal": (nb_points, nb_columns),
+                        "data": (nb_quantiles, nb_points, nb_columns)
+                    }, ...
+                }
+            }
+    """
+    outputs = list(outputs or DEFAULT_OUTPUTS)
+    quantiles = list(quantiles or DEFAULT_QUANTILES)
+    if nb_samples < 1:
+        raise ValueError("The Monte-Carlo analysis needs at least one sample")
+    tolerances = get_tolerances(attributes)
+    if not tolerances:
+        raise ValueError("No parameter declares a tolerance")
+
+    controller = create_worker_controller(strategy_map, node_strategies)
+    nominal_results = controller.update_parameters(dict(parameters))
+    # copied before the controller evaluates the samples
+    nominal_outputs = {name: {"labels": nominal_results[name]["labels"],
+                              "units": nominal_results[name]["units"],
+                              "nominal": np.array(extract_output(nominal_results[name], 1)[0])} for name in outputs}
+    estimators = {name: StreamingQuantiles(nb_bins) for name in outputs}
+    chunks = generate_chunks(parameters, attributes, tolerances, nb_samples, chunk_size, seed)
+
+    pool = None
+    if n_workers > 1:
+        pool = Pool(n_workers, initializer=init_worker, initargs=((parameters,), strategy_map, node_strategies))
+        evaluated_chunks = pool.imap(partial(call_in_worker, evaluate_designs, outputs=outputs), chunks)
+    else:
+        evaluated_chunks = (evaluate_designs(controller, parameters, chunk, outputs) for chunk in chunks)
+
+    frequency_vector = None
+    try:
+        for index, arrays in enumerate(evaluated_chunks):
+            frequency_vector = arrays.pop("frequency_vector")
+            for name in outputs:
+                estimators[name].update(arrays[name])
+            print(f"Monte-Carlo chunk {index + 1}/{-(-nb_samples // chunk_size)} evaluated")
+    except BaseException:
+        # the chunks still queued are dropped instead of being evaluated before the error is raised
+        if pool is not None:
+            pool.terminate()
+        raise
+    else:
+        if pool is not None:
+            pool.close()
+    finally:
+        if pool is not None:
+            pool.join()
+
+    return {
+        "nb_samples": nb_samples,
+        "quantiles": quantiles,
+        "tolerances": tolerances,
+        "frequency_vector": frequency_vector,
+        "outputs": {name: dict(nominal_outputs[name], data=estimators[name].get_quantiles(quantiles))
+                    for name in outputs}
+    }
@@ -94,17 +94,7 @@ class CalculationNode:
 
         # Perform the calculation using the strategy, if available
         if self._strategy:
-            try:
-                calculated_value = self._strategy.calculate(dependencies, self.engine.current_parameters)
-            except KeyError as e:
-                raise KeyError(f"Error calculating {self.name}: missing dependency - {e}")
-            except Exception as e:
-                raise Exception(f"Error calculating {self.name}: {e}")
-
-            # Store the calculated value and mark this node as not needing recalculation
-            self.engine.current_output_data.set_result(self.name, calculated_value)
-            self.needs_recalculation = False
-            return calculated_value
+            return self.compute(dependencies)
         else:
             # For leaf nodes, directly use the parameter value if no strategy is provided
             calculated_value = self.engine.current_parameters.data.get(self.name)
@@ -114,6 +104,31 @@ class CalculationNode:
             self.needs_recalculation = False
             return calculated_value
 
+    def compute(self, dependencies: dict) -> any:
+        """
+        Runs this node's strategy on already resolved dependencies and stores the result.
+
+        Unlike `calculate`, this method neither checks the cached value nor resolves the dependencies itself : it
+        is used by the engine execution plan, which provides the dependency values in topological order.
+
+        Parameters:
+            dependencies (dict): The values of the dependencies required by the strategy, keyed by their names.
+
+        Returns:
+            The calculated value of this node. Can be a scalar or a tensor.
+        """
+        try:
+            calculated_value = self._strategy.calculate(dependencies, self.engine.current_parameters)
+        except KeyError as e:
+            raise KeyError(f"Error calculating {self.name}: missing dependency - {e}")
+        except Exception as e:
+            raise Exception(f"Error calculating {self.name}: {e}")
+
+        # Store the calculated value and mark this node as not needing recalculation
+        self.engine.current_output_data.set_result(self.name, calculated_value)
+        self.needs_recalculation = False
+        return calculated_value
+
     def set_strategy(self, strategy):
         """
         Assigns a new calculation strategy to this node and invalidates any previously calculated value,
@@ -2,15 +2,16 @@ from abc import ABC, abstractmethod
 
 import numpy as np
 
-from src.controler.controller import CalculationController
+from src.controler.pool_worker import create_worker_controller
+from src.model.optimisation.resonance_strategy_map import RESONANCE_STRATEGY_MAP
+from src.model.reference_curve import ReferenceCurve
 
 
 class BaseEvaluator(ABC):
     def __init__(self, parameters_dict, target, strategy_map):
         self.parameters_dict = parameters_dict
         self.target = target
-        self.controller = CalculationController()
-        self.controller.swap_strategy_map(strategy_map)
+        self.controller = create_worker_controller(strategy_map)
 
     @abstractmethod
     def evaluate(self, individual):
@@ -27,11 +28,14 @@ class BaseEvaluator(ABC):
 
 
 class ResonanceFrequencyEvaluator(BaseEvaluator):
+    """
+    Distance between the resonance frequency of the individual and the target one. The resonance frequency is
+    given by the "resonance_frequency" node (see AnalyticalResonanceFrequencyStrategy) : the impedance isn't
+    calculated over the frequency vector, and the resonance frequency isn't rounded to the frequency vector points.
+    """
 
-    def determine_resonance_freq(self, freq_vector, impedance_vector):
-        index = impedance_vector.argmax()
-        return freq_vector[index]
-
+    def __init__(self, parameters_dict, target, strategy_map=RESONANCE_STRATEGY_MAP):
+        super().__init__(parameters_dict, target, strategy_map)
 
     def evaluate(self, individual):
         len_coil, diam_wire, nb_spire, capa_tuning, capa_triwire = individual
@@ -48,14 +52,44 @@ class ResonanceFrequencyEvaluator(BaseEvaluator):
         try:
             self.controller.update_parameters(params)
             results = self.controller.get_current_results()
-            impedance = results['impedance']["data"]
-            resonance_freq = self.determine_resonance_freq(impedance[:, 0], impedance[:, 1])
+            resonance_freq = results['resonance_frequency']["data"]
+            if not np.isfinite(resonance_freq):
+                # invalid design (a wire wider than the coil ...), see AnalyticalCapacitanceStrategy
+                return 1e6,
             return abs(resonance_freq - self.target),
         except Exception as e:
             return 1e6,
 
 
 class NEMIEvaluator(BaseEvaluator):
+    """
+    Sum of the squared differences between the NEMI of the individual and a target NEMI.
+
+    The target is either an array of NEMI values over the frequency vector, or a measured curve (ReferenceCurve,
+    see src/model/reference_curve.py) : only the band of the frequency vector is read from the curve, it is
+    interpolated once per frequency vector.
+    """
+
+    def __init__(self, parameters_dict, target, strategy_map):
+        super().__init__(parameters_dict, target, strategy_map)
+        self.target_frequency_vector = None
+        self.target_values = None
+
+    def update_target(self, target):
+        super().update_target(target)
+        self.target_frequency_vector = None
+        self.target_values = None
+
+    def get_target_values(self, frequency_vector):
+        """Returns the target NEMI over frequency_vector"""
+        if not isinstance(self.target, ReferenceCurve):
+            return np.asarray(self.target)
+        if self.target_frequency_vector is None or not np.array_equal(self.target_frequency_vector,
+                                                                      frequency_vector):
+            self.target_frequency_vector = np.array(frequency_vector)
+            self.target_values = self.target.interpolate(frequency_vector)
+        return self.target_values
+
     def evaluate(self, individual):
         len_coil, diam_wire, nb_spire, capa_tuning, capa_triwire = individual
 
@@ -71,18 +105,21 @@ class NEMIEvaluator(BaseEvaluator):
         try:
             self.controller.update_parameters(params)
             results = self.controller.get_current_results()
-            nemi_values = results['nemi']["data"]
-            distances = [(nemi_value - target_value)**2 for nemi_value, target_value in zip(nemi_values, self.target)]
-            return sum(distances),
+            nemi = results['NEMI']["data"]
+            nemi_values = nemi[:, 1]
+            target_values = self.get_target_values(nemi[:, 0])
+            if not np.all(np.isfinite(nemi_values)):
+                return 1e6,
+            return float(np.sum((nemi_values - target_values) ** 2)),
         except Exception as e:
             return 1e6,
 
 
 class ResonanceFrequencyEvaluator2(BaseEvaluator):
-
-    def determine_resonance_freq(self, freq_vector, impedance_vector):
-        index = impedance_vector.argmax()
-        return freq_vector[index]
+    """
+    Two objectives : the distance between the resonance frequency and the target one, and the sum of the
+    impedance. The strategy map needs the "impedance" and "resonance_frequency" nodes, like IMPEDANCE_STRATEGY_MAP.
+    """
 
     def evaluate(self, individual):
         len_coil, diam_wire, nb_spire, capa_tuning, capa_triwire = individual
@@ -100,7 +137,10 @@ class ResonanceFrequencyEvaluator2(BaseEvaluator):
             self.controller.update_parameters(params)
             results = self.controller.get_current_results()
             impedance = results['impedance']["data"]
-            resonance_freq = self.determine_resonance_freq(impedance[:, 0], impedance[:, 1])
+            resonance_freq = results['resonance_frequency']["data"]
+            if not np.isfinite(resonance_freq) or not np.all(np.isfinite(impedance[:, 1])):
+                # invalid design (a wire wider than the coil ...), see AnalyticalCapacitanceStrategy
+                return 1e6, 1e6
             objective1 = abs(resonance_freq - self.target)
             objective2 = np.sum(np.abs(impedance[:, 1]))  # Example of a second objective
             return objective1, objective2
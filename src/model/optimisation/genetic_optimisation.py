@@ -1,11 +1,13 @@
 import random
+from multiprocessing import Pool
 
 import numpy as np
 from PyQt6.QtCore import pyqtSignal, QThread
 from deap import creator, base, tools, algorithms
 
-from src.model.optimisation.impedance_strategy_map import IMPEDANCE_STRATEGY_MAP
-from src.controler.controller import CalculationController
+from src.model.optimisation.resonance_strategy_map import RESONANCE_STRATEGY_MAP
+from src.model.result_writer import ResultWriter
+from src.controler.pool_worker import call_in_worker, create_worker_controller, init_worker
 
 parameters_dict = {
         # Initialize all required parameters
@@ -14,6 +16,7 @@ parameters_dict = {
         'nb_points_per_decade': 1000,
         # Add other necessary parameters
         'mu_insulator': 1,
+        'epsilon_insulator': 3.4,
         'kapton_thick': 30e-6,
         'insulator_thick': 10e-6,
         'diam_out_mandrel': 3.2e-3,
@@ -39,21 +42,81 @@ parameters_dict = {
         "capa_tuning": 1e-12,
         "capa_triwire": 10e-12
     }
+
+def create_deap_types():
+    """
+    Creates the DEAP fitness and individual types, if they don't exist yet.
+    Also called by the pool workers, which need these types to unpickle the individuals.
+    """
+    if not hasattr(creator, "FitnessMin"):
+        creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
+    if not hasattr(creator, "Individual"):
+        creator.create("Individual", list, fitness=creator.FitnessMin)
+
+
+def evaluate_resonance(controller, parameters, individual, target_resonance_freq):
+    """
+    Fitness of an individual : distance between its resonance frequency and the target one.
+
+    Parameters:
+        controller (CalculationController): The controller calculating the "resonance_frequency" node (see
+            RESONANCE_STRATEGY_MAP).
+        parameters (dict): The fixed parameters of the design.
+        individual (list): len_coil, diam_wire, nb_spire, capa_tuning and capa_triwire of the design.
+        target_resonance_freq (float): The resonance frequency to reach.
+
+    Returns:
+        tuple: The fitness of the individual (DEAP format), 1e6 for an invalid design.
+    """
+    len_coil, diam_wire, nb_spire, capa_tuning, capa_triwire = individual
+
+    params = parameters.copy()
+    params.update({
+        'len_coil': len_coil,
+        'diam_wire': diam_wire,
+        'nb_spire': int(nb_spire),
+        'capa_tuning': capa_tuning,
+        'capa_triwire': capa_triwire
+    })
+
+    try:
+        controller.update_parameters(params)
+        results = controller.get_current_results()
+        resonance_freq = results['resonance_frequency']["data"]
+        if not np.isfinite(resonance_freq):
+            # invalid design (a wire wider than the coil ...), see AnalyticalCapacitanceStrategy
+            return 1e6,
+        return abs(resonance_freq - target_resonance_freq),
+    except Exception as e:
+        return 1e6,
+
+
 class GeneticOptimisation(QThread):
+    """
+    Genetic optimisation of the coil design to reach a target resonance frequency.
+
+    With n_workers > 1, the fitness of each generation is evaluated on a process pool of n_workers processes,
+    each one holding its own calculation controller (see init_worker). Progress is emitted with
+    update_signal after each generation in both cases.
+
+    With a history_path, the individuals of each generation (generation, parameters and fitness) are appended to
+    this HDF5 file (see ResultWriter) during the run.
+    """
     update_signal = pyqtSignal(int, float, float) # generation, fitness average, best fitness
     finished_signal = pyqtSignal(dict, float)  # best parameters, resonance frequency
-    def __init__(self, population_size, generations, mutation_rate, parameters_dict, target_resonance_freq=2430):
+    def __init__(self, population_size, generations, mutation_rate, parameters_dict, target_resonance_freq=2430,
+                 n_workers=1, history_path=None):
         super().__init__()
         self.population_size = population_size
         self.generations = generations
         self.mutation_rate = mutation_rate
         self.target_resonance_freq = target_resonance_freq
+        self.n_workers = n_workers
+        self.history_path = history_path
         self.toolbox = None
 
-        self.controller = CalculationController()
-
         # TODO : change this line
-        self.controller.swap_strategy_map(IMPEDANCE_STRATEGY_MAP)
+        self.controller = create_worker_controller(RESONANCE_STRATEGY_MAP)
 
         self.parameters_dict = parameters_dict
 
@@ -61,35 +124,12 @@ class GeneticOptimisation(QThread):
 
     def update_target_resonance_freq(self, target_resonance_freq):
         self.target_resonance_freq = target_resonance_freq
-    def determine_resonance_freq(self, freq_vector, impedance_vector):
-        index = impedance_vector.argmax()
-        return freq_vector[index]
 
     def evaluate(self, individual):
-        len_coil, diam_wire, nb_spire, capa_tuning, capa_triwire = individual
-
-        params = parameters_dict.copy()
-        params.update({
-            'len_coil': len_coil,
-            'diam_wire': diam_wire,
-            'nb_spire': int(nb_spire),
-            'capa_tuning': capa_tuning,
-            'capa_triwire': capa_triwire
-        })
-
-        try:
-            self.controller.update_parameters(params)
-            results = self.controller.get_current_results()
-            impedance = results['impedance']["data"]
-            resonance_freq = self.determine_resonance_freq(impedance[:, 0], impedance[:, 1])
-            target_resonance_freq = self.target_resonance_freq
-            return abs(resonance_freq - target_resonance_freq),
-        except Exception as e:
-            return 1e6,
+        return evaluate_resonance(self.controller, self.parameters_dict, individual, self.target_resonance_freq)
 
     def init_creator(self):
-        creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
-        creator.create("Individual", list, fitness=creator.FitnessMin)
+        create_deap_types()
 
         toolbox = base.Toolbox()
         toolbox.register("attr_len_coil", random.uniform, 1e-3, 200e-3)
@@ -109,6 +149,16 @@ class GeneticOptimisation(QThread):
 
         self.toolbox = toolbox
 
+    @staticmethod
+    def record_generation(history, generation, population):
+        """Appends the individuals of a generation to the history file"""
+        individuals = np.array(population, dtype=float)
+        values = {name: individuals[:, index] for index, name in
+                  enumerate(["len_coil", "diam_wire", "nb_spire", "capa_tuning", "capa_triwire"])}
+        values["generation"] = np.full(len(population), generation, dtype=float)
+        values["fitness"] = np.array([individual.fitness.values[0] for individual in population])
+        history.append_arrays(values)
+
     def run_optimisation(self):
         population = self.toolbox.population(n=self.population_size)
         hof = tools.HallOfFame(5)  # Keep the top 5 individuals
@@ -116,14 +166,47 @@ class GeneticOptimisation(QThread):
         stats.register("min", min)
         stats.register("avg", np.mean)
 
-        for gen in range(self.generations):
-            population, logbook = algorithms.eaSimple(population, self.toolbox, cxpb=0.7, mutpb=self.mutation_rate,
-                                                      ngen=1, stats=stats, halloffame=hof, verbose=False)
+        pool = None
+        if self.n_workers > 1:
+            pool = Pool(self.n_workers, initializer=init_worker,
+                        initargs=((self.parameters_dict,), RESONANCE_STRATEGY_MAP, None, create_deap_types))
+            self.toolbox.register("map", pool.map)
+            self.toolbox.register("evaluate", call_in_worker, evaluate_resonance,
+                                  target_resonance_freq=self.target_resonance_freq)
+        else:
+            self.toolbox.register("map", map)
+            self.toolbox.register("evaluate", self.evaluate)
+
+        history = None
+        if self.history_path:
+            history = ResultWriter(self.history_path, chunk_size=self.population_size,
+                                   attributes={"parameters": self.parameters_dict,
+                                               "target_resonance_freq": self.target_resonance_freq})
 
-            avg_fitness = logbook.select("avg")[0]
-            best_fitness = logbook.select("min")[0][0]
-            print(best_fitness)
-            self.update_signal.emit(gen, avg_fitness, best_fitness)
+        try:
+            for gen in range(self.generations):
+                population, logbook = algorithms.eaSimple(population, self.toolbox, cxpb=0.7,
+                                                          mutpb=self.mutation_rate, ngen=1, stats=stats,
+                                                          halloffame=hof, verbose=False)
+
+                avg_fitness = logbook.select("avg")[0]
+                best_fitness = logbook.select("min")[0][0]
+                print(best_fitness)
+                if history is not None:
+                    self.record_generation(history, gen, population)
+                self.update_signal.emit(gen, avg_fitness, best_fitness)
+        except BaseException:
+            if pool is not None:
+                pool.terminate()
+            raise
+        else:
+            if pool is not None:
+                pool.close()
+        finally:
+            if history is not None:
+                history.close()
+            if pool is not None:
+                pool.join()
 
         best_params = hof[0]
         print("Best Parameters:", best_params)
@@ -132,10 +215,11 @@ class GeneticOptimisation(QThread):
         # Update parameters for the final evaluation
         final_params = {'len_coil': best_params[0], 'diam_wire': best_params[1], 'nb_spire': int(best_params[2]),
                         'capa_tuning': best_params[3], 'capa_triwire': best_params[4]}
-        self.controller.update_parameters(final_params)
+        params = self.parameters_dict.copy()
+        params.update(final_params)
+        self.controller.update_parameters(params)
         final_results = self.controller.get_current_results()
-        impedance = final_results['impedance']["data"]
-        final_resonance_freq = self.determine_resonance_freq(impedance[:, 0], impedance[:, 1])
+        final_resonance_freq = final_results['resonance_frequency']["data"]
         print("Final Resonance Frequency:", final_resonance_freq)
         print("Final parameters:", final_params)
         self.finished_signal.emit(final_params, final_resonance_freq)
@@ -69,8 +69,7 @@ class GeneticOptimisation(QThread):
                         'capa_tuning': best_params[3], 'capa_triwire': best_params[4]}
         self.evaluator.controller.update_parameters(final_params)
         final_results = self.evaluator.controller.get_current_results()
-        impedance = final_results['impedance']["data"]
-        final_resonance_freq = self.evaluator.determine_resonance_freq(impedance[:, 0], impedance[:, 1])
+        final_resonance_freq = final_results['resonance_frequency']["data"]
         print("Final Resonance Frequency:", final_resonance_freq)
         print("Final parameters:", final_params)
         self.finished_signal.emit(final_params, final_resonance_freq)
@@ -6,6 +6,7 @@ from src.model.strategies.strategy_lib.inductance import AnalyticalInductanceStr
 from src.model.strategies.strategy_lib.lambda_strategy import LukoschusAnalyticalLambdaStrategy
 from src.model.strategies.strategy_lib.mu_app import AnalyticalMu_appStrategy
 from src.model.strategies.strategy_lib.resistance import AnalyticalResistanceStrategy
+from src.model.strategies.strategy_lib.resonance import AnalyticalResonanceFrequencyStrategy
 
 IMPEDANCE_STRATEGY_MAP = {
     "resistance": {
@@ -41,5 +42,9 @@ IMPEDANCE_STRATEGY_MAP = {
     "impedance": {
         "default": AnalyticalImpedanceStrategy,
         "strategies": [AnalyticalImpedanceStrategy]
+    },
+    "resonance_frequency": {
+        "default": AnalyticalResonanceFrequencyStrategy,
+        "strategies": [AnalyticalResonanceFrequencyStrategy]
     }
 }
@@ -2,20 +2,39 @@ import numpy as np
 import random
 from PyQt6.QtCore import QThread, pyqtSignal
 
-from src.model.optimisation.impedance_strategy_map import IMPEDANCE_STRATEGY_MAP
-from src.controler.controller import CalculationController
+from src.model.optimisation.resonance_strategy_map import RESONANCE_STRATEGY_MAP
+from src.controler.pool_worker import create_worker_controller
+
+PARAMETER_NAMES = ['len_coil', 'diam_wire', 'nb_spire', 'diam_out_mandrel', 'len_core', 'diam_core']
+
 
 class ParticleSwarmOptimization(QThread):
+    """
+    Particle swarm optimisation of the coil design to reach a target resonance frequency.
+
+    The whole swarm is moved with array operations and evaluated in a single batched calculation per iteration
+    (see InputParameters batch mode), in chunks of at most max_batch_size particles. The fitness only needs the
+    "resonance_frequency" node (see RESONANCE_STRATEGY_MAP) : no curve over the frequency vector is calculated.
+    All the particles are updated synchronously from the bests of the previous iteration.
+
+    Topologies:
+        - "global": each particle is attracted by the best position of the whole swarm.
+        - "ring": each particle is attracted by the best position among its neighbourhood_size neighbours on
+          each side of a ring, which explores more before converging.
+    """
     update_signal = pyqtSignal(int, float, float)  # iteration, avg_fitness, best_fitness
     finished_signal = pyqtSignal(dict, float)  # best_parameters, final_resonance_freq
 
-    def __init__(self, parameters_dict, target_resonance_freq=3255, n_particles=10, n_iterations=10, bounds=None):
+    TOPOLOGIES = ["global", "ring"]
+
+    def __init__(self, parameters_dict, target_resonance_freq=3255, n_particles=10, n_iterations=10, bounds=None,
+                 topology="global", neighbourhood_size=1, max_batch_size=100):
         super().__init__()
         self.parameters_dict = parameters_dict
         self.target_resonance_freq = target_resonance_freq
         self.n_particles = n_particles
         self.n_iterations = n_iterations
-        self.bounds = [
+        self.bounds = bounds if bounds is not None else [
         (1e-3, 200e-3),  # len_coil
         (10e-6, 300e-6), # diam_wire
         (1000, 20000),   # nb_spire
@@ -23,9 +42,13 @@ class ParticleSwarmOptimization(QThread):
         (1e-2, 200e-2),  # len_core
         (1e-3, 100e-3),  # diam_core
     ]
-        self.controller = CalculationController()
+        if topology not in self.TOPOLOGIES:
+            raise ValueError(f"Unknown topology {topology}, expected one of {self.TOPOLOGIES}")
+        self.topology = topology
+        self.neighbourhood_size = neighbourhood_size
+        self.max_batch_size = max_batch_size
 
-        self.controller.swap_strategy_map(IMPEDANCE_STRATEGY_MAP)
+        self.controller = create_worker_controller(RESONANCE_STRATEGY_MAP)
 
 
         self.w = 0.5 # Inertia weight
@@ -33,93 +56,124 @@ class ParticleSwarmOptimization(QThread):
         self.c2 = 0.9 # Social constant
 
     def clamp_positions(self, positions, bounds):
-        for i in range(len(bounds)):
-            positions[:, i] = np.clip(positions[:, i], bounds[i][0], bounds[i][1])
+        lower_bounds, upper_bounds = np.array(bounds).T
+        np.clip(positions, lower_bounds, upper_bounds, out=positions)
 
     def reflect_positions(self, positions, bounds):
-        for i in range(len(bounds)):
-            lower_bound, upper_bound = bounds[i]
-            over_upper = positions[:, i] > upper_bound
-            under_lower = positions[:, i] < lower_bound
-            positions[over_upper, i] = 2 * upper_bound - positions[over_upper, i]
-            positions[under_lower, i] = 2 * lower_bound - positions[under_lower, i]
-            # Ensure they are within bounds after reflection
-            positions[:, i] = np.clip(positions[:, i], lower_bound, upper_bound)
+        lower_bounds, upper_bounds = np.array(bounds).T
+        positions[:] = np.where(positions > upper_bounds, 2 * upper_bounds - positions, positions)
+        positions[:] = np.where(positions < lower_bounds, 2 * lower_bounds - positions, positions)
+        # Ensure they are within bounds after reflection
+        np.clip(positions, lower_bounds, upper_bounds, out=positions)
 
     def run(self):
         self.run_optimization()
 
-    def determine_resonance_freq(self, freq_vector, impedance_vector):
-        index = impedance_vector.argmax()
-        return freq_vector[index]
-
     def evaluate(self, position):
         params = self.parameters_dict.copy()
-        params.update(dict(zip(['len_coil', 'diam_wire', 'nb_spire', 'diam_out_mandrel', 'len_core', 'diam_core'], position)))
+        params.update(dict(zip(PARAMETER_NAMES, position)))
 
         try:
             self.controller.update_parameters(params)
             results = self.controller.get_current_results()
-            impedance = results['impedance']["data"]
-            resonance_freq = self.determine_resonance_freq(impedance[:, 0], impedance[:, 1])
+            resonance_freq = results['resonance_frequency']["data"]
+            if not np.isfinite(resonance_freq):
+                # invalid design (a wire wider than the coil ...), see AnalyticalCapacitanceStrategy
+                return 1e6,
             return abs(resonance_freq - self.target_resonance_freq),
         except Exception as e:
             return 1e6,
 
+    def evaluate_swarm(self, positions):
+        """
+        Evaluates all the particles of the swarm, max_batch_size particles per batched calculation.
+
+        Parameters:
+            positions (np.ndarray): The particles positions, shape (n_particles, n_parameters).
+
+        Returns:
+            np.ndarray: The fitness of each particle, shape (n_particles,), 1e6 for an invalid design.
+        """
+        scores = np.empty(len(positions))
+        for start in range(0, len(positions), self.max_batch_size):
+            chunk = positions[start:start + self.max_batch_size]
+            params = self.parameters_dict.copy()
+            params.update(dict(zip(PARAMETER_NAMES, chunk.T.copy())))
+
+            try:
+                self.controller.update_parameters(params)
+                results = self.controller.get_current_results()
+                resonance_freq = np.reshape(results['resonance_frequency']["data"], -1)
+                # the invalid particles (NaN resonance frequency) get the penalty, like in evaluate
+                scores[start:start + len(chunk)] = np.where(np.isfinite(resonance_freq),
+                                                            abs(resonance_freq - self.target_resonance_freq), 1e6)
+            except Exception as e:
+                # Fall back on the particles one by one, so a single design raising an error gets the penalty
+                print(f"Batch evaluation failed ({e}), evaluating the particles one by one")
+                scores[start:start + len(chunk)] = [self.evaluate(position)[0] for position in chunk]
+        return scores
+
+    def neighbourhood_best_positions(self, personal_best_positions, personal_best_scores):
+        """
+        Returns the best position known by the neighbourhood of each particle, according to the topology.
+        """
+        if self.topology == "global":
+            return np.broadcast_to(personal_best_positions[np.argmin(personal_best_scores)],
+                                   personal_best_positions.shape)
+
+        n_particles = len(personal_best_scores)
+        offsets = np.arange(-self.neighbourhood_size, self.neighbourhood_size + 1)
+        neighbours = (np.arange(n_particles)[:, np.newaxis] + offsets) % n_particles
+        best_neighbours = neighbours[np.arange(n_particles), np.argmin(personal_best_scores[neighbours], axis=1)]
+        return personal_best_positions[best_neighbours]
+
     def update_target_resonance_freq(self, target_resonance_freq):
         self.target_resonance_freq = target_resonance_freq
 
-    def run(self):
-        positions = np.array([np.random.uniform(low, high, self.n_particles) for low, high in self.bounds]).T
+    def run_optimization(self):
+        lower_bounds, upper_bounds = np.array(self.bounds).T
+        positions = np.random.uniform(lower_bounds, upper_bounds, (self.n_particles, len(self.bounds)))
         velocities = np.zeros_like(positions)
         personal_best_positions = np.copy(positions)
-        personal_best_scores = np.array([self.evaluate(pos)[0] for pos in
-                                         positions])  # Make sure to take the first element of the tuple returned by evaluate
-
-        global_best_position = personal_best_positions[np.argmin(personal_best_scores)]
-        global_best_score = np.min(personal_best_scores)
+        personal_best_scores = self.evaluate_swarm(positions)
 
         for iteration in range(self.n_iterations):
             # Emit the start of a new iteration with the current best global score and average score
             avg_fitness = np.mean(personal_best_scores)
+            global_best_score = np.min(personal_best_scores)
             self.update_signal.emit(iteration, avg_fitness, global_best_score)
             print("Iteration:", iteration, "Average fitness:", avg_fitness, "Best fitness:", global_best_score)
-            for i in range(self.n_particles):
-                # Update velocity
-                r1, r2 = np.random.random(), np.random.random()
-                velocities[i] = self.w * velocities[i] + self.c1 * r1 * (
-                            personal_best_positions[i] - positions[i]) + self.c2 * r2 * (
-                                            global_best_position - positions[i])
-                # Update position
-                positions[i] += velocities[i]
-                self.clamp_positions(positions, self.bounds)
-                # Evaluate new position
-                current_score = self.evaluate(positions[i])[0]
-
-                # Update personal best
-                if current_score < personal_best_scores[i]:
-                    personal_best_positions[i] = positions[i]
-                    personal_bs = personal_best_scores[i] = current_score
-
-                # Update global best
-                if current_score < global_best_score:
-                    global_best_position = positions[i]
-                    global_best_score = current_score
+
+            # Update velocities and positions of the whole swarm
+            neighbourhood_best = self.neighbourhood_best_positions(personal_best_positions, personal_best_scores)
+            r1 = np.random.random((self.n_particles, 1))
+            r2 = np.random.random((self.n_particles, 1))
+            velocities = self.w * velocities + self.c1 * r1 * (personal_best_positions - positions) + \
+                self.c2 * r2 * (neighbourhood_best - positions)
+            positions += velocities
+            self.clamp_positions(positions, self.bounds)
+
+            # Evaluate new positions and update personal bests
+            current_scores = self.evaluate_swarm(positions)
+            improved = current_scores < personal_best_scores
+            personal_best_positions[improved] = positions[improved]
+            personal_best_scores[improved] = current_scores[improved]
+
+        global_best_position = personal_best_positions[np.argmin(personal_best_scores)]
 
         # Emit finished signal with best parameters and final results
-        best_params = dict(zip(['len_coil', 'diam_wire', 'nb_spire', 'diam_out_mandrel', 'len_core', 'diam_core'],
-                               global_best_position))
+        best_params = dict(zip(PARAMETER_NAMES, global_best_position))
 
         self.parameters_dict.update(best_params)
 
         self.controller.update_parameters(self.parameters_dict)
         final_results = self.controller.get_current_results()
-        impedance = final_results['impedance']["data"]
-        final_resonance_freq = self.determine_resonance_freq(impedance[:, 0], impedance[:, 1])
+        final_resonance_freq = final_results['resonance_frequency']["data"]
         self.finished_signal.emit(best_params, final_resonance_freq)
 
         print("Best Parameters:", best_params)
         print("Final Resonance Frequency:", final_resonance_freq)
+        return best_params, final_resonance_freq
 
 
 # PSO initialization example:
@@ -131,6 +185,7 @@ if __name__ == "__main__":
         'nb_points_per_decade': 1000,
         # Add other necessary parameters
         'mu_insulator': 1,
+        'epsilon_insulator': 3.4,
         'kapton_thick': 30e-6,
         'insulator_thick': 10e-6,
         'diam_out_mandrel': 3.2e-3,
@@ -165,4 +220,4 @@ if __name__ == "__main__":
         (1e-3, 100e-3),  # diam_core
     ]
     pso = ParticleSwarmOptimization(parameters_dict, bounds=bounds)
-    pso.run()
+    pso.run_optimization()
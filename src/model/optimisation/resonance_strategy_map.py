@@ -0,0 +1,41 @@
+from src.model.strategies.strategy_lib.Nz import AnalyticalNzStrategy
+from src.model.strategies.strategy_lib.capacitance import AnalyticalCapacitanceStrategy
+from src.model.strategies.strategy_lib.inductance import AnalyticalInductanceStrategy
+from src.model.strategies.strategy_lib.lambda_strategy import LukoschusAnalyticalLambdaStrategy
+from src.model.strategies.strategy_lib.mu_app import AnalyticalMu_appStrategy
+from src.model.strategies.strategy_lib.resistance import AnalyticalResistanceStrategy
+from src.model.strategies.strategy_lib.resonance import AnalyticalResonanceFrequencyStrategy
+
+# Same models as IMPEDANCE_STRATEGY_MAP, without the frequency vector : only scalar nodes are calculated
+RESONANCE_STRATEGY_MAP = {
+    "resistance": {
+        "default": AnalyticalResistanceStrategy,
+        "strategies": [AnalyticalResistanceStrategy]
+    },
+    "Nz": {
+        "default": AnalyticalNzStrategy,
+        "strategies": [AnalyticalNzStrategy]
+    },
+    "mu_app": {
+        "default": AnalyticalMu_appStrategy,
+        "strategies": [AnalyticalMu_appStrategy]
+    },
+
+     "lambda_param": {
+          "default": LukoschusAnalyticalLambdaStrategy,
+          "strategies": [LukoschusAnalyticalLambdaStrategy]
+     },
+
+    "inductance": {
+        "default": AnalyticalInductanceStrategy,
+        "strategies": [AnalyticalInductanceStrategy]
+    },
+    "capacitance": {
+        "default": AnalyticalCapacitanceStrategy,
+        "strategies": [AnalyticalCapacitanceStrategy]
+    },
+    "resonance_frequency": {
+        "default": AnalyticalResonanceFrequencyStrategy,
+        "strategies": [AnalyticalResonanceFrequencyStrategy]
+    }
+}
@@ -2,22 +2,38 @@ import random
 
 import numpy as np
 
-from src.controler.controller import CalculationController
+from src.controler.pool_worker import create_worker_controller
 from src.model.optimisation.genetic_optimisation import parameters_dict
-from src.model.optimisation.impedance_strategy_map import IMPEDANCE_STRATEGY_MAP
+from src.model.optimisation.resonance_strategy_map import RESONANCE_STRATEGY_MAP
 from PyQt6.QtCore import pyqtSignal, QThread
 
 class SimulatedAnnealing(QThread):
+    """
+    Simulated annealing of the coil design to reach a target resonance frequency.
+
+    With n_chains > 1, n_chains chains are advanced together : their neighbours are evaluated in a single batched
+    calculation per iteration (see InputParameters batch mode) and the best design found by any chain is kept.
+        - exchange_interval > 0 enables replica exchange : chain k runs at initial_temperature / temperature_ratio**k
+          and every exchange_interval iterations, neighbouring chains swap their states with the Metropolis
+          probability, so good designs found by hot chains get refined by cold ones.
+        - restart_interval > 0 restarts all the chains from the best design so far every restart_interval
+          iterations.
+    """
     update_signal = pyqtSignal(int, float, float)  # iteration, avg_fitness, best_fitness
     finished_signal = pyqtSignal(dict, float)  # best_parameters, final_resonance_freq
 
-    def __init__(self, parameters_dict, target_resonance_freq=3255, n_iterations=10, bounds=None, initial_temperature=1000, cooling_rate=0.003):
+    def __init__(self, parameters_dict, target_resonance_freq=3255, n_iterations=10, bounds=None, initial_temperature=1000, cooling_rate=0.003,
+                 n_chains=1, exchange_interval=0, temperature_ratio=2.0, restart_interval=0):
         super().__init__()
         self.parameters_dict = parameters_dict
         self.target_resonance_freq = target_resonance_freq
         self.n_iterations = n_iterations
         self.initial_temperature = initial_temperature
         self.cooling_rate = cooling_rate
+        self.n_chains = n_chains
+        self.exchange_interval = exchange_interval
+        self.temperature_ratio = temperature_ratio
+        self.restart_interval = restart_interval
         self.bounds = [
             (1e-3, 200e-3),  # len_coil
             (10e-6, 300e-6),  # diam_wire
@@ -29,9 +45,8 @@ class SimulatedAnnealing(QThread):
         #random init params with bounds
         self.initial_paramater = [random.uniform(b[0], b[1]) for b in self.bounds]
 
-        self.controller = CalculationController()
-
-        self.controller.swap_strategy_map(IMPEDANCE_STRATEGY_MAP)
+        # the cost only needs the resonance frequency, see AnalyticalResonanceFrequencyStrategy
+        self.controller = create_worker_controller(RESONANCE_STRATEGY_MAP)
 
     def update_target_resonance_freq(self, target_resonance_freq):
         self.target_resonance_freq = target_resonance_freq
@@ -39,16 +54,12 @@ class SimulatedAnnealing(QThread):
     def set_initial_parameters(self, initial_parameters):
         self.initial_paramater = initial_parameters
 
-    def determine_resonance_freq(self, freq_vector, impedance_vector):
-        index = impedance_vector.argmax()
-        return freq_vector[index]
-
     def evaluate(self, position):
         # Extract individual parameters from the position
         len_coil, diam_wire, nb_spire, diam_out_mandrel, len_core, diam_core = position
 
         # Update parameter dictionary with the current position's values
-        params = parameters_dict.copy()
+        params = self.parameters_dict.copy()
         params.update({
             'len_coil': len_coil,
             'diam_wire': diam_wire,
@@ -61,14 +72,68 @@ class SimulatedAnnealing(QThread):
         try:
             self.controller.update_parameters(params)
             results = self.controller.get_current_results()
-            impedance = results['impedance']["data"]
-            resonance_freq = self.determine_resonance_freq(impedance[:, 0], impedance[:, 1])
+            resonance_freq = results['resonance_frequency']["data"]
+            if not np.isfinite(resonance_freq):
+                # invalid design (a wire wider than the coil ...), see AnalyticalCapacitanceStrategy
+                return 1e6
             target_resonance_freq = self.target_resonance_freq
             return abs(resonance_freq - target_resonance_freq)
         except Exception as e:
             return 1e6
 
+    def evaluate_chains(self, positions):
+        """
+        Evaluates the positions of all the chains in a single batched calculation.
+
+        Parameters:
+            positions (np.ndarray): The chains positions, shape (n_chains, 6).
+
+        Returns:
+            np.ndarray: The cost of each chain, shape (n_chains,).
+        """
+        len_coil, diam_wire, nb_spire, diam_out_mandrel, len_core, diam_core = positions.T
+
+        params = self.parameters_dict.copy()
+        params.update({
+            'len_coil': len_coil.copy(),
+            'diam_wire': diam_wire.copy(),
+            'nb_spire': np.floor(nb_spire),
+            'diam_out_mandrel': diam_out_mandrel.copy(),
+            'len_core': len_core.copy(),
+            'diam_core': diam_core.copy()
+        })
+
+        try:
+            self.controller.update_parameters(params)
+            results = self.controller.get_current_results()
+            resonance_freq = np.reshape(results['resonance_frequency']["data"], -1)
+            # the invalid designs (NaN resonance frequency) get the penalty, like in evaluate
+            return np.where(np.isfinite(resonance_freq), abs(resonance_freq - self.target_resonance_freq), 1e6)
+        except Exception as e:
+            # Fall back on the chains one by one, so a single failing design gets the penalty
+            return np.array([self.evaluate(position) for position in positions])
+
+    def exchange_replicas(self, positions, costs, temperatures, offset):
+        """
+        Proposes a swap of states between the chains (offset, offset + 1), (offset + 2, offset + 3), ...
+        Each swap is accepted with probability min(1, exp((1/T_i - 1/T_j) * (E_i - E_j))).
+        """
+        i = np.arange(offset, len(positions) - 1, 2)
+        j = i + 1
+        with np.errstate(over='ignore'):
+            probability = np.exp((1 / temperatures[i] - 1 / temperatures[j]) * (costs[i] - costs[j]))
+        swap = probability > np.random.random(len(i))
+        i, j = i[swap], j[swap]
+        positions[i], positions[j] = positions[j].copy(), positions[i].copy()
+        costs[i], costs[j] = costs[j].copy(), costs[i].copy()
+
     def run(self):
+        if self.n_chains > 1:
+            self.run_multi_chain()
+        else:
+            self.run_single_chain()
+
+    def run_single_chain(self):
         print("Running Simulated Annealing, target resonance freq:", self.target_resonance_freq)
         current_params = np.array(self.initial_paramater)
         current_cost = self.evaluate(current_params)
@@ -107,11 +172,76 @@ class SimulatedAnnealing(QThread):
         # Update parameters for the final evaluation
         self.controller.update_parameters(self.parameters_dict)
         final_results = self.controller.get_current_results()
-        impedance = final_results['impedance']["data"]
-        final_resonance_freq = self.determine_resonance_freq(impedance[:, 0], impedance[:, 1])
+        final_resonance_freq = final_results['resonance_frequency']["data"]
+        print("Final Resonance Frequency:", final_resonance_freq)
+
+        self.finished_signal.emit(best_params, final_resonance_freq)
+
+    def run_multi_chain(self):
+        print(f"Running Simulated Annealing with {self.n_chains} chains, target resonance freq:",
+              self.target_resonance_freq)
+        lower_bounds, upper_bounds = np.array(self.bounds).T
+        step = (upper_bounds - lower_bounds) * 0.05
+
+        current_params = np.random.uniform(lower_bounds, upper_bounds, (self.n_chains, len(self.bounds)))
+        current_params[0] = self.initial_paramater
+        current_costs = self.evaluate_chains(current_params)
+        best_params = current_params[np.argmin(current_costs)].copy()
+        best_cost = current_costs.min()
+
+        if self.exchange_interval > 0:
+            temperatures = self.initial_temperature / self.temperature_ratio ** np.arange(self.n_chains)
+        else:
+            temperatures = np.full(self.n_chains, float(self.initial_temperature))
+
+        for i in range(self.n_iterations):
+            next_params = current_params + np.random.uniform(-0.1, 0.1, size=current_params.shape) * step
+            next_params = np.clip(next_params, lower_bounds, upper_bounds)
+            next_costs = self.evaluate_chains(next_params)
+
+            with np.errstate(over='ignore'):
+                accepted = (next_costs < current_costs) | \
+                    (np.exp((current_costs - next_costs) / temperatures) > np.random.random(self.n_chains))
+            current_params[accepted] = next_params[accepted]
+            current_costs[accepted] = next_costs[accepted]
+
+            if current_costs.min() < best_cost:
+                best_cost = current_costs.min()
+                best_params = current_params[np.argmin(current_costs)].copy()
+
+            temperatures *= self.cooling_rate
+
+            if self.exchange_interval > 0 and (i + 1) % self.exchange_interval == 0:
+                self.exchange_replicas(current_params, current_costs, temperatures,
+                                       (i // self.exchange_interval) % 2)
+
+            if self.restart_interval > 0 and (i + 1) % self.restart_interval == 0:
+                current_params[:] = best_params
+                current_costs[:] = best_cost
+
+            if i % 100 == 0:
+                print(f"Iteration {i}: Best cost = {best_cost}, Params = {best_params}")
+                self.update_signal.emit(i, float(np.mean(current_costs)), float(best_cost))
+
+        best_params = {
+            'len_coil': best_params[0],
+            'diam_wire': best_params[1],
+            'nb_spire': int(best_params[2]),
+            'diam_out_mandrel': best_params[3],
+            'len_core': best_params[4],
+            'diam_core': best_params[5]
+        }
+
+        self.parameters_dict.update(best_params)
+
+        # Update parameters for the final evaluation
+        self.controller.update_parameters(self.parameters_dict)
+        final_results = self.controller.get_current_results()
+        final_resonance_freq = final_results['resonance_frequency']["data"]
         print("Final Resonance Frequency:", final_resonance_freq)
 
         self.finished_signal.emit(best_params, final_resonance_freq)
+        return best_params, final_resonance_freq
 
 
 if __name__ == "__main__":
@@ -0,0 +1,245 @@
+"""
+ src/model/reference_curve.py
+ PLASMAG 2024 Software, LPP
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+STORE_EXTENSION = ".refcurve"
+# Number of bins per decade of the log-frequency index
+INDEX_POINTS_PER_DECADE = 100
+# Each decimation level keeps the min and the max of blocks of DECIMATION_FACTOR points of the previous level
+DECIMATION_FACTOR = 8
+# The coarsest decimation level holds less than MIN_LEVEL_SIZE points
+MIN_LEVEL_SIZE = 4096
+CSV_CHUNK_SIZE = 1_000_000
+
+
+def decimate_min_max(x, y, block_size):
+    """
+    Decimates a curve by keeping the minimum and the maximum of each block of block_size points, in their
+    original order : the peaks of the curve are kept at any resolution.
+
+    Returns:
+        tuple: The x and y arrays of the decimated curve, 2 points per block.
+    """
+    nb_blocks = -(-len(x) // block_size)
+    padding = nb_blocks * block_size - len(x)
+    if padding:
+        # the last block is completed with its last point, it doesn't change its min and max
+        x = np.concatenate((x, np.repeat(x[-1:], padding)))
+        y = np.concatenate((y, np.repeat(y[-1:], padding)))
+    x_blocks = x.reshape(nb_blocks, block_size)
+    y_blocks = y.reshape(nb_blocks, block_size)
+
+    index_min = y_blocks.argmin(axis=1)
+    index_max = y_blocks.argmax(axis=1)
+    first = np.minimum(index_min, index_max)
+    second = np.maximum(index_min, index_max)
+    rows = np.arange(nb_blocks)
+    x_decimated = np.stack((x_blocks[rows, first], x_blocks[rows, second]), axis=1).ravel()
+    y_decimated = np.stack((y_blocks[rows, first], y_blocks[rows, second]), axis=1).ravel()
+    return x_decimated, y_decimated
+
+
+def convert_curve(csv_path, store_path=None):
+    """
+    Converts a measured curve (CSV file, frequency in the first column and value in the second one, sorted by
+    increasing frequency) into a reference curve store, see ReferenceCurve.
+
+    The CSV file is read by chunks, the full resolution curve is never held in memory.
+
+    Parameters:
+        csv_path (str): The path of the CSV file.
+        store_path (str, optional): The path of the store directory, csv_path + ".refcurve" by default.
+
+    Returns:
+        ReferenceCurve: The converted curve.
+    """
+    store_path = store_path or csv_path + STORE_EXTENSION
+    os.makedirs(store_path, exist_ok=True)
+
+    # 1st pass : the CSV is appended to raw files, its length is unknown
+    raw_paths = [os.path.join(store_path, "x.tmp"), os.path.join(store_path, "y.tmp")]
+    nb_samples = 0
+    labels = None
+    last_x = -np.inf
+    with open(raw_paths[0], "wb") as x_file, open(raw_paths[1], "wb") as y_file:
+        for chunk in pd.read_csv(csv_path, usecols=[0, 1], chunksize=CSV_CHUNK_SIZE,
+                                 float_precision="round_trip"):
+            labels = labels or list(chunk.columns)
+            x = chunk.iloc[:, 0].to_numpy(dtype=np.float64)
+            y = chunk.iloc[:, 1].to_numpy(dtype=np.float64)
+            if np.any(np.diff(x) < 0) or x[0] < last_x:
+                raise ValueError(f"The frequencies of {csv_path} must be sorted in increasing order")
+            last_x = x[-1]
+            x.tofile(x_file)
+            y.tofile(y_file)
+            nb_samples += len(x)
+    if nb_samples == 0:
+        raise ValueError(f"{csv_path} holds no data")
+
+    # 2nd pass : full resolution level and its log-frequency index
+    raw_x = np.memmap(raw_paths[0], dtype=np.float64, mode="r", shape=(nb_samples,))
+    raw_y = np.memmap(raw_paths[1], dtype=np.float64, mode="r", shape=(nb_samples,))
+    level_0 = np.lib.format.open_memmap(os.path.join(store_path, "level_0.npy"), mode="w+", dtype=np.float64,
+                                        shape=(2, nb_samples))
+    first_level = ([], [])
+    block_size = DECIMATION_FACTOR * 2
+    chunk_size = CSV_CHUNK_SIZE - CSV_CHUNK_SIZE % block_size
+    for start in range(0, nb_samples, chunk_size):
+        x = np.array(raw_x[start:start + chunk_size])
+        y = np.array(raw_y[start:start + chunk_size])
+        level_0[0, start:start + len(x)] = x
+        level_0[1, start:start + len(x)] = y
+        x_decimated, y_decimated = decimate_min_max(x, y, block_size)
+        first_level[0].append(x_decimated)
+        first_level[1].append(y_decimated)
+    level_0.flush()
+    index_frequencies, index_offsets = build_log_index(level_0[0])
+    del level_0, raw_x, raw_y
+    for raw_path in raw_paths:
+        os.remove(raw_path)
+
+    # decimation levels, each one from the previous one. The block size of a level is the number of samples of
+    # the full resolution curve per sample of the level.
+    levels = [{"file": "level_0.npy", "block_size": 1}]
+    x, y = np.concatenate(first_level[0]), np.concatenate(first_level[1])
+    level_block_size = DECIMATION_FACTOR
+    while True:
+        file_name = f"level_{len(levels)}.npy"
+        np.save(os.path.join(store_path, file_name), np.stack((x, y)))
+        levels.append({"file": file_name, "block_size": level_block_size})
+        if len(x) < MIN_LEVEL_SIZE:
+            break
+        x, y = decimate_min_max(x, y, block_size)
+        level_block_size *= DECIMATION_FACTOR
+
+    metadata = {
+        "source": os.path.abspath(csv_path),
+        "labels": labels,
+        "nb_samples": nb_samples,
+        "levels": levels,
+        "index_frequencies": index_frequencies.tolist(),
+        "index_offsets": index_offsets.tolist()
+    }
+    with open(os.path.join(store_path, "meta.json"), "w") as file:
+        json.dump(metadata, file)
+    return ReferenceCurve(store_path)
+
+
+def build_log_index(x):
+    """
+    Builds the log-frequency index of a sorted frequency vector : offsets[k] is the index of the first frequency
+    greater or equal to frequencies[k], with INDEX_POINTS_PER_DECADE frequencies per decade.
+    """
+    positive = x[np.searchsorted(x, 0, side="right"):]
+    if len(positive) == 0:
+        return np.array([]), np.array([], dtype=np.int64)
+    first_edge = np.floor(np.log10(positive[0]) * INDEX_POINTS_PER_DECADE)
+    last_edge = np.ceil(np.log10(positive[-1]) * INDEX_POINTS_PER_DECADE)
+    frequencies = 10 ** (np.arange(first_edge, last_edge + 1) / INDEX_POINTS_PER_DECADE)
+    return frequencies, np.searchsorted(x, frequencies)
+
+
+def load_reference_curve(path):
+    """
+    Loads a reference curve : a store directory, or a CSV file converted once into a store next to it (reused
+    while it is more recent than the CSV file).
+    """
+    if os.path.isdir(path):
+        return ReferenceCurve(path)
+    store_path = path + STORE_EXTENSION
+    if (os.path.isfile(os.path.join(store_path, "meta.json"))
+            and os.path.getmtime(os.path.join(store_path, "meta.json")) >= os.path.getmtime(path)):
+        return ReferenceCurve(store_path)
+    return convert_curve(path, store_path)
+
+
+class ReferenceCurve:
+    """
+    Measured curve stored in a binary, memory-mapped format : only the samples of the requested frequency band
+    are read from the disk.
+
+    The store is a directory holding:
+        - level_0.npy : the full resolution curve, a (2, nb_samples) array (frequencies, values)
+        - level_1.npy, level_2.npy ... : decimated curves, each one keeping the min and the max of blocks of the
+          previous level (see decimate_min_max)
+        - meta.json : the labels, the levels and the log-frequency index of level_0 (see build_log_index)
+
+    Use convert_curve or load_reference_curve to create it from a CSV file.
+
+    Attributes:
+        path (str): The path of the store directory.
+        labels (list): The labels of the columns of the CSV file.
+        nb_samples (int): The number of samples of the full resolution curve.
+        levels (list): The memory-mapped levels, from the full resolution one to the coarsest one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r") as file:
+            metadata = json.load(file)
+        self.labels = metadata["labels"]
+        self.nb_samples = metadata["nb_samples"]
+        self.block_sizes = [level["block_size"] for level in metadata["levels"]]
+        self.levels = [np.load(os.path.join(path, level["file"]), mmap_mode="r") for level in metadata["levels"]]
+        self.index_frequencies = np.array(metadata["index_frequencies"])
+        self.index_offsets = np.array(metadata["index_offsets"], dtype=np.int64)
+
+    def find(self, frequency, level=0):
+        """Returns the index of the first sample of the level whose frequency is greater or equal to frequency"""
+        x = self.levels[level][0]
+        if level > 0 or len(self.index_frequencies) == 0:
+            return int(np.searchsorted(x, frequency))
+        # the index gives the bin of the frequency, only the samples of this bin are read
+        edge = np.searchsorted(self.index_frequencies, frequency, side="right") - 1
+        if edge < 0:
+            return int(np.searchsorted(x[:self.index_offsets[0]], frequency))
+        start = self.index_offsets[edge]
+        stop = self.index_offsets[edge + 1] if edge + 1 < len(self.index_offsets) else len(x)
+        return int(start + np.searchsorted(x[start:stop], frequency))
+
+    def get_band(self, f_min, f_max, max_points=None, enclosing=False):
+        """
+        Returns the samples of the curve between f_min and f_max, at the finest resolution holding at most
+        max_points samples in this band.
+
+        Parameters:
+            f_min (float): The lowest frequency of the band.
+            f_max (float): The highest frequency of the band.
+            max_points (int, optional): The maximum number of samples to return, full resolution if None.
+            enclosing (bool): Also returns the sample before f_min and the sample after f_max, if any.
+
+        Returns:
+            tuple: The frequencies and the values (in-memory arrays).
+        """
+        start = self.find(f_min)
+        stop = self.find(np.nextafter(f_max, np.inf))
+        level = 0
+        if max_points is not None:
+            # the band holds about (stop - start) / block_size samples of a level
+            while level < len(self.levels) - 1 and (stop - start) / self.block_sizes[level] > max_points:
+                level += 1
+            if level > 0:
+                start = self.find(f_min, level)
+                stop = self.find(np.nextafter(f_max, np.inf), level)
+        data = self.levels[level]
+        if enclosing:
+            start, stop = max(start - 1, 0), min(stop + 1, data.shape[1])
+        return np.array(data[0, start:stop]), np.array(data[1, start:stop])
+
+    def interpolate(self, frequency_vector):
+        """
+        Interpolates the curve at the given frequencies (linear interpolation in log-log scale), reading only the
+        band of frequency_vector at a resolution of about 16 samples per point of frequency_vector.
+        """
+        frequency_vector = np.asarray(frequency_vector)
+        x, y = self.get_band(frequency_vector.min(), frequency_vector.max(), max_points=16 * len(frequency_vector),
+                             enclosing=True)
+        if len(x) == 0:
+            raise ValueError("The reference curve has no sample in the frequency band")
+        return 10 ** np.interp(np.log10(frequency_vector), np.log10(x), np.log10(y))
@@ -0,0 +1,141 @@
+"""
+ src/model/result_cache.py
+ PLASMAG 2024 Software, LPP
+"""
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from src.model.results import ColumnarData
+
+
+class ResultCache:
+    """
+    A bounded, least recently used memoisation store for the node results of the calculation engine.
+
+    Results are content-addressed : the key of a parameter is a hash of its value, and the key of a node is a
+    hash of its strategy (class and attributes) and of the keys of its dependencies. Two calculations of a node
+    with the same strategy on the same inputs thus share the same key, whatever the path that lead to them
+    (slider moved back, design revisited by an optimiser, strategy swapped back ...), and building a key never
+    hashes the dependency arrays themselves.
+
+    Attributes:
+        max_bytes (int): The memory budget of the cache, the least recently used results are evicted beyond it.
+        current_bytes (int): The memory currently used by the cached results.
+        hits (int): The number of lookups that found a result.
+        misses (int): The number of lookups that didn't find a result.
+
+    Methods:
+        parameter_key: Builds the key of a parameter value.
+        node_key: Builds the key of a node result from its strategy and dependency keys.
+        get: Retrieves a cached result, or None.
+        put: Stores a result, evicting the least recently used ones if needed.
+        get_statistics: Returns the hit rate and memory usage of the cache.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def parameter_key(name, value) -> bytes:
+        """
+        Builds the key of a parameter from its name and value (scalar or batch array).
+        """
+        digest = hashlib.blake2b(name.encode(), digest_size=16)
+        if isinstance(value, np.ndarray):
+            digest.update(str((value.dtype, value.shape)).encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+        else:
+            digest.update(repr((type(value), value)).encode())
+        return digest.digest()
+
+    @staticmethod
+    def node_key(name, strategy, dependency_keys) -> bytes:
+        """
+        Builds the key of a node result from its strategy and the keys of its dependency values.
+        """
+        digest = hashlib.blake2b(name.encode(), digest_size=16)
+        strategy_class = type(strategy)
+        digest.update(f"{strategy_class.__module__}.{strategy_class.__qualname__}".encode())
+        digest.update(repr(sorted(vars(strategy).items())).encode())
+        for dependency_key in dependency_keys:
+            digest.update(dependency_key)
+        return digest.digest()
+
+    @staticmethod
+    def result_size(result) -> int:
+        """
+        Estimates the memory used by a result, counting its arrays.
+        """
+        if isinstance(result, dict):
+            return sum(ResultCache.result_size(value) for value in result.values())
+        if isinstance(result, (np.ndarray, ColumnarData)):
+            return result.nbytes
+        return 64
+
+    def get(self, key):
+        """
+        Retrieves the result stored for a key and marks it as recently used.
+
+        Returns:
+            The cached result, or None if the key isn't in the cache.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, result):
+        """
+        Stores a result, then evicts the least recently used results until the memory budget is respected.
+        Results larger than the whole budget aren't stored.
+        """
+        size = self.result_size(result)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.current_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (result, size)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+
+    def clear(self):
+        """
+        Removes all the cached results and resets the statistics.
+        """
+        self._entries.clear()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_statistics(self) -> dict:
+        """
+        Returns the hit rate and memory usage of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.,
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        statistics = self.get_statistics()
+        return (f"ResultCache({statistics['entries']} entries, {statistics['bytes'] / 1024 ** 2:.1f}/"
+                f"{statistics['max_bytes'] / 1024 ** 2:.1f} MB, hit rate {statistics['hit_rate']:.1%})")
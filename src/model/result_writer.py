@@ -0,0 +1,197 @@
+"""
+ src/model/result_writer.py
+ PLASMAG 2024 Software, LPP
+"""
+import json
+
+import h5py
+import numpy as np
+
+from src.model.results import ColumnarData
+
+
+def extract_output(result, nb_designs):
+    """
+    Converts the result of a node (single design or batch mode) into an array with one row per design.
+
+    Returns:
+        numpy.ndarray: (nb_designs,) for a scalar node, (nb_designs, nb_points, nb_columns) for a vector node
+        (without the frequency column).
+    """
+    data = result["data"]
+    if isinstance(data, ColumnarData):
+        columns = np.stack(np.broadcast_arrays(*data.columns), axis=-1)
+        return np.broadcast_to(columns, (nb_designs,) + columns.shape[-2:])
+    values = np.ravel(np.asarray(data, dtype=float))
+    return np.broadcast_to(values, (nb_designs,))
+
+
+class ResultWriter:
+    """
+    Streams evaluated designs to a chunked, compressed HDF5 file, one row per design.
+
+    The designs are buffered and written by blocks of chunk_size rows, the memory used doesn't depend on the
+    number of designs written. The file holds::
+
+        /values/<name>      (nb_designs,)                         parameters, fitness ... of each design
+        /outputs/<node>     (nb_designs,) or (nb_designs, nb_points, nb_columns), with the "labels" and
+                            "units" attributes of the node
+        /frequency_vector   (nb_points,)                          shared by all the designs
+
+    Use load_results to read it back (or any HDF5 reader).
+
+    Example::
+
+        with ResultWriter("results.h5", outputs=["impedance", "NEMI"]) as writer:
+            for params in designs:
+                results = controller.update_parameters(params)
+                writer.append({"nb_spire": params["nb_spire"]}, results)
+
+    Attributes:
+        path (str): The path of the HDF5 file.
+        outputs (list): The names of the nodes saved by append.
+        chunk_size (int): The number of designs buffered before writing, also the HDF5 chunk size.
+        nb_designs (int): The number of designs appended.
+    """
+
+    def __init__(self, path, outputs=None, chunk_size=256, compression="lzf", attributes=None):
+        """
+        Parameters:
+            path (str): The path of the HDF5 file, overwritten if it exists.
+            outputs (list, optional): The names of the nodes saved by append.
+            chunk_size (int): The number of designs buffered before writing.
+            compression (str, optional): The HDF5 compression filter : "lzf" (fast, read by h5py), "gzip" (slower,
+                read by any HDF5 reader) or None.
+            attributes (dict, optional): Description of the results, saved as JSON in the file attributes.
+        """
+        self.path = path
+        self.outputs = list(outputs or [])
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.nb_designs = 0
+
+        self.file = h5py.File(path, "w")
+        self.file.create_group("values")
+        self.file.create_group("outputs")
+        for key, value in (attributes or {}).items():
+            self.file.attrs[key] = json.dumps(value)
+
+        self.buffer = []
+        self.nb_buffered = 0
+        self.labels = {}
+
+    def append(self, values, results=None):
+        """
+        Appends a design, or a batch of designs evaluated in batch mode.
+
+        Parameters:
+            values (dict): Scalar values of the design (parameters, fitness ...), or arrays of shape (nb_designs,)
+                for a batch.
+            results (dict, optional): The results of the controller, required if outputs were given.
+        """
+        values = {name: np.atleast_1d(np.asarray(value, dtype=float)) for name, value in values.items()}
+        nb_designs = len(next(iter(values.values()))) if values else 1
+
+        outputs = {}
+        frequency_vector = None
+        for name in self.outputs:
+            outputs[name] = extract_output(results[name], nb_designs)
+            self.set_labels(name, results[name]["labels"], results[name]["units"])
+            if isinstance(results[name]["data"], ColumnarData):
+                frequency_vector = results["frequency_vector"]["data"]
+        self.append_arrays(values, outputs, frequency_vector)
+
+    def append_arrays(self, values, outputs=None, frequency_vector=None):
+        """
+        Appends designs given as arrays with one row per design (see extract_output).
+
+        Parameters:
+            values (dict): The values of the designs, arrays of shape (nb_designs,).
+            outputs (dict, optional): The outputs of the designs, arrays of shape (nb_designs, ...).
+            frequency_vector (numpy.ndarray, optional): The frequency vector of the vector outputs. It must be the
+                same for all the designs of the file.
+        """
+        if frequency_vector is not None:
+            self.write_frequency_vector(frequency_vector)
+
+        rows = {("values", name): np.asarray(value, dtype=float) for name, value in values.items()}
+        rows.update({("outputs", name): np.asarray(value) for name, value in (outputs or {}).items()})
+        self.buffer.append(rows)
+        self.nb_buffered += len(next(iter(rows.values())))
+        if self.nb_buffered >= self.chunk_size:
+            self.flush()
+
+    def set_labels(self, name, labels, units):
+        """Records the labels and units of an output, written with its dataset"""
+        self.labels[name] = (labels, units)
+
+    def write_frequency_vector(self, frequency_vector):
+        frequency_vector = np.asarray(frequency_vector)
+        if "frequency_vector" not in self.file:
+            self.file.create_dataset("frequency_vector", data=frequency_vector)
+        elif not np.array_equal(self.file["frequency_vector"][()], frequency_vector):
+            raise ValueError("All the designs of a result file must share the same frequency vector")
+
+    def flush(self):
+        """Writes the buffered designs to the file"""
+        if not self.buffer:
+            return
+
+        for key in self.buffer[0]:
+            group, name = key
+            block = np.concatenate([rows[key] for rows in self.buffer])
+            if name not in self.file[group]:
+                dataset = self.file[group].create_dataset(
+                    name, shape=(0,) + block.shape[1:], maxshape=(None,) + block.shape[1:], dtype=block.dtype,
+                    chunks=(self.chunk_size,) + block.shape[1:], compression=self.compression,
+                    shuffle=self.compression is not None)
+                if group == "outputs" and name in self.labels:
+                    dataset.attrs["labels"], dataset.attrs["units"] = self.labels[name]
+            dataset = self.file[group][name]
+            dataset.resize(self.nb_designs + len(block), axis=0)
+            dataset[self.nb_designs:] = block
+
+        self.nb_designs += self.nb_buffered
+        self.buffer = []
+        self.nb_buffered = 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_results(path, names=None, rows=slice(None)):
+    """
+    Reads a result file written by ResultWriter. Only the requested outputs and rows are read from the disk.
+
+    Parameters:
+        path (str): The path of the HDF5 file.
+        names (list, optional): The names of the outputs to read, all of them by default.
+        rows (slice or array, optional): The designs to read (increasing indices), all of them by default.
+
+    Returns:
+        dict: {"values": {name: array}, "outputs": {node: {"data": array, "labels": list, "units": list}},
+        "frequency_vector": array or None, "attributes": dict}
+    """
+    with h5py.File(path, "r") as file:
+        outputs = {}
+        for name in (names if names is not None else file["outputs"]):
+            dataset = file["outputs"][name]
+            outputs[name] = {
+                "data": dataset[rows],
+                "labels": [str(label) for label in dataset.attrs.get("labels", [])],
+                "units": [str(unit) for unit in dataset.attrs.get("units", [])]
+            }
+        return {
+            "values": {name: dataset[rows] for name, dataset in file["values"].items()},
+            "outputs": outputs,
+            "frequency_vector": file["frequency_vector"][()] if "frequency_vector" in file else None,
+            "attributes": {key: json.loads(value) for key, value in file.attrs.items()}
+        }
@@ -2,6 +2,94 @@
  src/engine/results.py
  PLASMAG 2024 Software, LPP
 """
+import numpy as np
+
+
+class ColumnarData:
+    """
+    The "data" of a frequency dependent result : the frequency axis shared with the frequency_vector node (not
+    copied) and one contiguous array per column, named by the "labels" of the result (the first label names the
+    axis).
+
+    It can still be read as the (n_freq, n_columns + 1) matrix stacking the frequency vector and the columns
+    (or (n_designs, n_freq, n_columns + 1) in batch mode, see InputParameters) : `data[..., 0]` is the axis and
+    `data[..., k]` the k-th column, without any copy, and `numpy.asarray(data)` builds the full matrix.
+
+    Attributes:
+        axis (np.ndarray): The frequency vector.
+        columns (tuple): The columns, contiguous arrays of shape `column_shape`.
+        column_shape (tuple): The shape of a column, (n_freq,) or (n_designs, n_freq) in batch mode.
+
+    Methods:
+        column: Returns a column by index, 0 being the axis.
+        to_matrix: Builds the matrix stacking the axis and the columns.
+    """
+
+    def __init__(self, axis, columns):
+        self.axis = axis
+        self.column_shape = np.broadcast_shapes(np.shape(axis), *(np.shape(column) for column in columns))
+        self.columns = tuple(
+            np.ascontiguousarray(column) if np.shape(column) == self.column_shape
+            else np.ascontiguousarray(np.broadcast_to(column, self.column_shape))
+            for column in columns)
+
+    def column(self, index) -> np.ndarray:
+        """
+        Returns the column at the given index of the matrix : 0 for the axis (broadcast in batch mode), k for the
+        k-th column.
+        """
+        index = index % (len(self.columns) + 1)
+        if index == 0:
+            return np.broadcast_to(self.axis, self.column_shape)
+        return self.columns[index - 1]
+
+    def to_matrix(self) -> np.ndarray:
+        """
+        Builds the matrix stacking the axis and the columns along the last axis.
+        """
+        return np.stack(np.broadcast_arrays(self.axis, *self.columns), axis=-1)
+
+    @property
+    def shape(self):
+        return self.column_shape + (len(self.columns) + 1,)
+
+    @property
+    def ndim(self):
+        return len(self.column_shape) + 1
+
+    @property
+    def dtype(self):
+        return np.result_type(self.axis, *self.columns)
+
+    @property
+    def nbytes(self):
+        """
+        The memory used by the columns, the shared axis isn't counted.
+        """
+        return sum(column.nbytes for column in self.columns)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple) and key and isinstance(key[-1], (int, np.integer)):
+            return self.column(key[-1])[key[:-1]]
+        if isinstance(key, (int, np.integer)) and len(self.column_shape) > 1:
+            # batch mode : the result of a single design
+            return ColumnarData(self.axis, [column[key] for column in self.columns])
+        return self.to_matrix()[key]
+
+    def __array__(self, dtype=None, copy=None):
+        matrix = self.to_matrix()
+        return matrix if dtype is None else matrix.astype(dtype)
+
+    def __len__(self):
+        return self.column_shape[0]
+
+    def __iter__(self):
+        return iter(self.to_matrix())
+
+    def __repr__(self):
+        return f"ColumnarData(shape={self.shape})"
+
+
 class CalculationResults:
     """
     This class acts as a centralized repository for storing the outcomes of various
@@ -17,10 +105,16 @@ class CalculationResults:
     Methods:
         set_result: Stores or updates a calculation result in the repository.
         get_result: Retrieves a calculation result by its name.
+        snapshot: Returns a copy of the repository sharing the stored results.
 
     Note:
         If a result for the given key does not exist, `get_result` returns None.
         This behavior allows checking the existence of results without raising exceptions.
+
+    Note:
+        Stored results are immutable : their arrays are made read-only, and a result is updated by replacing it
+        with `set_result`, never in place. Snapshots (old results, saved results) can thus share the results with
+        the current repository instead of copying the arrays.
     """
 
     def __init__(self):
@@ -34,8 +128,27 @@ class CalculationResults:
             key (str): The name of the calculation result to store or update.
             value: The outcome of the calculation to be stored.
         """
+        if isinstance(value, dict):
+            for item in value.values():
+                if isinstance(item, np.ndarray):
+                    item.flags.writeable = False
+                elif isinstance(item, ColumnarData):
+                    for column in item.columns:
+                        column.flags.writeable = False
         self.results[key] = value
 
+    def snapshot(self) -> "CalculationResults":
+        """
+        Returns a copy of the repository : later `set_result` calls on either repository don't affect the other
+        one, while the results themselves are shared, so it costs one reference per node.
+
+        Returns:
+            CalculationResults: The snapshot of the results.
+        """
+        snapshot = CalculationResults()
+        snapshot.results = dict(self.results)
+        return snapshot
+
     def get_result(self, key: str) -> any:
         """
         Retrieves the result of a calculation by its name.
@@ -1,2 +1,3 @@
 # src/model/strategies/__init__.py
-from .generic_strategy import CalculationStrategy
\ No newline at end of file
+from src.model.results import ColumnarData
+from .generic_strategy import CalculationStrategy, stack_columns
@@ -0,0 +1,65 @@
+import numpy as np
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+# Names usable in the expressions, in addition to the variables given to evaluate
+NUMPY_NAMESPACE = {"__builtins__": {}, "sqrt": np.sqrt, "abs": np.abs, "pi": np.pi}
+
+AVAILABLE_BACKENDS = ["numpy"] + (["numexpr"] if numexpr is not None else [])
+
+_backend = "numpy"
+_compiled_expressions = {}
+
+
+def get_backend():
+    """Returns the name of the backend used by evaluate"""
+    return _backend
+
+
+def set_backend(name):
+    """
+    Selects the backend used by evaluate to compute the strategies arithmetic.
+
+    - "numpy" (default) : the expressions are evaluated by NumPy, one temporary array per operator.
+    - "numexpr" : the expressions are evaluated by NumExpr in a single blocked pass, without the temporaries. It
+      falls back to "numpy" if NumExpr isn't installed.
+
+    Parameters:
+        name (str): The name of the backend.
+    """
+    global _backend
+    if name not in ("numpy", "numexpr"):
+        raise ValueError(f"Unknown backend {name}, expected 'numpy' or 'numexpr'")
+    if name not in AVAILABLE_BACKENDS:
+        print(f"Backend {name} is not installed, falling back to numpy")
+        name = "numpy"
+    _backend = name
+
+
+def evaluate(expression, variables):
+    """
+    Evaluates an arithmetic expression on arrays with the selected backend (see set_backend).
+
+    The expression is written in Python syntax with the operators +, -, *, /, ** and the functions sqrt and abs,
+    pi is defined. The NumPy backend evaluates the operators in the same order as the equivalent Python code,
+    the results are the same bit for bit.
+
+    Parameters:
+        expression (str): The expression to evaluate, for example "sqrt(a ** 2 + b ** 2)".
+        variables (dict): The values of the names used in the expression, scalars or arrays.
+
+    Returns:
+        numpy.ndarray: The result of the expression, broadcasted over the variables.
+    """
+    if _backend == "numexpr":
+        return numexpr.evaluate(expression, local_dict=dict(variables, pi=np.pi))
+
+    code = _compiled_expressions.get(expression)
+    if code is None:
+        code = compile(expression, "<expression>", "eval")
+        _compiled_expressions[expression] = code
+    return eval(code, NUMPY_NAMESPACE, variables)
+
@@ -4,6 +4,8 @@ PLASMAG 2024 Software, LPP
 """
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 
 class CalculationStrategy(ABC):
     """
@@ -32,13 +34,13 @@ class CalculationStrategy(ABC):
 
                     # retrieve values from other nodes
                     frequency_vector = dependencies["frequency_vector"]["data"]
-                    dep1 = dependencies["dependency1"]["data"][:, 1]
+                    dep1 = dependencies["dependency1"]["data"][..., 1]
 
                     # Custom calculation logic here
                     result = dep1 * param1
 
-                    # results must be returned as a tensor if the quantity depends on another one
-                    results = column_stack((frequency_vector, result))
+                    # results depending on the frequency are returned as columns sharing the frequency vector
+                    results = ColumnarData(frequency_vector, (result,))
 
                     # the return format is a dictionary with the numerical results stored in "data", the
                     # labels and units used for plot legend.
@@ -62,8 +64,15 @@ class CalculationStrategy(ABC):
           attempting to calculate this one.
           The list of dependencies should match the keys used to store the results in the `CalculationResults`.
           To know all existing dependencies, they are all listed in the CalculationResults readme file.
+        - Columns of the other nodes should be read with `[..., index]` and results built with `ColumnarData`
+          (see `src.model.results`) : the frequency vector isn't copied in every result, and the strategy also
+          works in batch mode (see `InputParameters`).
+        - Strategies whose calculation takes seconds (SPICE simulations ...) set `expensive` to True : when the
+          engine has an executor, they are calculated in a background process (see
+          `CalculationEngine.run_calculations`), so they must not rely on state shared with the engine.
 
     """
+    expensive = False
 
     @abstractmethod
     def calculate(self, dependencies: dict, parameters):
@@ -97,3 +106,21 @@ class CalculationStrategy(ABC):
 
         """
         return []
+
+
+def stack_columns(columns) -> np.ndarray:
+    """
+    Stacks the given columns along the last axis, broadcasting them against each other.
+    Strategies should return a `ColumnarData` instead, which is read the same way without copying the columns.
+
+    With scalar parameters, every column is a vector over the frequency axis and the result is the same
+    (n_freq, n_columns) matrix as `numpy.column_stack`. In batch mode, the columns are (n_designs, n_freq)
+    tensors and the shared frequency vector is broadcast, giving a (n_designs, n_freq, n_columns) tensor.
+
+    Parameters:
+        columns (sequence): The columns to stack, the frequency vector first.
+
+    Returns:
+        np.ndarray: The stacked columns.
+    """
+    return np.stack(np.broadcast_arrays(*columns), axis=-1)
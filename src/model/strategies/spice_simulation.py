@@ -0,0 +1,435 @@
+"""
+ src/model/strategies/spice_simulation.py
+ PLASMAG 2024 Software, LPP
+"""
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+import PySpice
+import PySpice.Logging.Logging as Logging
+from PySpice.Spice.NgSpice.Shared import NgSpiceShared
+from PySpice.Spice.Simulation import CircuitSimulation
+
+from src.model.result_cache import ResultCache
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "plasmag", "spice")
+# Size budget of the cache directory, in bytes
+DEFAULT_CACHE_DISK_BYTES = 1024 ** 3
+
+_INCLUDE_PATTERN = re.compile(r"^\.include\s+(.+)$", re.IGNORECASE)
+_NUMBER_PATTERN = re.compile(r"^([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|mil|[tgkmunpf])?[a-z]*$", re.IGNORECASE)
+SCALE_FACTORS = {"t": 1e12, "g": 1e9, "meg": 1e6, "k": 1e3, "mil": 25.4e-6, "m": 1e-3, "u": 1e-6, "n": 1e-9,
+                 "p": 1e-12, "f": 1e-15}
+
+
+class SpiceDeck(CircuitSimulation):
+    """
+    The simulation deck (netlist, options and analysis) given to ngspice, built without loading ngspice.
+    """
+    SIMULATOR = "ngspice"
+
+
+class SpiceAnalysis:
+    """
+    The waveforms of a SPICE analysis as plain NumPy arrays, cached by SpiceCache.
+
+    Like a PySpice analysis, a waveform is read with analysis.name or analysis["name"] (falling back to the lower
+    case name, ngspice names are lower case), the abscissa is analysis.frequency or analysis.time.
+
+    Attributes:
+        waveforms (dict): The arrays of the analysis (abscissa, node voltages, branch currents ...) by name.
+    """
+
+    def __init__(self, waveforms):
+        self.waveforms = waveforms
+
+    @classmethod
+    def from_pyspice(cls, analysis):
+        """Converts the analysis returned by a PySpice simulator"""
+        waveforms = {}
+        for abscissa in ("frequency", "time"):
+            value = getattr(analysis, abscissa, None)
+            if value is not None:
+                waveforms[abscissa] = np.array(value)
+        # same lookup order as the PySpice analysis
+        for group in (analysis.nodes, analysis.branches, analysis.elements, analysis.internal_parameters):
+            for name, waveform in group.items():
+                waveforms.setdefault(name, np.array(waveform))
+        return cls(waveforms)
+
+    def __getitem__(self, name):
+        if name in self.waveforms:
+            return self.waveforms[name]
+        return self.waveforms[name.lower()]
+
+    def __getattr__(self, name):
+        if name == "waveforms":
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(f"{name} is not a waveform of the analysis ({', '.join(self.waveforms)})")
+
+
+class SpiceCache:
+    """
+    A persistent store of the SPICE analyses, so that a simulation already run (in this session or a previous
+    one) isn't run again by ngspice.
+
+    The key of an analysis is a hash of its simulation deck : the netlist generated for the circuit, the
+    simulation options (temperatures) and the analysis command, with the full precision of the values. The
+    included files (.include lines, like the op-amp models of spice_lib) are hashed by content instead of path.
+    Any change of a component value, of an included model or of the sweep thus gives a new key, and nothing else
+    does.
+
+    The analyses are kept in memory (a ResultCache) and saved as .npz files in the cache directory, written
+    atomically so that several processes can share the directory. Beyond max_disk_bytes, the least recently used
+    files (oldest modification time, refreshed when a file is read) are removed.
+
+    Attributes:
+        directory (str): The directory of the saved analyses, None to keep them in memory only.
+        max_disk_bytes (int): The size budget of the cache directory, None for no limit.
+        memory (ResultCache): The analyses of the session, least recently used ones evicted first.
+        hits (int): The number of lookups that found an analysis in memory.
+        disk_hits (int): The number of lookups that found an analysis in the directory only.
+        misses (int): The number of lookups that didn't find an analysis.
+    """
+
+    def __init__(self, directory=None, max_bytes=64 * 1024 ** 2, max_disk_bytes=DEFAULT_CACHE_DISK_BYTES):
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = ResultCache(max_bytes)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def deck_key(deck) -> str:
+        """
+        Builds the key of a simulation deck (see SpiceDeck, or str() of a PySpice simulator).
+        """
+        digest = hashlib.blake2b(f"PySpice {PySpice.__version__}".encode(), digest_size=16)
+        for line in str(deck).splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            include = _INCLUDE_PATTERN.match(line)
+            if include:
+                with open(include.group(1).strip().strip('"'), "rb") as file:
+                    line = ".include " + hashlib.blake2b(file.read(), digest_size=16).hexdigest()
+            digest.update(line.encode())
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    def get_path(self, key):
+        """Returns the path of the file of an analysis"""
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        """
+        Retrieves the analysis stored for a key, from the memory or from the cache directory.
+
+        Returns:
+            SpiceAnalysis: The cached analysis, or None if the key isn't in the cache.
+        """
+        waveforms = self.memory.get(key)
+        if waveforms is not None:
+            self.hits += 1
+            return SpiceAnalysis(waveforms)
+        if self.directory is not None and os.path.isfile(self.get_path(key)):
+            with np.load(self.get_path(key), allow_pickle=False) as file:
+                waveforms = {name: file[name] for name in file.files}
+            try:
+                # marks the file as recently used, see prune
+                os.utime(self.get_path(key))
+            except OSError:
+                pass
+            self.memory.put(key, waveforms)
+            self.disk_hits += 1
+            return SpiceAnalysis(waveforms)
+        self.misses += 1
+        return None
+
+    def put(self, key, analysis):
+        """
+        Stores an analysis in memory and in the cache directory, then prunes the directory (see prune).
+        """
+        self.memory.put(key, analysis.waveforms)
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        temporary_path = self.get_path(key) + f".{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as file:
+            np.savez(file, **analysis.waveforms)
+        os.replace(temporary_path, self.get_path(key))
+        self.prune()
+
+    def prune(self):
+        """
+        Removes the least recently used files of the cache directory until its size is within max_disk_bytes.
+        The files removed meanwhile by another process sharing the directory are skipped.
+        """
+        if self.directory is None or self.max_disk_bytes is None:
+            return
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz"):
+                try:
+                    status = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((status.st_mtime, status.st_size, entry.path))
+        size = sum(file_size for _, file_size, _ in files)
+        for _, file_size, path in sorted(files):
+            if size <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+
+    def clear(self):
+        """
+        Removes all the cached analyses, in memory and in the cache directory, and resets the statistics.
+        """
+        self.memory.clear()
+        if self.directory is not None and os.path.isdir(self.directory):
+            for file_name in os.listdir(self.directory):
+                if file_name.endswith(".npz"):
+                    os.remove(os.path.join(self.directory, file_name))
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_statistics(self) -> dict:
+        """
+        Returns the hit rate of the cache.
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.,
+        }
+
+
+def parse_spice_number(text):
+    """
+    Converts a SPICE number (with its scale factor and unit, like "1.5kOhm") into a float, None if text isn't a
+    number (an expression ...).
+    """
+    match = _NUMBER_PATTERN.match(text)
+    if match is None:
+        return None
+    scale = match.group(2)
+    return float(match.group(1)) * (SCALE_FACTORS[scale.lower()] if scale else 1)
+
+
+def get_points_per_decade(frequency_vector):
+    """
+    Returns the number of points per decade of a decade grid (see FrequencyVectorStrategy), None if
+    frequency_vector isn't one (adaptive frequency vector, non integer number of points per decade ...).
+    """
+    steps = np.diff(np.log10(frequency_vector))
+    if len(steps) == 0 or steps[0] <= 0:
+        return None
+    points_per_decade = round(1 / steps.mean())
+    if points_per_decade < 1 or not np.allclose(steps, 1 / points_per_decade, rtol=1e-6, atol=0):
+        return None
+    return points_per_decade
+
+
+def get_frequency_sweep(frequency_vector, points_per_decade=0):
+    """
+    Builds the frequency sweep of a SPICE analysis (.ac, .noise) calculated over a frequency vector.
+
+    With points_per_decade = 0 and a decade grid, the sweep holds the points of frequency_vector itself. Otherwise
+    (adaptive frequency vector, or hybrid mode : points_per_decade SPICE points per decade, usually far less than
+    the analytical strategies), the sweep is a decade sweep enclosing frequency_vector, interpolated onto it by
+    on_frequency_vector.
+
+    Returns:
+        dict: The variation, number_of_points, start_frequency and stop_frequency parameters of the analysis.
+    """
+    frequency_vector = np.asarray(frequency_vector, dtype=float)
+    start_frequency = frequency_vector[0]
+    decades = np.log10(frequency_vector[-1] / start_frequency)
+    if not points_per_decade:
+        points_per_decade = get_points_per_decade(frequency_vector) or int(np.ceil((len(frequency_vector) - 1) /
+                                                                                   max(decades, 1e-12)))
+    points_per_decade = max(int(points_per_decade), 1)
+    nb_steps = int(np.ceil(decades * points_per_decade - 1e-6))
+    # half a step after the last point : ngspice neither drops it nor adds another one
+    return {
+        "variation": "dec",
+        "number_of_points": points_per_decade,
+        "start_frequency": float(start_frequency),
+        "stop_frequency": float(start_frequency * 10 ** ((nb_steps + 0.5) / points_per_decade)),
+    }
+
+
+def interpolate_log_log(frequency_vector, frequency, values):
+    """
+    Interpolates positive values (magnitudes, densities) linearly in log-log scale.
+    """
+    return 10 ** np.interp(np.log10(frequency_vector), np.log10(frequency), np.log10(values))
+
+
+def on_frequency_vector(frequency_vector, frequency, values):
+    """
+    Returns the values of a SPICE analysis over frequency_vector : the values themselves when the analysis was
+    simulated at the points of frequency_vector (see get_frequency_sweep), interpolated in log-log scale
+    otherwise.
+    """
+    frequency = np.asarray(frequency, dtype=float)
+    values = np.asarray(values)
+    if len(frequency) == len(frequency_vector) and np.allclose(frequency, frequency_vector, rtol=1e-6, atol=0):
+        return values
+    return interpolate_log_log(frequency_vector, frequency, values)
+
+
+class SpiceSession:
+    """
+    A long-lived ngspice shared session : the ngspice library is loaded once, and consecutive simulations of the
+    same circuit only alter the component values that changed instead of loading the whole deck again (no parsing
+    of the netlist and of the included libraries, like the op-amp models of spice_lib).
+
+    A session belongs to a process (see get_session), its simulations run one at a time.
+
+    Attributes:
+        ngspice_id (int): The id of the ngspice instance of the session.
+        ngspice (NgSpiceShared): The ngspice instance, loaded by the first simulation.
+        loaded_lines (list): The lines of the deck currently loaded in ngspice, with the altered values.
+        nb_loads (int): The number of decks loaded.
+        nb_alterations (int): The number of simulations run by altering the loaded deck.
+    """
+
+    def __init__(self, ngspice_id=0):
+        self.ngspice_id = ngspice_id
+        self.ngspice = None
+        self.loaded_lines = None
+        self.nb_loads = 0
+        self.nb_alterations = 0
+        self.lock = threading.Lock()
+
+    def get_alterations(self, lines):
+        """
+        Compares a deck with the loaded one.
+
+        Returns:
+            dict: The new values of the resistors, capacitors and inductors whose value changed, by name, or None
+            if anything else changed (circuit, options, analysis) : the deck must be loaded again.
+        """
+        if self.loaded_lines is None or len(lines) != len(self.loaded_lines):
+            return None
+        alterations = {}
+        for loaded_line, line in zip(self.loaded_lines, lines):
+            if line == loaded_line:
+                continue
+            loaded_fields, fields = loaded_line.split(), line.split()
+            if len(fields) != 4 or fields[0][0].upper() not in "RCL" or fields[:3] != loaded_fields[:3]:
+                return None
+            value = parse_spice_number(fields[3])
+            if value is None:
+                return None
+            alterations[fields[0]] = value
+        return alterations
+
+    def run(self, deck):
+        """
+        Runs the analysis of a simulation deck.
+
+        Parameters:
+            deck (SpiceDeck): The simulation deck.
+
+        Returns:
+            The PySpice analysis.
+        """
+        lines = [line.strip() for line in str(deck).splitlines() if line.strip()]
+        with self.lock:
+            if self.ngspice is None:
+                Logging.setup_logging()
+                self.ngspice = NgSpiceShared.new_instance(self.ngspice_id)
+            alterations = self.get_alterations(lines)
+            # the output of the previous simulations is released
+            self.ngspice.destroy()
+            if alterations is None:
+                self.loaded_lines = None
+                self.ngspice.load_circuit(os.linesep.join(lines))
+                self.nb_loads += 1
+            else:
+                for device, value in alterations.items():
+                    self.ngspice.exec_command(f"alter {device} = {value!r}")
+                self.nb_alterations += 1
+            self.loaded_lines = lines
+            self.ngspice.run()
+            plot_name = self.ngspice.last_plot
+            if plot_name == 'const':
+                self.loaded_lines = None
+                raise NameError('Simulation failed')
+            return self.ngspice.plot(deck, plot_name).to_analysis()
+
+
+_cache = SpiceCache(DEFAULT_CACHE_DIRECTORY)
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_spice_cache():
+    """Returns the cache used by simulate"""
+    return _cache
+
+
+def get_session():
+    """
+    Returns the ngspice session of the current process, created at the first call. The worker processes of a
+    pool (see run_sweep, GeneticOptimisation) each create their own session, a session inherited from the parent
+    process isn't used.
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = SpiceSession()
+            _session_pid = os.getpid()
+        return _session
+
+
+def set_spice_cache_directory(directory, max_disk_bytes=DEFAULT_CACHE_DISK_BYTES):
+    """
+    Selects the directory where simulate saves the analyses, None to keep them in memory only, and its size
+    budget in bytes, None for no limit.
+    """
+    global _cache
+    _cache = SpiceCache(directory, max_disk_bytes=max_disk_bytes)
+
+
+def simulate(circuit, analysis, temperature, nominal_temperature=25, **analysis_parameters):
+    """
+    Runs a SPICE analysis of a circuit with the ngspice session of the process (see SpiceSession), or returns it
+    from the cache if the same simulation deck was already run (see SpiceCache).
+
+    Parameters:
+        circuit (Circuit): The PySpice circuit.
+        analysis (str): The name of the analysis method of the PySpice simulator ("ac", "noise", "transient" ...).
+        temperature (float): The simulation temperature, in degrees Celsius.
+        nominal_temperature (float): The temperature of the model parameters, in degrees Celsius.
+        analysis_parameters: The parameters of the analysis method.
+
+    Returns:
+        SpiceAnalysis: The waveforms of the analysis.
+    """
+    deck = SpiceDeck(circuit, temperature=temperature, nominal_temperature=nominal_temperature)
+    getattr(CircuitSimulation, analysis)(deck, **analysis_parameters)
+    key = _cache.deck_key(deck)
+
+    result = _cache.get(key)
+    if result is None:
+        result = SpiceAnalysis.from_pyspice(get_session().run(deck))
+        _cache.put(key, result)
+    return result
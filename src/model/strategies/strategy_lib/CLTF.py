@@ -1,7 +1,8 @@
-from numpy import pi, column_stack
+from numpy import pi
 
 from src.model.input_parameters import InputParameters
-from src.model.strategies import CalculationStrategy
+from src.model.strategies import CalculationStrategy, ColumnarData
+from src.model.strategies.backend import evaluate
 
 
 class CLTF_Strategy(CalculationStrategy):
@@ -32,16 +33,16 @@ class CLTF_Strategy(CalculationStrategy):
         ray_spire = parameters.data["ray_spire"]
         mu_app = dependencies["mu_app"]["data"]
         frequency_vector = dependencies["frequency_vector"]["data"]
-        nsd_normalisation = dependencies["NSD_normalisation"]["data"][:, 1]
-        h2 = dependencies["TF_ASIC_Stage_2"]["data"][:, 1]
+        nsd_normalisation = dependencies["NSD_normalisation"]["data"][..., 1]
+        h2 = dependencies["TF_ASIC_Stage_2"]["data"][..., 1]
 
         omega = 2 * pi * frequency_vector
         section = pi * ray_spire ** 2
-        numerator = nb_spire * section * mu_app * omega
-        cltf = numerator / nsd_normalisation
+        cltf = evaluate("gain * omega / nsd_normalisation",
+                        {"gain": nb_spire * section * mu_app, "omega": omega, "nsd_normalisation": nsd_normalisation})
         cltf_filtered = cltf * h2
 
-        results = column_stack((frequency_vector, cltf, cltf_filtered))
+        results = ColumnarData(frequency_vector, (cltf, cltf_filtered))
 
         return {
             "data": results,
@@ -58,11 +59,11 @@ class CLTF_Strategy(CalculationStrategy):
 class Display_CLTF_OLTF(CalculationStrategy):
 
     def calculate(self, dependencies: dict, parameters: InputParameters):
-        frequency_vector = dependencies["CLTF"]["data"][:, 0]
-        cltf = dependencies["CLTF"]["data"][:, 1]
-        oltf = dependencies["OLTF"]["data"][:, 1]
+        frequency_vector = dependencies["CLTF"]["data"][..., 0]
+        cltf = dependencies["CLTF"]["data"][..., 1]
+        oltf = dependencies["OLTF"]["data"][..., 1]
 
-        result = column_stack((frequency_vector, cltf, oltf))
+        result = ColumnarData(frequency_vector, (cltf, oltf))
         return {
             "data": result,
             "labels": ["Frequency", "CLTF", "OLTF"],
@@ -77,11 +78,11 @@ class Display_CLTF_OLTF(CalculationStrategy):
 class Display_CLTF_OLTF_filtered(CalculationStrategy):
 
     def calculate(self, dependencies: dict, parameters: InputParameters):
-        frequency_vector = dependencies["CLTF"]["data"][:, 0]
-        cltf = dependencies["CLTF"]["data"][:, 2]
-        oltf = dependencies["OLTF"]["data"][:, 2]
+        frequency_vector = dependencies["CLTF"]["data"][..., 0]
+        cltf = dependencies["CLTF"]["data"][..., 2]
+        oltf = dependencies["OLTF"]["data"][..., 2]
 
-        result = column_stack((frequency_vector, cltf, oltf))
+        result = ColumnarData(frequency_vector, (cltf, oltf))
         return {
             "data": result,
             "labels": ["Frequency", "CLTF_filtered", "OLTF_filtered"],
@@ -1,6 +1,7 @@
-from numpy import pi, column_stack
+from numpy import pi
 from src.model.input_parameters import InputParameters
-from src.model.strategies import CalculationStrategy
+from src.model.strategies import CalculationStrategy, ColumnarData
+from src.model.strategies.backend import evaluate
 from scipy.constants import k
 
 
@@ -29,10 +30,10 @@ class NSD_R_cr(CalculationStrategy):
         temperature = parameters.data["temperature"]
         feedback_resistance = parameters.data["feedback_resistance"]
         mutual_inductance = parameters.data["mutual_inductance"]
-        h1 = dependencies["TF_ASIC_Stage_1"]["data"][:, 1]
-        h2 = dependencies["TF_ASIC_Stage_2"]["data"][:, 1]
+        h1 = dependencies["TF_ASIC_Stage_1"]["data"][..., 1]
+        h2 = dependencies["TF_ASIC_Stage_2"]["data"][..., 1]
         frequency_vector = dependencies["frequency_vector"]["data"]
-        nsd_normalisation = dependencies["NSD_normalisation"]["data"][:, 1]
+        nsd_normalisation = dependencies["NSD_normalisation"]["data"][..., 1]
 
         omega2 = (2 * pi * frequency_vector) ** 2
         numerator = abs(4 * k * temperature * feedback_resistance) * omega2 \
@@ -41,7 +42,7 @@ class NSD_R_cr(CalculationStrategy):
         nsd_non_filtered = numerator / nsd_normalisation
         nsd_filtered = nsd_non_filtered * h2
 
-        results = column_stack((frequency_vector, nsd_non_filtered, nsd_filtered))
+        results = ColumnarData(frequency_vector, (nsd_non_filtered, nsd_filtered))
 
         return {
             "data": results,
@@ -78,9 +79,9 @@ class NSD_R_Coil(CalculationStrategy):
     def calculate(self, dependencies: dict, parameters: InputParameters):
         temperature = parameters.data["temperature"]
         R = dependencies["resistance"]["data"]
-        nsd_normalisation = dependencies["NSD_normalisation"]["data"][:, 1]
+        nsd_normalisation = dependencies["NSD_normalisation"]["data"][..., 1]
         frequency_vector = dependencies["frequency_vector"]["data"]
-        h2 = dependencies["TF_ASIC_Stage_2"]["data"][:, 1]
+        h2 = dependencies["TF_ASIC_Stage_2"]["data"][..., 1]
 
         numerator = abs(4 * k * temperature * R)
         numerator = numerator ** 0.5
@@ -88,7 +89,7 @@ class NSD_R_Coil(CalculationStrategy):
         nsd_non_filtered = numerator / nsd_normalisation
         nsd_filtered = nsd_non_filtered * h2
 
-        results = column_stack((frequency_vector, nsd_non_filtered, nsd_filtered))
+        results = ColumnarData(frequency_vector, (nsd_non_filtered, nsd_filtered))
 
         return {
             "data": results,
@@ -125,10 +126,10 @@ class NSD_Flicker(CalculationStrategy):
         e_en = parameters.data["e_en"]
         frequency_vector = dependencies["frequency_vector"]["data"]
 
-        Alpha /= 10
+        Alpha = Alpha / 10
         nsd_non_filtered = Para_A * 1e-9 / (Para_B * (frequency_vector ** Alpha)) + e_en
 
-        results = column_stack((frequency_vector, nsd_non_filtered))
+        results = ColumnarData(frequency_vector, (nsd_non_filtered,))
 
         return {
             "data": results,
@@ -162,14 +163,14 @@ class NSD_e_en(CalculationStrategy):
     """
 
     def calculate(self, dependencies: dict, parameters: InputParameters):
-        flicker = dependencies["PSD_Flicker"]["data"][:, 1]
-        h1 = dependencies["TF_ASIC_Stage_1"]["data"][:, 1]
-        h2 = dependencies["TF_ASIC_Stage_2"]["data"][:, 1]
+        flicker = dependencies["PSD_Flicker"]["data"][..., 1]
+        h1 = dependencies["TF_ASIC_Stage_1"]["data"][..., 1]
+        h2 = dependencies["TF_ASIC_Stage_2"]["data"][..., 1]
         L = dependencies["inductance"]["data"]
         C = dependencies["capacitance"]["data"]
         frequency_vector = dependencies["frequency_vector"]["data"]
         R = dependencies["resistance"]["data"]
-        nsd_normalisation = dependencies["NSD_normalisation"]["data"][:, 1]
+        nsd_normalisation = dependencies["NSD_normalisation"]["data"][..., 1]
 
         omega2 = (2 * pi * frequency_vector) ** 2
         numerator = flicker ** 2 * h1 ** 2 * ((1 - omega2 * L * C) ** 2 + omega2 * (R * C) ** 2)
@@ -177,7 +178,7 @@ class NSD_e_en(CalculationStrategy):
         nsd_non_filtered = numerator / nsd_normalisation
         nsd_filtered = nsd_non_filtered * h2
 
-        results = column_stack((frequency_vector, nsd_non_filtered, nsd_filtered))
+        results = ColumnarData(frequency_vector, (nsd_non_filtered, nsd_filtered))
 
         return {
             "data": results,
@@ -214,23 +215,23 @@ class NSD_e_in(CalculationStrategy):
 
     def calculate(self, dependencies: dict, parameters: InputParameters):
         e_in = parameters.data["e_in"]
-        impedance = dependencies["impedance"]["data"][:, 1]
+        impedance = dependencies["impedance"]["data"][..., 1]
         frequency_vector = dependencies["frequency_vector"]["data"]
-        h1 = dependencies["TF_ASIC_Stage_1"]["data"][:, 1]
-        h2 = dependencies["TF_ASIC_Stage_2"]["data"][:, 1]
+        h1 = dependencies["TF_ASIC_Stage_1"]["data"][..., 1]
+        h2 = dependencies["TF_ASIC_Stage_2"]["data"][..., 1]
         C = dependencies["capacitance"]["data"]
         R = dependencies["resistance"]["data"]
         L = dependencies["inductance"]["data"]
-        nsd_normalisation = dependencies["NSD_normalisation"]["data"][:, 1]
+        nsd_normalisation = dependencies["NSD_normalisation"]["data"][..., 1]
 
         omega2 = (2 * pi * frequency_vector) ** 2
-        numerator = impedance ** 2 * (e_in * 1e-3) ** 2 * h1 ** 2 \
-                    * ((1 - L * C * omega2) ** 2 + omega2 * (R * C) ** 2)
-        numerator = numerator ** 0.5
-        nsd_non_filtered = numerator / nsd_normalisation
+        nsd_non_filtered = evaluate(
+            "(impedance ** 2 * e_in2 * h1 ** 2 * ((1 - LC * omega2) ** 2 + omega2 * RC2)) ** 0.5 / nsd_normalisation",
+            {"impedance": impedance, "e_in2": (e_in * 1e-3) ** 2, "h1": h1, "LC": L * C, "RC2": (R * C) ** 2,
+             "omega2": omega2, "nsd_normalisation": nsd_normalisation})
         nsd_filtered = nsd_non_filtered * h2
 
-        results = column_stack((frequency_vector, nsd_non_filtered, nsd_filtered))
+        results = ColumnarData(frequency_vector, (nsd_non_filtered, nsd_filtered))
 
         return {
             "data": results,
@@ -259,19 +260,19 @@ class NSD_Total(CalculationStrategy):
 
     """
     def calculate(self, dependencies: dict, parameters: InputParameters):
-        nsd_e_in = dependencies["PSD_e_in"]["data"][:, 1]
-        nsd_e_in_filtered = dependencies["PSD_e_in"]["data"][:, 2]
-        nsd_e_en = dependencies["PSD_e_en"]["data"][:, 1]
-        nsd_e_en_filtered = dependencies["PSD_e_en"]["data"][:, 2]
-        nsd_r_coil = dependencies["PSD_R_Coil"]["data"][:, 1]
-        nsd_r_coil_filtered = dependencies["PSD_R_Coil"]["data"][:, 2]
-        nsd_r_cr = dependencies["PSD_R_cr"]["data"][:, 1]
-        nsd_r_cr_filtered = dependencies["PSD_R_cr"]["data"][:, 2]
+        nsd_e_in = dependencies["PSD_e_in"]["data"][..., 1]
+        nsd_e_in_filtered = dependencies["PSD_e_in"]["data"][..., 2]
+        nsd_e_en = dependencies["PSD_e_en"]["data"][..., 1]
+        nsd_e_en_filtered = dependencies["PSD_e_en"]["data"][..., 2]
+        nsd_r_coil = dependencies["PSD_R_Coil"]["data"][..., 1]
+        nsd_r_coil_filtered = dependencies["PSD_R_Coil"]["data"][..., 2]
+        nsd_r_cr = dependencies["PSD_R_cr"]["data"][..., 1]
+        nsd_r_cr_filtered = dependencies["PSD_R_cr"]["data"][..., 2]
         frequency_vector = dependencies["frequency_vector"]["data"]
 
         total_non_filtered = (nsd_e_in**2 + nsd_e_en**2 + nsd_r_coil**2 + nsd_r_cr**2)**0.5
         total_filtered = (nsd_e_in_filtered**2 + nsd_e_en_filtered**2 + nsd_r_coil_filtered**2 + nsd_r_cr_filtered**2)**0.5
-        values = column_stack((frequency_vector, total_non_filtered, total_filtered))
+        values = ColumnarData(frequency_vector, (total_non_filtered, total_filtered))
 
         return {
             "data": values,
@@ -287,14 +288,14 @@ class NSD_Total(CalculationStrategy):
 class Display_all_NSD(CalculationStrategy):
 
     def calculate(self, dependencies: dict, parameters: InputParameters):
-        psd_e_in = dependencies["PSD_e_in"]["data"][:, 1]
-        psd_e_en = dependencies["PSD_e_en"]["data"][:, 1]
-        psd_r_coil = dependencies["PSD_R_Coil"]["data"][:, 1]
-        psd_r_cr = dependencies["PSD_R_cr"]["data"][:, 1]
-        psd_tot = dependencies["PSD_Total"]["data"][:, 1]
+        psd_e_in = dependencies["PSD_e_in"]["data"][..., 1]
+        psd_e_en = dependencies["PSD_e_en"]["data"][..., 1]
+        psd_r_coil = dependencies["PSD_R_Coil"]["data"][..., 1]
+        psd_r_cr = dependencies["PSD_R_cr"]["data"][..., 1]
+        psd_tot = dependencies["PSD_Total"]["data"][..., 1]
         frequency_vector = dependencies["frequency_vector"]["data"]
 
-        values = column_stack((frequency_vector, psd_r_cr, psd_r_coil, psd_e_en, psd_e_in,
+        values = ColumnarData(frequency_vector, (psd_r_cr, psd_r_coil, psd_e_en, psd_e_in,
                                psd_tot))
         return {
             "data": values,
@@ -311,11 +312,11 @@ class Display_all_NSD(CalculationStrategy):
 class Display_all_PSD(CalculationStrategy):
 
     def calculate(self, dependencies: dict, parameters: InputParameters):
-        psd_e_in = dependencies["PSD_e_in"]["data"][:, 1]
-        psd_e_en = dependencies["PSD_e_en"]["data"][:, 1]
-        psd_r_coil = dependencies["PSD_R_Coil"]["data"][:, 1]
-        psd_r_cr = dependencies["PSD_R_cr"]["data"][:, 1]
-        psd_tot = dependencies["PSD_Total"]["data"][:, 1]
+        psd_e_in = dependencies["PSD_e_in"]["data"][..., 1]
+        psd_e_en = dependencies["PSD_e_en"]["data"][..., 1]
+        psd_r_coil = dependencies["PSD_R_Coil"]["data"][..., 1]
+        psd_r_cr = dependencies["PSD_R_cr"]["data"][..., 1]
+        psd_tot = dependencies["PSD_Total"]["data"][..., 1]
         frequency_vector = dependencies["frequency_vector"]["data"]
 
         psd_r_cr = psd_r_cr ** 2
@@ -324,7 +325,7 @@ class Display_all_PSD(CalculationStrategy):
         psd_e_in = psd_e_in ** 2
         psd_tot = psd_tot ** 2
 
-        values = column_stack((frequency_vector, psd_r_cr, psd_r_coil, psd_e_en, psd_e_in,
+        values = ColumnarData(frequency_vector, (psd_r_cr, psd_r_coil, psd_e_en, psd_e_in,
                                psd_tot))
         return {
             "data": values,
@@ -341,14 +342,14 @@ class Display_all_PSD(CalculationStrategy):
 class Display_all_NSD_filtered(CalculationStrategy):
 
     def calculate(self, dependencies: dict, parameters: InputParameters):
-        psd_e_in = dependencies["PSD_e_in"]["data"][:, 2]
-        psd_e_en = dependencies["PSD_e_en"]["data"][:, 2]
-        psd_r_coil = dependencies["PSD_R_Coil"]["data"][:, 2]
-        psd_r_cr = dependencies["PSD_R_cr"]["data"][:, 2]
-        psd_tot = dependencies["PSD_Total"]["data"][:, 2]
+        psd_e_in = dependencies["PSD_e_in"]["data"][..., 2]
+        psd_e_en = dependencies["PSD_e_en"]["data"][..., 2]
+        psd_r_coil = dependencies["PSD_R_Coil"]["data"][..., 2]
+        psd_r_cr = dependencies["PSD_R_cr"]["data"][..., 2]
+        psd_tot = dependencies["PSD_Total"]["data"][..., 2]
         frequency_vector = dependencies["frequency_vector"]["data"]
 
-        values = column_stack((frequency_vector, psd_r_cr, psd_r_coil, psd_e_en, psd_e_in,
+        values = ColumnarData(frequency_vector, (psd_r_cr, psd_r_coil, psd_e_en, psd_e_in,
                                psd_tot))
         return {
             "data": values,
@@ -366,11 +367,11 @@ class Display_all_NSD_filtered(CalculationStrategy):
 class Display_all_PSD_filtered(CalculationStrategy):
 
     def calculate(self, dependencies: dict, parameters: InputParameters):
-        psd_e_in = dependencies["PSD_e_in"]["data"][:, 2]
-        psd_e_en = dependencies["PSD_e_en"]["data"][:, 2]
-        psd_r_coil = dependencies["PSD_R_Coil"]["data"][:, 2]
-        psd_r_cr = dependencies["PSD_R_cr"]["data"][:, 2]
-        psd_tot = dependencies["PSD_Total"]["data"][:, 2]
+        psd_e_in = dependencies["PSD_e_in"]["data"][..., 2]
+        psd_e_en = dependencies["PSD_e_en"]["data"][..., 2]
+        psd_r_coil = dependencies["PSD_R_Coil"]["data"][..., 2]
+        psd_r_cr = dependencies["PSD_R_cr"]["data"][..., 2]
+        psd_tot = dependencies["PSD_Total"]["data"][..., 2]
         frequency_vector = dependencies["frequency_vector"]["data"]
 
         psd_r_cr = psd_r_cr ** 2
@@ -379,7 +380,7 @@ class Display_all_PSD_filtered(CalculationStrategy):
         psd_e_in = psd_e_in ** 2
         psd_tot = psd_tot ** 2
 
-        values = column_stack((frequency_vector, psd_r_cr, psd_r_coil, psd_e_en, psd_e_in,
+        values = ColumnarData(frequency_vector, (psd_r_cr, psd_r_coil, psd_e_en, psd_e_in,
                                psd_tot))
         return {
             "data": values,
@@ -396,14 +397,14 @@ class Display_all_PSD_filtered(CalculationStrategy):
 class NEMI(CalculationStrategy):
 
     def calculate(self, dependencies: dict, parameters: InputParameters):
-        psd = dependencies["PSD_Total"]["data"][:, 1]
-        psd_filtered = dependencies["PSD_Total"]["data"][:, 2]
-        cltf = dependencies["CLTF"]["data"][:, 1]
+        psd = dependencies["PSD_Total"]["data"][..., 1]
+        psd_filtered = dependencies["PSD_Total"]["data"][..., 2]
+        cltf = dependencies["CLTF"]["data"][..., 1]
         frequency_vector = dependencies["frequency_vector"]["data"]
 
         nemi_non_filtered = psd / cltf
         nemi_filtered = psd_filtered / cltf
-        results = column_stack((frequency_vector, nemi_non_filtered, nemi_filtered))
+        results = ColumnarData(frequency_vector, (nemi_non_filtered, nemi_filtered))
 
         return {
             "data": results,
@@ -424,15 +425,15 @@ class NSD_normalisation(CalculationStrategy):
         L = dependencies["inductance"]["data"]
         C = dependencies["capacitance"]["data"]
         mutual_L = parameters.data["mutual_inductance"]
-        h1 = dependencies["TF_ASIC_Stage_1"]["data"][:, 1]
+        h1 = dependencies["TF_ASIC_Stage_1"]["data"][..., 1]
         R_feedback = parameters.data["feedback_resistance"]
         frequency_vector = dependencies["frequency_vector"]["data"]
         omega2 = (2 * pi * frequency_vector) ** 2
-        denominator = ((1 - L * C * omega2) ** 2
-                       + omega2 * (R * C + h1 * mutual_L / R_feedback) ** 2)
-        denominator = denominator ** 0.5
+        denominator = evaluate(
+            "((1 - LC * omega2) ** 2 + omega2 * (RC + h1 * mutual_L / R_feedback) ** 2) ** 0.5",
+            {"LC": L * C, "RC": R * C, "h1": h1, "mutual_L": mutual_L, "R_feedback": R_feedback, "omega2": omega2})
 
-        results = column_stack((frequency_vector, denominator))
+        results = ColumnarData(frequency_vector, (denominator,))
 
         return {
             "data": results,
@@ -1,4 +1,4 @@
-from math import log
+from numpy import log
 
 from src.model.input_parameters import InputParameters
 from src.model.strategies import CalculationStrategy
@@ -1,6 +1,6 @@
-from numpy import pi, column_stack
+from numpy import pi
 from src.model.input_parameters import InputParameters
-from src.model.strategies import CalculationStrategy
+from src.model.strategies import CalculationStrategy, ColumnarData
 
 
 class OLTF_Strategy(CalculationStrategy):
@@ -28,7 +28,7 @@ class OLTF_Strategy(CalculationStrategy):
         ray_spire = parameters.data["ray_spire"]
         mu_app = dependencies["mu_app"]["data"]
         frequency_vector = dependencies["frequency_vector"]["data"]
-        h2 = dependencies["TF_ASIC_Stage_2"]["data"][:, 1]
+        h2 = dependencies["TF_ASIC_Stage_2"]["data"][..., 1]
         L = dependencies["inductance"]["data"]
         C = dependencies["capacitance"]["data"]
         R = dependencies["resistance"]["data"]
@@ -40,7 +40,7 @@ class OLTF_Strategy(CalculationStrategy):
         oltf = numerator / denominator
         oltf_filtered = oltf * h2
 
-        results = column_stack((frequency_vector, oltf, oltf_filtered))
+        results = ColumnarData(frequency_vector, (oltf, oltf_filtered))
 
         return {
             "data": results,
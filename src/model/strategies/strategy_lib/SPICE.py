@@ -1,22 +1,31 @@
 from sys import platform
-from numpy import abs, array, interp, column_stack
+from numpy import abs, array
 from src.model.input_parameters import InputParameters
-from src.model.strategies import CalculationStrategy
+from src.model.strategies import CalculationStrategy, ColumnarData
+from src.model.strategies.spice_simulation import get_frequency_sweep, on_frequency_vector, simulate
 
 import PySpice.Logging.Logging as Logging
 from PySpice.Spice.Netlist import Circuit
 from PySpice.Unit import *
 
 
-class SPICE_test(CalculationStrategy):
+class SpiceStrategy(CalculationStrategy):
+    """Base class of the SPICE strategies, calculated in the background when possible (see expensive)
+
+    The frequency analyses simulate the points of the frequency vector (see get_frequency_sweep). With the
+    spice_points_per_decade parameter of the circuit above 0 (hybrid mode), they simulate this number of points
+    per decade only, interpolated in log-log scale onto the frequency vector of the analytical strategies.
+    """
+    expensive = True
+
+
+class SPICE_test(SpiceStrategy):
     def calculate(self, dependencies: dict, parameters: InputParameters):
         temperature = parameters.data['temperature']
-        f_start = parameters.data['f_start']
-        f_stop = parameters.data['f_stop']
+        spice_points_per_decade = parameters.data['spice_points_per_decade']
         spice_resistance_test = parameters.data['spice_resistance_test']
 
         frequency_vector = dependencies['frequency_vector']['data']
-        logger = Logging.setup_logging()
 
         # convert temperature to degrees Celsius
         temperature = temperature - 273.15
@@ -33,22 +42,14 @@ class SPICE_test(CalculationStrategy):
         circuit.Diode(1, 'n2', 'n3', model='CustomDiode')
         circuit.R(2, 'n3', circuit.gnd, 1 @u_kOhm)
 
-        simulator = circuit.simulator(temperature=temperature, nominal_temperature=25)
-
-        analysis = simulator.ac(start_frequency=f_start@ u_Hz, stop_frequency=f_stop@u_Hz, number_of_points=10,
-                                variation='dec')  # 1 to 1MHz, 10 points per decade
-
-        gain_node_1 = abs(analysis.n1)
-        gain_node_2 = abs(analysis.n2)
-        gain_node_3 = abs(analysis.n3)
-
-        analysis_freq = array(analysis.frequency)
+        analysis = simulate(circuit, 'ac', temperature,
+                            **get_frequency_sweep(frequency_vector, spice_points_per_decade))
 
-        interpolated_gain_1 = interp(frequency_vector, analysis_freq, gain_node_1)
-        interpolated_gain_2 = interp(frequency_vector, analysis_freq, gain_node_2)
-        interpolated_gain_3 = interp(frequency_vector, analysis_freq, gain_node_3)
+        gain_node_1 = on_frequency_vector(frequency_vector, analysis.frequency, abs(analysis.n1))
+        gain_node_2 = on_frequency_vector(frequency_vector, analysis.frequency, abs(analysis.n2))
+        gain_node_3 = on_frequency_vector(frequency_vector, analysis.frequency, abs(analysis.n3))
 
-        result = column_stack((frequency_vector, interpolated_gain_1, interpolated_gain_2, interpolated_gain_3))
+        result = ColumnarData(frequency_vector, (gain_node_1, gain_node_2, gain_node_3))
 
         return {
             "data": result,
@@ -58,15 +59,14 @@ class SPICE_test(CalculationStrategy):
 
     @staticmethod
     def get_dependencies():
-        return ['frequency_vector', "f_start", "f_stop", "spice_resistance_test", "temperature"]
+        return ['frequency_vector', "spice_points_per_decade", "spice_resistance_test", "temperature"]
 
 
 if platform != "win32":
-    class SPICE_op_Amp_gain(CalculationStrategy):
+    class SPICE_op_Amp_gain(SpiceStrategy):
         def calculate(self, dependencies: dict, parameters: InputParameters):
             temperature = parameters.data['temperature']
-            f_start = parameters.data['f_start']
-            f_stop = parameters.data['f_stop']
+            spice_points_per_decade = parameters.data['spice_points_per_decade']
 
             R1 = parameters.data['R1']
             R2 = parameters.data['R2']
@@ -75,7 +75,6 @@ if platform != "win32":
             R5 = parameters.data['R5']
 
             frequency_vector = dependencies['frequency_vector']['data']
-            logger = Logging.setup_logging()
 
             # convert temperature to degrees Celsius
             temperature = temperature - 273.15
@@ -91,10 +90,6 @@ if platform != "win32":
             amp = 0.1 @ u_V
             freq = 1 @ u_kHz
 
-            # Define transient simulation step time and stop time
-            steptime = 1 @ u_us
-            finaltime = 5 * (1 / freq)
-
             source = circuit.SinusoidalVoltageSource(1, 'input', circuit.gnd, amplitude=amp, frequency=freq)
             circuit.V(2, '+Vcc', circuit.gnd, 15 @ u_V)
             circuit.V(3, '-Vcc', circuit.gnd, -15 @ u_V)
@@ -108,23 +103,14 @@ if platform != "win32":
             circuit.R('L', 'out', circuit.gnd, R5@ u_Ω)
 
             ##*********************************************
-            ## Simulation: Transient Analysis
-            simulator = circuit.simulator(temperature=temperature, nominal_temperature=25)
-            analysis = simulator.transient(step_time=steptime, end_time=finaltime)
-            analysis = simulator.ac(start_frequency=f_start @ u_Hz, stop_frequency=f_stop @ u_Hz, number_of_points=10,
-                                    variation='dec')  # 1 to 1MHz, 10 points per decade
-
-            #print all nodes in the analysis
-
-            input = abs(analysis['input'])
-            output = abs(analysis['out'])
-
-            simulation_freq = array(analysis.frequency)
+            ## Simulation: AC Analysis
+            analysis = simulate(circuit, 'ac', temperature,
+                                **get_frequency_sweep(frequency_vector, spice_points_per_decade))
 
-            interpolated_input = interp(frequency_vector, simulation_freq, input)
-            interpolated_output = interp(frequency_vector, simulation_freq, output)
+            input = on_frequency_vector(frequency_vector, analysis.frequency, abs(analysis['input']))
+            output = on_frequency_vector(frequency_vector, analysis.frequency, abs(analysis['out']))
 
-            result = column_stack((frequency_vector, interpolated_input, interpolated_output))
+            result = ColumnarData(frequency_vector, (input, output))
 
             return {
                     "data": result,
@@ -134,14 +120,14 @@ if platform != "win32":
 
         @staticmethod
         def get_dependencies():
-            return ['frequency_vector', "f_start", "f_stop", "spice_resistance_test", "temperature", "R1", "R2", "R3", "R4", "R5"]
+            return ['frequency_vector', "spice_points_per_decade", "spice_resistance_test", "temperature", "R1", "R2",
+                    "R3", "R4", "R5"]
 
 
-class SPICE_op_Amp_noise(CalculationStrategy):
+class SPICE_op_Amp_noise(SpiceStrategy):
     def calculate(self, dependencies: dict, parameters: InputParameters):
         temperature = parameters.data['temperature']
-        f_start = parameters.data['f_start']
-        f_stop = parameters.data['f_stop']
+        spice_points_per_decade = parameters.data['spice_points_per_decade']
 
         R1 = parameters.data['R1']
         R2 = parameters.data['R2']
@@ -150,7 +136,6 @@ class SPICE_op_Amp_noise(CalculationStrategy):
         R5 = parameters.data['R5']
 
         frequency_vector = dependencies['frequency_vector']['data']
-        logger = Logging.setup_logging()
 
         # Convert temperature to degrees Celsius
         temperature = temperature - 273.15
@@ -162,6 +147,8 @@ class SPICE_op_Amp_noise(CalculationStrategy):
         circuit = Circuit('Op-amp circuits - Noise Analysis for Non-inverting Amplifier')
         circuit.include(opAMP)
 
+        # Input source of the noise analysis (element Vinput), the noise is also referred to this input
+        circuit.SinusoidalVoltageSource('input', 'input', circuit.gnd, amplitude=1 @ u_V)
         circuit.V(2, '+Vcc', circuit.gnd, 15 @ u_V)
         circuit.V(3, '-Vcc', circuit.gnd, -15 @ u_V)
 
@@ -175,19 +162,16 @@ class SPICE_op_Amp_noise(CalculationStrategy):
 
         ##*********************************************
         ## Simulation: Noise Analysis
-        simulator = circuit.simulator(temperature=temperature, nominal_temperature=25)
-        analysis = simulator.noise(output_node='out', input_node='input', start_frequency=f_start @ u_Hz,
-                                   stop_frequency=f_stop @ u_Hz, number_of_points=len(frequency_vector),
-                                   variation='lin')
+        sweep = get_frequency_sweep(frequency_vector, spice_points_per_decade)
+        analysis = simulate(circuit, 'noise', temperature, output_node='out', ref_node=circuit.gnd, src='Vinput',
+                            variation=sweep['variation'], points=sweep['number_of_points'],
+                            start_frequency=sweep['start_frequency'], stop_frequency=sweep['stop_frequency'])
 
-        # Retrieve noise data for each frequency
-        frequency = array(analysis.frequency)
-        output_noise_voltage = array(analysis.noise_output_voltage_density)
+        # Retrieve noise data for each frequency of the frequency vector
+        output_noise_voltage = on_frequency_vector(frequency_vector, analysis.frequency,
+                                                   array(analysis.noise_output_voltage_density))
 
-        # Interpolate the results onto the frequency vector if necessary
-        interpolated_noise = interp(frequency_vector, frequency, output_noise_voltage)
-
-        result = column_stack((frequency_vector, interpolated_noise))
+        result = ColumnarData(frequency_vector, (output_noise_voltage,))
 
         return {
             "data": result,
@@ -197,11 +181,11 @@ class SPICE_op_Amp_noise(CalculationStrategy):
 
     @staticmethod
     def get_dependencies():
-        return ['frequency_vector', "f_start", "f_stop", "temperature", "R1", "R2", "R3", "R4", "R5"]
+        return ['frequency_vector', "spice_points_per_decade", "temperature", "R1", "R2", "R3", "R4", "R5"]
 
 
 if platform != "win32":
-    class SPICE_op_Amp_transcient(CalculationStrategy):
+    class SPICE_op_Amp_transcient(SpiceStrategy):
         def calculate(self, dependencies: dict, parameters: InputParameters):
             temperature = parameters.data['temperature']
             f_start = parameters.data['f_start']
@@ -216,7 +200,6 @@ if platform != "win32":
             resistance = dependencies['resistance']['data']
 
             frequency_vector = dependencies['frequency_vector']['data']
-            logger = Logging.setup_logging()
 
             # convert temperature to degrees Celsius
             temperature = temperature - 273.15
@@ -250,8 +233,7 @@ if platform != "win32":
 
             ##*********************************************
             ## Simulation: Transient Analysis
-            simulator = circuit.simulator(temperature=temperature, nominal_temperature=25)
-            analysis = simulator.transient(step_time=steptime, end_time=finaltime)
+            analysis = simulate(circuit, 'transient', temperature, step_time=steptime, end_time=finaltime)
 
             # print all nodes in the analysis
 
@@ -260,7 +242,7 @@ if platform != "win32":
 
             time = array(analysis.time)
 
-            result = column_stack((time, input, output))
+            result = ColumnarData(time, (input, output))
 
             return {
                 "data": result,
@@ -274,12 +256,10 @@ if platform != "win32":
                     "R4", "R5"]
 
 
-class SPICE_impedance(CalculationStrategy):
+class SPICE_impedance(SpiceStrategy):
     def calculate(self, dependencies: dict, parameters: InputParameters):
         temperature = parameters.data['temperature']
-        f_start = parameters.data['f_start']
-        f_stop = parameters.data['f_stop']
-
+        spice_points_per_decade = parameters.data['spice_points_per_decade']
 
         resistance = dependencies['resistance']['data']
         capacitance = dependencies['capacitance']['data']
@@ -287,10 +267,6 @@ class SPICE_impedance(CalculationStrategy):
 
         frequency_vector = dependencies['frequency_vector']['data']
 
-        nb_points_per_decade = parameters.data['nb_points_per_decade']
-
-        logger = Logging.setup_logging()
-
         # convert temperature to degrees Celsius
         temperature = temperature - 273.15
 
@@ -304,19 +280,14 @@ class SPICE_impedance(CalculationStrategy):
 
         circuit.R2.plus.add_current_probe(circuit)
 
-        simulator = circuit.simulator(temperature=temperature, nominal_temperature=25)
-        analysis = simulator.ac(start_frequency=f_start @ u_Hz, stop_frequency=f_stop @ u_Hz, number_of_points=nb_points_per_decade,
-                                variation='dec')  # 1 to 1MHz, 10 points per decade
+        analysis = simulate(circuit, 'ac', temperature,
+                            **get_frequency_sweep(frequency_vector, spice_points_per_decade))
 
-        frequency = analysis.frequency
         voltage_N1 = abs(analysis['N001'])
         current_R2 = abs(analysis['vr2_plus'])
 
-        Z = voltage_N1 / current_R2
-
-        simulation_freq = array(analysis.frequency)
-        interpolated_Z = interp(frequency_vector, simulation_freq, Z)
-        result = column_stack((frequency_vector, interpolated_Z))
+        Z = on_frequency_vector(frequency_vector, analysis.frequency, voltage_N1 / current_R2)
+        result = ColumnarData(frequency_vector, (Z,))
 
         return {
             "data": result,
@@ -326,7 +297,7 @@ class SPICE_impedance(CalculationStrategy):
 
     @staticmethod
     def get_dependencies():
-        return ['frequency_vector', "f_start", "f_stop", "temperature", "capacitance",
+        return ['frequency_vector', "spice_points_per_decade", "temperature", "capacitance",
                 "inductance", "resistance"]
 
 
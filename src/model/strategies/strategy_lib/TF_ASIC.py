@@ -1,6 +1,5 @@
-from numpy import column_stack
 from src.model.input_parameters import InputParameters
-from src.model.strategies import CalculationStrategy
+from src.model.strategies import CalculationStrategy, ColumnarData
 
 
 class TF_ASIC_Stage_1_Strategy_linear(CalculationStrategy):
@@ -25,7 +24,7 @@ class TF_ASIC_Stage_1_Strategy_linear(CalculationStrategy):
         denominator = (1 + (frequency_vector / stage_1_cutting_freq) ** 2) ** 0.5
         tf_asic = numerator / denominator
 
-        results = column_stack((frequency_vector, tf_asic))
+        results = ColumnarData(frequency_vector, (tf_asic,))
 
         return {
             "data": results,
@@ -61,7 +60,7 @@ class TF_ASIC_Stage_2_Strategy_linear(CalculationStrategy):
         denominator = (1 + (frequency_vector / stage_2_cutting_freq) ** 2) ** 0.5
         tf_asic = numerator / denominator
 
-        results = column_stack((frequency_vector, tf_asic))
+        results = ColumnarData(frequency_vector, (tf_asic,))
 
         return {
             "data": results,
@@ -89,12 +88,12 @@ class TF_ASIC_Strategy_linear(CalculationStrategy):
     """
 
     def calculate(self, dependencies: dict, parameters: InputParameters):
-        tf_asic_stage1 = dependencies["TF_ASIC_Stage_1"]["data"][:, 1]
-        tf_asic_stage2 = dependencies["TF_ASIC_Stage_2"]["data"][:, 1]
+        tf_asic_stage1 = dependencies["TF_ASIC_Stage_1"]["data"][..., 1]
+        tf_asic_stage2 = dependencies["TF_ASIC_Stage_2"]["data"][..., 1]
 
         frequency_vector = dependencies["frequency_vector"]["data"]
 
-        results = column_stack((frequency_vector, tf_asic_stage1 * tf_asic_stage2))
+        results = ColumnarData(frequency_vector, (tf_asic_stage1 * tf_asic_stage2,))
 
         return {
             "data": results,
@@ -1,4 +1,4 @@
-from numpy import pi
+from numpy import pi, floor, nan, where
 from src.model.input_parameters import InputParameters
 from src.model.strategies import CalculationStrategy
 from scipy.constants import epsilon_0
@@ -37,8 +37,10 @@ class AnalyticalCapacitanceStrategy(CalculationStrategy):
         capa_triwire = parameters.data["capa_triwire"]
         nb_spire = parameters.data["nb_spire"]
 
-        nb_spire_per_layer = int(len_coil / diam_wire)
-        nb_layer = int(nb_spire / nb_spire_per_layer) + 1
+        nb_spire_per_layer = floor(len_coil / diam_wire)
+        # a wire wider than the coil can't be wound : the design is invalid, its capacitance is NaN
+        nb_spire_per_layer = where(nb_spire_per_layer >= 1, nb_spire_per_layer, nan)[()]
+        nb_layer = floor(nb_spire / nb_spire_per_layer) + 1
 
         result = (
                 (pi * epsilon_0 * epsilon_insulator * len_coil)
@@ -2,15 +2,24 @@ import numpy as np
 
 from src.model.input_parameters import InputParameters
 from src.model.strategies import CalculationStrategy
+from src.model.strategies.strategy_lib.impedance import AnalyticalImpedanceStrategy
+from src.model.strategies.strategy_lib.resonance import AnalyticalResonanceFrequencyStrategy
 
 
 class FrequencyVectorStrategy(CalculationStrategy):
+    """Logarithmic frequency vector, with exactly nb_points_per_decade points per decade from f_start
+
+    The points are f_start * 10 ** (k / nb_points_per_decade) up to f_stop, the points of a SPICE decade sweep
+    (.ac dec) : the SPICE strategies simulate the frequency vector itself, without interpolation.
+    """
+
     def calculate(self, dependencies: dict, parameters: InputParameters):
         f_start = parameters.data['f_start']
         f_stop = parameters.data['f_stop']
         nb_points_per_decade = parameters.data['nb_points_per_decade']
-        frequency_vector = np.logspace(np.log10(f_start), np.log10(f_stop),
-                                       int((np.log10(f_stop) - np.log10(f_start)) * nb_points_per_decade))
+        # the tolerance keeps f_stop when the band holds a whole number of steps
+        nb_steps = int(np.floor((np.log10(f_stop) - np.log10(f_start)) * nb_points_per_decade + 1e-9))
+        frequency_vector = f_start * 10 ** (np.arange(nb_steps + 1) / nb_points_per_decade)
         return {
             "data": frequency_vector,
             "labels": ["Frequency"],
@@ -22,3 +31,63 @@ class FrequencyVectorStrategy(CalculationStrategy):
         return ['f_start', 'f_stop', 'nb_points_per_decade']
 
 
+class AdaptiveFrequencyVectorStrategy(CalculationStrategy):
+    """Frequency vector refined around the features of the impedance
+
+    Starts from the logarithmic grid of FrequencyVectorStrategy (nb_points_per_decade should then be low, 10 to
+    50 points per decade) and inserts the resonance frequency (see AnalyticalResonanceFrequencyStrategy). Then
+    each interval is split at its geometric middle as long as log10 of the impedance, at the middle, deviates by
+    more than tolerance from the straight line between both ends (at most max_refinements times).
+
+    The impedance resonance drives the shape of the CLTF, the noises and the NEMI, which get refined with it.
+    The grid isn't uniform : downstream strategies must only use the frequency vector values, not its spacing.
+    In batch mode the grid is shared by all the parameter sets, an interval is split if any of them requires it.
+
+    The refinement always follows the analytical impedance (AnalyticalImpedanceStrategy), whatever the strategy
+    of the impedance node : the frequency vector is the first node of the model, the other nodes (impedance,
+    CLTF, NEMI ...) depend on it and can't drive its refinement.
+    """
+
+    def __init__(self, tolerance=1e-3, max_refinements=16):
+        self.tolerance = tolerance
+        self.max_refinements = max_refinements
+
+    def log_impedance(self, dependencies, frequency_vector):
+        impedance_dependencies = dict(dependencies)
+        impedance_dependencies["frequency_vector"] = {"data": frequency_vector}
+        impedance = AnalyticalImpedanceStrategy().calculate(impedance_dependencies, None)["data"][..., 1]
+        return np.log10(impedance).reshape(-1, len(frequency_vector))
+
+    def calculate(self, dependencies: dict, parameters: InputParameters):
+        f_start = parameters.data['f_start']
+        f_stop = parameters.data['f_stop']
+        frequency_vector = FrequencyVectorStrategy().calculate(dependencies, parameters)["data"]
+
+        resonance_frequency = AnalyticalResonanceFrequencyStrategy().calculate(dependencies, parameters)["data"]
+        resonance_frequency = np.ravel(resonance_frequency)
+        resonance_frequency = resonance_frequency[(resonance_frequency > f_start) & (resonance_frequency < f_stop)]
+        frequency_vector = np.union1d(frequency_vector, resonance_frequency)
+
+        log_impedance = self.log_impedance(dependencies, frequency_vector)
+        for _ in range(self.max_refinements):
+            middles = np.sqrt(frequency_vector[:-1] * frequency_vector[1:])
+            log_impedance_middles = self.log_impedance(dependencies, middles)
+            error = np.abs(log_impedance_middles - (log_impedance[:, :-1] + log_impedance[:, 1:]) / 2).max(axis=0)
+            refine = error > self.tolerance
+            if not refine.any():
+                break
+
+            frequency_vector = np.concatenate((frequency_vector, middles[refine]))
+            order = np.argsort(frequency_vector)
+            frequency_vector = frequency_vector[order]
+            log_impedance = np.concatenate((log_impedance, log_impedance_middles[:, refine]), axis=1)[:, order]
+
+        return {
+            "data": frequency_vector,
+            "labels": ["Frequency"],
+            "units": ["Hz"]
+        }
+
+    @staticmethod
+    def get_dependencies():
+        return ['f_start', 'f_stop', 'nb_points_per_decade', 'resistance', 'inductance', 'capacitance']
@@ -0,0 +1,180 @@
+import numpy as np
+from numpy import pi
+from scipy.constants import k
+
+from src.model.input_parameters import InputParameters
+from src.model.strategies import CalculationStrategy, ColumnarData
+
+
+class FusedNoiseModel(CalculationStrategy):
+    r"""Single pass computation of the whole noise chain of the SCM
+
+    Computes the same quantities as NSD_normalisation, CLTF_Strategy, NSD_R_cr, NSD_R_Coil, NSD_e_en, NSD_e_in,
+    NSD_Total and NEMI (see their documentation for the models), sharing their common terms
+    (:math:`\omega^2`, :math:`(1 - L . C . \omega^2)^2`, the normalisation ...) and writing every column in
+    preallocated buffers instead of allocating and stacking each node's output.
+
+    The individual nodes are still exposed by the Fused_* strategies below, which return views of this node's
+    columns (see FUSED_NOISE_STRATEGY_MAP in src/controler/models/scm_fused_noise_model.py).
+    """
+
+    LABELS = ["Frequency", "NSD_normalisation", "CLTF", "CLTF_filtered", "NSD_R_cr", "NSD_R_cr_filtered",
+              "NSD_R_Coil", "NSD_R_Coil_filtered", "NSD_e_en", "NSD_e_en_filtered", "NSD_e_in", "NSD_e_in_filtered",
+              "NSD_Total", "NSD_filtered_Total", "NEMI", "NEMI_filtered"]
+    UNITS = ["Hz", " ", "m^2/s", "m^2/s", "V/sqrt(Hz)", "V/sqrt(Hz)", "V/sqrt(Hz)", "V/sqrt(Hz)", "V/sqrt(Hz)",
+             "V/sqrt(Hz)", "V/sqrt(Hz)", "V/sqrt(Hz)", "V/sqrt(Hz)", "V/sqrt(Hz)", "T/sqrt(Hz)", "T/sqrt(Hz)"]
+
+    def calculate(self, dependencies: dict, parameters: InputParameters):
+        temperature = parameters.data["temperature"]
+        feedback_resistance = parameters.data["feedback_resistance"]
+        mutual_inductance = parameters.data["mutual_inductance"]
+        e_in = parameters.data["e_in"]
+        nb_spire = parameters.data["nb_spire"]
+        ray_spire = parameters.data["ray_spire"]
+        R = dependencies["resistance"]["data"]
+        L = dependencies["inductance"]["data"]
+        C = dependencies["capacitance"]["data"]
+        mu_app = dependencies["mu_app"]["data"]
+        impedance = dependencies["impedance"]["data"][..., 1]
+        h1 = dependencies["TF_ASIC_Stage_1"]["data"][..., 1]
+        h2 = dependencies["TF_ASIC_Stage_2"]["data"][..., 1]
+        flicker = dependencies["PSD_Flicker"]["data"][..., 1]
+        frequency_vector = dependencies["frequency_vector"]["data"]
+
+        shape = np.broadcast_shapes(*(np.shape(value) for value in (
+            temperature, feedback_resistance, mutual_inductance, e_in, nb_spire, ray_spire, R, L, C, mu_app,
+            impedance, h1, flicker, frequency_vector)))
+        # one buffer per column rather than a single block, the allocator recycles blocks of this size between calls
+        columns = tuple(np.empty(shape) for _ in self.LABELS[1:])
+        (normalisation, cltf, cltf_filtered, r_cr, r_cr_filtered, r_coil, r_coil_filtered, e_en, e_en_filtered,
+         e_in_nsd, e_in_filtered, total, total_filtered, nemi, nemi_filtered) = columns
+
+        # the shared terms are held by the columns written last, they are overwritten once no longer needed
+        omega = np.multiply(2 * pi, frequency_vector, out=total)
+        omega2 = np.square(omega, out=nemi)
+        resonance_term = np.multiply(-L * C, omega2, out=nemi_filtered)
+        resonance_term += 1
+        np.square(resonance_term, out=resonance_term)
+        feedback_gain = np.multiply(h1, mutual_inductance / feedback_resistance, out=total_filtered)
+
+        # (1 - L.C.w^2)^2 + w^2.(R.C + M.H1/R_cr)^2
+        np.add(R * C, feedback_gain, out=normalisation)
+        np.square(normalisation, out=normalisation)
+        normalisation *= omega2
+        normalisation += resonance_term
+        np.sqrt(normalisation, out=normalisation)
+        inverse_normalisation = np.divide(1, normalisation, out=e_in_filtered)
+
+        # |H1|.sqrt((1 - L.C.w^2)^2 + (w.R.C)^2) / normalisation, shared by e_en and e_in
+        coil_term = np.multiply((R * C) ** 2, omega2, out=e_en_filtered)
+        coil_term += resonance_term
+        np.sqrt(coil_term, out=coil_term)
+        coil_term *= inverse_normalisation
+        coil_term *= abs(h1)
+
+        np.multiply(nb_spire * (pi * ray_spire ** 2) * mu_app, omega, out=cltf)
+        cltf *= inverse_normalisation
+        np.multiply(cltf, h2, out=cltf_filtered)
+
+        np.multiply(np.sqrt(abs(4 * k * temperature * feedback_resistance)), omega, out=r_cr)
+        r_cr *= abs(feedback_gain)
+        r_cr *= inverse_normalisation
+        np.multiply(np.sqrt(abs(4 * k * temperature * R)), inverse_normalisation, out=r_coil)
+        np.multiply(abs(flicker), coil_term, out=e_en)
+        np.multiply(abs(impedance), coil_term, out=e_in_nsd)
+        e_in_nsd *= abs(e_in * 1e-3)
+
+        for nsd, nsd_filtered in ((r_cr, r_cr_filtered), (r_coil, r_coil_filtered), (e_en, e_en_filtered),
+                                  (e_in_nsd, e_in_filtered)):
+            np.multiply(nsd, h2, out=nsd_filtered)
+
+        np.square(r_cr, out=total)
+        for nsd in (r_coil, e_en, e_in_nsd):
+            total += nsd ** 2
+        np.sqrt(total, out=total)
+        # every filtered NSD is the NSD times H2
+        np.multiply(total, abs(h2), out=total_filtered)
+
+        np.divide(total, cltf, out=nemi)
+        np.divide(total_filtered, cltf, out=nemi_filtered)
+
+        return {
+            "data": ColumnarData(frequency_vector, columns),
+            "labels": self.LABELS,
+            "units": self.UNITS
+        }
+
+    @staticmethod
+    def get_dependencies():
+        return ["temperature", "feedback_resistance", "mutual_inductance", "e_in", "nb_spire", "ray_spire",
+                "resistance", "inductance", "capacitance", "mu_app", "impedance", "TF_ASIC_Stage_1",
+                "TF_ASIC_Stage_2", "PSD_Flicker", "frequency_vector"]
+
+
+class FusedNoiseView(CalculationStrategy):
+    """Exposes some columns of the noise_model node (see FusedNoiseModel) as a node, without copying them"""
+
+    LABELS = []
+    UNITS = []
+
+    def calculate(self, dependencies: dict, parameters: InputParameters):
+        noise_model = dependencies["noise_model"]
+        data = noise_model["data"]
+        columns = tuple(data.column(noise_model["labels"].index(label)) for label in self.LABELS[1:])
+        return {
+            "data": ColumnarData(data.axis, columns),
+            "labels": self.LABELS,
+            "units": self.UNITS
+        }
+
+    @staticmethod
+    def get_dependencies():
+        return ["noise_model"]
+
+
+class Fused_NSD_normalisation(FusedNoiseView):
+    """NSD_normalisation computed by the noise_model node"""
+    LABELS = ["Frequency", "NSD_normalisation"]
+    UNITS = ["Hz", " "]
+
+
+class Fused_CLTF(FusedNoiseView):
+    """CLTF computed by the noise_model node"""
+    LABELS = ["Frequency", "CLTF", "CLTF_filtered"]
+    UNITS = ["Hz", "m^2/s", "m^2/s"]
+
+
+class Fused_NSD_R_cr(FusedNoiseView):
+    """NSD_R_cr computed by the noise_model node"""
+    LABELS = ["Frequency", "NSD_R_cr", "NSD_R_cr_filtered"]
+    UNITS = ["Hz", "V/sqrt(Hz)", "V/sqrt(Hz)"]
+
+
+class Fused_NSD_R_Coil(FusedNoiseView):
+    """NSD_R_Coil computed by the noise_model node"""
+    LABELS = ["Frequency", "NSD_R_Coil", "NSD_R_Coil_filtered"]
+    UNITS = ["Hz", "V/sqrt(Hz)", "V/sqrt(Hz)"]
+
+
+class Fused_NSD_e_en(FusedNoiseView):
+    """NSD_e_en computed by the noise_model node"""
+    LABELS = ["Frequency", "NSD_e_en", "NSD_e_en_filtered"]
+    UNITS = ["Hz", "V/sqrt(Hz)", "V/sqrt(Hz)"]
+
+
+class Fused_NSD_e_in(FusedNoiseView):
+    """NSD_e_in computed by the noise_model node"""
+    LABELS = ["Frequency", "NSD_e_in", "NSD_e_in_filtered"]
+    UNITS = ["Hz", "V/sqrt(Hz)", "V/sqrt(Hz)"]
+
+
+class Fused_NSD_Total(FusedNoiseView):
+    """NSD_Total computed by the noise_model node"""
+    LABELS = ["Frequency", "NSD_Total", "NSD_filtered_Total"]
+    UNITS = ["Hz", "V/sqrt(Hz)", "V/sqrt(Hz)"]
+
+
+class Fused_NEMI(FusedNoiseView):
+    """NEMI computed by the noise_model node"""
+    LABELS = ["Frequency", "NEMI", "NEMI_filtered"]
+    UNITS = ["Hz", "T/sqrt(Hz)", "T/sqrt(Hz)"]
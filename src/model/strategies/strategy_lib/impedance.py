@@ -1,6 +1,7 @@
-from numpy import pi, sqrt, column_stack
+from numpy import pi
 from src.model.input_parameters import InputParameters
-from src.model.strategies import CalculationStrategy
+from src.model.strategies import CalculationStrategy, ColumnarData
+from src.model.strategies.backend import evaluate
 
 
 class AnalyticalImpedanceStrategy(CalculationStrategy):
@@ -26,11 +27,13 @@ class AnalyticalImpedanceStrategy(CalculationStrategy):
 
         frequency_vector = dependencies["frequency_vector"]["data"]
 
-        impedance_num = (R ** 2) + (L * 2 * pi * frequency_vector) ** 2
-        impedance_den = (1 - L * C * (2 * pi * frequency_vector) ** 2) ** 2 \
-                        + (R * C * (2 * pi * frequency_vector)) ** 2
-        impedance_values = sqrt(impedance_num / impedance_den)
-        result = column_stack((frequency_vector, impedance_values))
+        omega = 2 * pi * frequency_vector
+        # the scalar factors are computed once, outside the expression on the vectors
+        impedance_values = evaluate(
+            "sqrt((R2 + (L2pi * frequency_vector) ** 2) / ((1 - LC * omega ** 2) ** 2 + (RC * omega) ** 2))",
+            {"R2": R ** 2, "L2pi": L * 2 * pi, "LC": L * C, "RC": R * C, "frequency_vector": frequency_vector,
+             "omega": omega})
+        result = ColumnarData(frequency_vector, (impedance_values,))
 
         return {
             "data": result,
@@ -1,4 +1,4 @@
-from numpy import pi
+from numpy import pi, floor, nan, where
 from src.model.input_parameters import InputParameters
 from src.model.strategies import CalculationStrategy
 
@@ -71,26 +71,25 @@ class MultiLayerResistanceStrategy(CalculationStrategy):
         kapton_thick = parameters.data["kapton_thick"]
 
         # determine the number of spires that fit in the length of the coil (rounded down)
-        Ns_mc_per_layer = int(len_coil / diam_wire)
+        Ns_mc_per_layer = floor(len_coil / diam_wire)
+        # a wire wider than the coil can't be wound : the design is invalid, its resistance is NaN
+        Ns_mc_per_layer = where(Ns_mc_per_layer >= 1, Ns_mc_per_layer, nan)[()]
         # determine the number of layers to have *N_spire_main_coil* in the end (rounded up)
-        N_layers = int(N_spire_main_coil / Ns_mc_per_layer) + 1
+        N_layers = floor(N_spire_main_coil / Ns_mc_per_layer) + 1
         # N_layers = int((N_spire_main_coil / Ns_mc_per_layer) + 1)
 
         # calculate the length of wire needed to wind the main coil
         length_main_coil = pi * Ns_mc_per_layer * N_layers \
             * (diam_out_mandrel + N_layers * diam_wire + (N_layers - 1) * kapton_thick)
 
-        # if no spire are asked for the feedback coil...
-        if N_spire_feedback == 0:
-            # ... just consider a wire of the same length as the coil
-            length_feedback = len_coil
-        else:
-            # ... else, determine the number of spires in each layer of the feedback coil (rounded up)
-            # Ns_fb_per_layer = int((N_spire_feedback / N_layers) + 1)
-            Ns_fb_per_layer = int(N_spire_feedback / N_layers) + 1
-            # calculate the length of wire needed to wind the feedback coil
-            length_feedback = pi * Ns_fb_per_layer * N_layers \
-                * (diam_out_mandrel + (N_layers + 1) * diam_wire + (N_layers - 1) * kapton_thick)
+        # determine the number of spires in each layer of the feedback coil (rounded up)
+        Ns_fb_per_layer = floor(N_spire_feedback / N_layers) + 1
+        # calculate the length of wire needed to wind the feedback coil
+        length_feedback = pi * Ns_fb_per_layer * N_layers \
+            * (diam_out_mandrel + (N_layers + 1) * diam_wire + (N_layers - 1) * kapton_thick)
+        # if no spire are asked for the feedback coil, just consider a wire of the same length as the coil
+        # ([()] turns the 0-d array returned by *where* back into a scalar when no batch is evaluated)
+        length_feedback = where(N_spire_feedback == 0, len_coil, length_feedback)[()]
 
         # calculate the resistance of the antenna as that of the total wire length used to wind
         value = rho_wire * (length_main_coil + length_feedback)
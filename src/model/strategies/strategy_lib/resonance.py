@@ -0,0 +1,46 @@
+from numpy import pi, sqrt, where
+from src.model.input_parameters import InputParameters
+from src.model.strategies import CalculationStrategy
+
+
+class AnalyticalResonanceFrequencyStrategy(CalculationStrategy):
+    """Analytical resonance frequency of the coil, the frequency of the maximum of the impedance (see
+    AnalyticalImpedanceStrategy)
+
+    .. math::
+
+        \omega_r^2 = \\frac{\sqrt{L^2 + 2 . L . C . R^2} - R^2 . C}{L^2 . C}
+
+        f_r = \\frac{\omega_r}{2 \pi}
+
+    with:
+        - :math:`R` : resistance of the coil
+        - :math:`L` : inductance of the coil
+        - :math:`C` : capacitance of the coil
+
+    It is the root of the derivative of :math:`|Z|^2` with respect to :math:`\omega^2`, it doesn't need the
+    frequency vector and isn't limited by its resolution. When :math:`\omega_r^2 \leq 0` the impedance decreases
+    from the DC and the resonance frequency is 0 Hz. An invalid design (NaN resistance, inductance or
+    capacitance) has a NaN resonance frequency.
+
+    """
+
+    def calculate(self, dependencies: dict, parameters: InputParameters):
+        R = dependencies["resistance"]["data"]
+        L = dependencies["inductance"]["data"]
+        C = dependencies["capacitance"]["data"]
+
+        # Rationalised form of the formula above, to avoid the cancellation of the numerator when R^2.C ~ L
+        root = sqrt(L ** 2 + 2 * L * C * R ** 2)
+        omega_square = (L ** 2 + 2 * L * C * R ** 2 - (R ** 2 * C) ** 2) / (L ** 2 * C * (root + R ** 2 * C))
+        result = where(omega_square <= 0, 0., sqrt(abs(omega_square)) / (2 * pi))[()]
+
+        return {
+            "data": result,
+            "labels": ["Resonance frequency"],
+            "units": ["Hz"]
+        }
+
+    @staticmethod
+    def get_dependencies():
+        return ["resistance", "inductance", "capacitance"]
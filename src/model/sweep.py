@@ -0,0 +1,234 @@
+"""
+ src/model/sweep.py
+ PLASMAG 2024 Software, LPP
+"""
+import json
+from functools import partial
+from multiprocessing import Pool
+
+import numpy as np
+from pint import UnitRegistry
+from scipy.stats import qmc
+
+from src.controler.pool_worker import call_in_worker, create_worker_controller, init_worker
+from src.model.result_writer import ResultWriter, extract_output
+
+ureg: UnitRegistry = UnitRegistry()
+
+SWEEP_METHODS = ["grid", "latin_hypercube", "sobol"]
+DEFAULT_OUTPUTS = ["resistance", "inductance", "capacitance", "impedance", "CLTF", "NEMI"]
+
+
+def load_parameters(path):
+    """
+    Loads a parameters file in the format of data/default.json.
+
+    Parameters:
+        path (str): Path of the JSON file.
+
+    Returns:
+        tuple: The parameters dict expected by CalculationController (default values converted to the target
+        units) and the attributes of each parameter (min, max, units ...).
+    """
+    with open(path, "r") as file:
+        sections = json.load(file)
+
+    parameters = {}
+    attributes = {}
+    for section in sections.values():
+        if not isinstance(section, dict):
+            continue
+        for name, attrs in section.items():
+            if not isinstance(attrs, dict) or "default" not in attrs:
+                continue
+            attributes[name] = attrs
+            parameters[name] = convert_to_target_unit(float(attrs["default"]), attrs)
+    return parameters, attributes
+
+
+def convert_to_target_unit(value, attrs):
+    """Converts a value (or an array of values) from the input unit of a parameter to its target unit"""
+    input_unit = attrs.get("input_unit", "")
+    target_unit = attrs.get("target_unit", "")
+    if input_unit and target_unit:
+        return (value * ureg(input_unit)).to(ureg(target_unit)).magnitude
+    return value
+
+
+def generate_designs(sweep, attributes):
+    """
+    Generates the designs of a sweep specification.
+
+    The sweep specification is a dict::
+
+        {
+            "method": "grid",  # or "latin_hypercube", "sobol"
+            "nb_samples": 1000,  # latin_hypercube and sobol only
+            "seed": 0,  # latin_hypercube and sobol only, optional
+            "parameters": {
+                "nb_spire": {"min": 8000, "max": 15000, "nb_points": 8},  # nb_points : grid only
+                "capa_tuning": {"min": 1, "max": 1000, "log": true},  # sampled on a log scale
+                "len_coil": {"values": [100, 150, 200]}  # grid only
+            }
+        }
+
+    The values are given in the input unit of the parameters (as in the parameters file) and converted to their
+    target unit.
+
+    Parameters:
+        sweep (dict): The sweep specification.
+        attributes (dict): The attributes of the parameters, see load_parameters.
+
+    Returns:
+        dict: The values of each swept parameter, arrays of shape (nb_designs,).
+    """
+    method = sweep.get("method", "grid")
+    if method not in SWEEP_METHODS:
+        raise ValueError(f"Unknown sweep method {method}, expected one of {SWEEP_METHODS}")
+
+    specs = sweep["parameters"]
+    for name in specs:
+        if name not in attributes:
+            raise ValueError(f"Swept parameter {name} is not in the parameters file")
+
+    if method == "grid":
+        axes = []
+        for name, spec in specs.items():
+            if "values" in spec:
+                axes.append(np.asarray(spec["values"], dtype=float))
+            elif spec.get("log", False):
+                axes.append(np.geomspace(spec["min"], spec["max"], spec["nb_points"]))
+            else:
+                axes.append(np.linspace(spec["min"], spec["max"], spec["nb_points"]))
+        grids = np.meshgrid(*axes, indexing="ij")
+        samples = {name: grid.ravel() for name, grid in zip(specs, grids)}
+    else:
+        sampler_class = qmc.LatinHypercube if method == "latin_hypercube" else qmc.Sobol
+        sampler = sampler_class(d=len(specs), seed=sweep.get("seed"))
+        unit_samples = sampler.random(sweep["nb_samples"])
+        samples = {}
+        for index, (name, spec) in enumerate(specs.items()):
+            if spec.get("log", False):
+                low, high = np.log10(spec["min"]), np.log10(spec["max"])
+                samples[name] = 10 ** (low + unit_samples[:, index] * (high - low))
+            else:
+                samples[name] = spec["min"] + unit_samples[:, index] * (spec["max"] - spec["min"])
+
+    return {name: convert_to_target_unit(values, attributes[name]) for name, values in samples.items()}
+
+
+def evaluate_batch(controller, parameters, designs, outputs):
+    """
+    Evaluates a batch of designs with the batch mode of the engine (see InputParameters).
+
+    Parameters:
+        controller (CalculationController): The controller running the calculations.
+        parameters (dict): The fixed parameters.
+        designs (dict): The values of the swept parameters, arrays of shape (nb_designs,).
+        outputs (list): The names of the nodes to return.
+
+    Returns:
+        dict: The frequency vector and the output of each node, see extract_output.
+    """
+    nb_designs = len(next(iter(designs.values())))
+    results = controller.update_parameters(dict(parameters, **designs))
+    arrays = {name: np.array(extract_output(results[name], nb_designs)) for name in outputs}
+    arrays["frequency_vector"] = np.asarray(results["frequency_vector"]["data"])
+    return arrays
+
+
+def evaluate_designs(controller, parameters, designs, outputs):
+    """
+    Evaluates a batch of designs, see evaluate_batch. If the batch fails, the designs are evaluated one by one and
+    the outputs of the failed ones are filled with NaN.
+    """
+    try:
+        return evaluate_batch(controller, parameters, designs, outputs)
+    except Exception as e:
+        nb_designs = len(next(iter(designs.values())))
+        print(f"Batch evaluation failed ({e}), evaluating the {nb_designs} designs one by one")
+
+    rows = []
+    for index in range(nb_designs):
+        design = {name: values[index:index + 1] for name, values in designs.items()}
+        try:
+            rows.append(evaluate_batch(controller, parameters, design, outputs))
+        except Exception as e:
+            print(f"Design {index} failed: {e}")
+            rows.append(None)
+    reference = next((row for row in rows if row is not None), None)
+    if reference is None:
+        raise ValueError("All the designs of the batch failed")
+    arrays = {name: np.concatenate([row[name] if row is not None else np.full_like(reference[name], np.nan)
+                                    for row in rows]) for name in outputs}
+    arrays["frequency_vector"] = reference["frequency_vector"]
+    return arrays
+
+
+def evaluate_chunk(controller, parameters, outputs, designs):
+    """Evaluates a chunk of designs, see evaluate_designs : returns the designs and their outputs"""
+    return designs, evaluate_designs(controller, parameters, designs, outputs)
+
+
+def run_sweep(parameters, designs, output_path, outputs=None, chunk_size=256, n_workers=1, sweep=None):
+    """
+    Evaluates all the designs of a sweep by chunks of chunk_size designs and streams the results to the HDF5 file
+    output_path (see ResultWriter) : each chunk is written as soon as it is evaluated, only the chunks being
+    evaluated are held in memory.
+
+    The file holds the values of the swept parameters ("values" group) and the outputs of each design ("outputs"
+    group), its attributes describe the sweep (fixed parameters, sweep specification).
+
+    Parameters:
+        parameters (dict): The fixed parameters, see load_parameters.
+        designs (dict): The values of the swept parameters, see generate_designs.
+        output_path (str): The path of the HDF5 result file.
+        outputs (list, optional): The names of the nodes to save, DEFAULT_OUTPUTS by default.
+        chunk_size (int): The number of designs evaluated at once.
+        n_workers (int): The number of processes evaluating the chunks, 1 to run in the current process.
+        sweep (dict, optional): The sweep specification, saved in the file attributes.
+
+    Returns:
+        int: The number of designs written.
+    """
+    outputs = list(outputs or DEFAULT_OUTPUTS)
+
+    nb_designs = len(next(iter(designs.values())))
+    chunks = [{name: values[start:start + chunk_size] for name, values in designs.items()}
+              for start in range(0, nb_designs, chunk_size)]
+
+    # labels and units of the outputs, from a single nominal evaluation
+    controller = create_worker_controller()
+    nominal_results = controller.update_parameters(dict(parameters))
+
+    writer = ResultWriter(output_path, chunk_size=chunk_size,
+                          attributes={"parameters": parameters, "sweep": sweep or {}})
+    for name in outputs:
+        writer.set_labels(name, nominal_results[name]["labels"], nominal_results[name]["units"])
+
+    pool = None
+    if n_workers > 1:
+        pool = Pool(n_workers, initializer=init_worker, initargs=((parameters, outputs),))
+        evaluated_chunks = pool.imap(partial(call_in_worker, evaluate_chunk), chunks)
+    else:
+        evaluated_chunks = (evaluate_chunk(controller, parameters, outputs, chunk) for chunk in chunks)
+
+    try:
+        for index, (chunk, arrays) in enumerate(evaluated_chunks):
+            frequency_vector = arrays.pop("frequency_vector")
+            writer.append_arrays(chunk, arrays, frequency_vector)
+            print(f"Chunk {index + 1}/{len(chunks)} evaluated")
+    except BaseException:
+        # the chunks still queued are dropped instead of being evaluated before the error is raised
+        if pool is not None:
+            pool.terminate()
+        raise
+    else:
+        if pool is not None:
+            pool.close()
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.join()
+
+    return writer.nb_designs
@@ -5,15 +5,19 @@ PLASMAG GUI module
 import copy
 import csv
 import importlib
+import itertools
 import json
+import multiprocessing
 import os
 import sys
+import threading
+import time
 import webbrowser
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 from pint import UnitRegistry
 import numpy as np
-import pandas as pd
 
 from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal, QEvent, QUrl
 from PyQt6.QtWidgets import (
@@ -51,6 +55,11 @@ from matplotlib.figure import Figure
 from qtrangeslider import QRangeSlider
 
 from src.controler.controller import CalculationController, STRATEGY_MAP
+from src.model.engine import CalculationCancelled
+from src.model.reference_curve import decimate_min_max, load_reference_curve
+from src.model.results import ColumnarData
+from src.model.result_writer import ResultWriter
+from src.model.strategies.spice_simulation import get_spice_cache, set_spice_cache_directory
 from src.model.visualisation.create_tree import create_tree, add_title_description
 # from src.view.optimisation_tab import OptimisationTab
 
@@ -202,41 +211,161 @@ class ToolTipLineEdit(QLineEdit):
 class CalculationThread(QThread):
     """
     A QThread subclass for running calculations in a separate thread to avoid blocking the main GUI thread.
+
+    The calculation requests are coalesced : request() only keeps the latest parameters, which are calculated
+    once the running calculation is done. The running calculation is outdated when a newer request arrives : it
+    is cancelled between two nodes (see CalculationEngine.cancel_check), or its results are dropped instead of
+    being emitted. So that a continuous slider drag still displays results, an outdated calculation is completed
+    and emitted anyway when no result was emitted for MAX_DISPLAY_DELAY seconds.
+
+    A request can be a coarse pass (see MainGUI.calculate) : the old results emitted with a coarse pass, and with
+    the full resolution pass following it, are the last full resolution results, not the results of the previous
+    coarse pass.
+
+    The expensive nodes (SPICE simulations) are calculated by the executor, in background processes : the results
+    of the other nodes are emitted first, then emitted again each time background results are merged (see
+    CalculationEngine.collect_background_results), until a newer request arrives.
+
+    The thread ends when there is no request left, and is started again by the next one.
     """
-    calculation_finished = pyqtSignal(object)
+    calculation_finished = pyqtSignal(object, object, object)  # current results, old results, parameters
     calculation_failed = pyqtSignal(str)
 
-    def __init__(self, controller, params_dict=None):
+    MAX_DISPLAY_DELAY = 0.2
+    # waiting time (s) for background results between two checks of the pending request
+    BACKGROUND_POLL_DELAY = 0.05
+
+    def __init__(self, controller, params_dict=None, executor=None):
         """
         Initializes the CalculationThread with the given controller and parameters dictionary.
         :param controller:
-        :param params_dict:
+        :param params_dict: parameters of a first calculation, calculated when the thread is started
+        :param executor: executor of the expensive nodes, see CalculationEngine.executor
         """
         super().__init__()
         self.controller = controller
         self.params_dict = params_dict
+        self.executor = executor
+        self.coarse = False
+        self.condition = threading.Condition()
+        self.active = False
+        self.last_emit_time = 0
+        self.previous_coarse = False
+        self.full_results = None
+
+    def request(self, params_dict, coarse=False):
+        """
+        Requests a calculation with the given parameters, replacing the pending request if any.
+        :param params_dict:
+        :param coarse: True if params_dict is a coarse pass, replaced later by a full resolution one
+        :return:
+        """
+        with self.condition:
+            self.params_dict = params_dict
+            self.coarse = coarse
+            if not self.active:
+                self.active = True
+                self.wait()  # the previous run may still be returning
+                self.start()
+
+    def is_outdated(self):
+        """Returns True if the running calculation should be cancelled or dropped, see the class description"""
+        return self.params_dict is not None and time.monotonic() - self.last_emit_time < self.MAX_DISPLAY_DELAY
+
+    def wait_idle(self):
+        """Blocks until all the requested calculations are done"""
+        with self.condition:
+            while self.active:
+                self.condition.wait()
 
     def run(self):
         """
         Runs the calculation process in a separate thread.
         :return:
         """
-        try:
-            calculation_result = self.controller.update_parameters(self.params_dict)
-            self.calculation_finished.emit(calculation_result)  # Emit result
-        except Exception as error:
-            self.calculation_failed.emit(str(error))  # Emit error message
+        while True:
+            with self.condition:
+                params_dict, self.params_dict = self.params_dict, None
+                coarse = self.coarse
+                if params_dict is None:
+                    self.active = False
+                    self.condition.notify_all()
+                    return
+
+            # the engine is created again when the strategy map is swapped
+            engine = self.controller.engine
+            engine.cancel_check = self.is_outdated
+            engine.executor = self.executor
+            # the engine holds the results of the previous pass as old results, see the class description
+            previous_coarse, self.previous_coarse = self.previous_coarse, coarse
+            try:
+                calculation_result = self.controller.update_parameters(params_dict)
+                if self.is_outdated():
+                    continue  # the newer request is calculated instead
+                if coarse or previous_coarse:
+                    old_results = self.full_results
+                else:
+                    old_results = self.controller.get_old_results()
+                    old_results = dict(old_results) if old_results else old_results
+                # copies of the results dicts (sharing the results), the next calculations update the engine ones
+                calculation_result = dict(calculation_result)
+                if not coarse:
+                    self.full_results = calculation_result
+                self.last_emit_time = time.monotonic()
+                self.calculation_finished.emit(calculation_result, old_results, params_dict)  # Emit result
+
+                while engine.pending_nodes and self.params_dict is None:
+                    if engine.collect_background_results(timeout=self.BACKGROUND_POLL_DELAY):
+                        calculation_result = dict(self.controller.get_current_results())
+                        if not coarse:
+                            self.full_results = calculation_result
+                        self.last_emit_time = time.monotonic()
+                        self.calculation_finished.emit(calculation_result, old_results, params_dict)
+            except CalculationCancelled:
+                continue
+            except Exception as error:
+                self.calculation_failed.emit(str(error))  # Emit error message
+
+
+# Minimum part of the view spanned by the data before the view is rescaled, see MplCanvas.view_fits_data
+VIEW_MIN_FILL = 0.7
 
 
 class MplCanvas(FigureCanvas):
     """
     A custom matplotlib canvas for displaying plots in the GUI.
+
+    The curves added with plot_decimated are displayed at the pixel resolution of the axes : each line keeps a
+    source giving its samples over a frequency band, and the lines are updated when the axes are zoomed.
+
+    The lines and the legend are animated artists : they are drawn over the rest of the figure (axes, ticks,
+    grid), which is kept as a background after each full draw. When only the data of the lines changes, they are
+    blitted on this background instead of drawing the whole figure again (see refresh).
     """
 
     def __init__(self):
         fig = Figure(figsize=(5, 4), dpi=100, layout='tight')
         self.axes = fig.add_subplot(111)
         super().__init__(fig)
+        self.line_sources = {}
+        self.lines = {}
+        self.background = None
+        self.background_bounds = None
+        # state of the displayed plot, see MainGUI.update_plot
+        self.plot_layout = None
+        self.selected_key = None
+        self.displayed_results = {}
+        self.axes.callbacks.connect('xlim_changed', self.on_xlim_changed)
+        self.mpl_connect('draw_event', self.on_draw)
+
+    def clear_axes(self):
+        """Clears the axes and the decimated lines"""
+        self.axes.clear()
+        self.line_sources = {}
+        self.lines = {}
+        self.background = None
+        # axes.clear() also removes the callbacks of the axes
+        self.axes.callbacks.connect('xlim_changed', self.on_xlim_changed)
 
     def add_curve(self, x_data, y_data, label=None):
         """
@@ -246,9 +375,134 @@ class MplCanvas(FigureCanvas):
         :param label:
         :return:
         """
-        self.axes.plot(x_data, y_data, label=label)
+        self.plot_decimated(x_data, y_data, label=label)
         self.draw()
 
+    def get_pixel_width(self):
+        return max(int(self.axes.get_window_extent().width), 1)
+
+    def plot_decimated(self, x_data, y_data, key=None, **kwargs):
+        """
+        Plots a curve decimated to the pixel resolution of the axes, keeping the min and the max of the samples of
+        each pixel (see decimate_for_display) : the peaks of the curve are always displayed. The full resolution
+        data is kept to decimate the visible band again when the axes are zoomed.
+
+        x_data must be sorted, the curve is plotted at full resolution otherwise.
+
+        Parameters:
+            key (optional): The key of the line, to update its data with update_curve.
+        """
+        return self.plot_source(*get_array_source(x_data, y_data), key=key, **kwargs)
+
+    def plot_source(self, source, x_min, x_max, key=None, **kwargs):
+        """
+        Plots a curve given by a source : source(x_min, x_max, nb_pixels) returns the x and y data to display
+        between x_min and x_max, on an axes nb_pixels wide.
+        """
+        line, = self.axes.plot(*source(x_min, x_max, self.get_pixel_width()), animated=True, **kwargs)
+        self.line_sources[line] = source
+        if key is not None:
+            self.lines[key] = line
+        return line
+
+    def update_curve(self, key, x_data, y_data):
+        """Replaces the data of a line added with plot_decimated, the canvas is redrawn by refresh"""
+        self.update_source(key, *get_array_source(x_data, y_data))
+
+    def update_source(self, key, source, x_min, x_max):
+        """Replaces the source of a line added with plot_source, the canvas is redrawn by refresh"""
+        line = self.lines[key]
+        if not self.axes.get_autoscalex_on():
+            # zoomed with the toolbar, the displayed band is kept
+            x_min, x_max = sorted(self.axes.get_xlim())
+        self.line_sources[line] = source
+        line.set_data(*source(x_min, x_max, self.get_pixel_width()))
+
+    def get_animated_artists(self):
+        legend = self.axes.get_legend()
+        return list(self.line_sources) + ([legend] if legend is not None else [])
+
+    def view_fits_data(self):
+        """
+        Returns True if the current view limits still suit the data of the lines : on each autoscaled axis, the
+        data is inside the view and spans at least VIEW_MIN_FILL of it (on the scale of the axis, linear or log),
+        or is flat.
+        The view isn't rescaled for the small changes of a slider, so that the lines can be blitted.
+        """
+        data_limits = self.axes.transScale.transform(self.axes.dataLim.get_points())
+        view_limits = self.axes.transScale.transform(self.axes.viewLim.get_points())
+        for axis, autoscale in enumerate((self.axes.get_autoscalex_on(), self.axes.get_autoscaley_on())):
+            if not autoscale:
+                continue
+            data_min, data_max = data_limits[:, axis]
+            view_min, view_max = sorted(view_limits[:, axis])
+            # a flat curve (scalar node) never fills the view, autoscale centers it
+            if not (view_min <= data_min and data_max <= view_max
+                    and (data_max == data_min or data_max - data_min >= VIEW_MIN_FILL * (view_max - view_min))):
+                return False
+        return True
+
+    def refresh(self):
+        """
+        Redraws the canvas after update_curve or update_source : the lines are blitted on the background of the
+        last full draw if the view limits still suit their data (see view_fits_data), otherwise the view is
+        rescaled and the whole canvas is drawn again.
+        """
+        self.axes.relim()
+        if (self.background is None or self.background_bounds != self.axes.bbox.bounds
+                or not self.view_fits_data()):
+            self.axes.autoscale_view()
+            self.draw_idle()
+            return
+        self.restore_region(self.background)
+        for artist in self.get_animated_artists():
+            self.axes.draw_artist(artist)
+        self.blit(self.axes.bbox)
+
+    def on_draw(self, event):
+        """After a full draw, keeps the background for refresh and draws the animated artists over it"""
+        if event.canvas.is_saving():
+            return  # the animated artists are drawn by savefig
+        self.background = self.copy_from_bbox(self.axes.bbox)
+        self.background_bounds = self.axes.bbox.bounds
+        for artist in self.get_animated_artists():
+            artist.draw(event.renderer)
+
+    def on_xlim_changed(self, axes):
+        x_min, x_max = sorted(axes.get_xlim())
+        nb_pixels = self.get_pixel_width()
+        for line, source in self.line_sources.items():
+            line.set_data(*source(x_min, x_max, nb_pixels))
+
+
+def get_array_source(x_data, y_data):
+    """
+    Returns the source of a curve given by arrays (see MplCanvas.plot_source) and its x range : the curve is
+    decimated with decimate_for_display if x_data is sorted, displayed at full resolution otherwise.
+    """
+    x_data, y_data = np.asarray(x_data), np.asarray(y_data)
+    if len(x_data) < 2 or np.any(x_data[1:] < x_data[:-1]):
+        return (lambda x_min, x_max, nb_pixels: (x_data, y_data)), None, None
+    return (lambda x_min, x_max, nb_pixels: decimate_for_display(x_data, y_data, x_min, x_max, nb_pixels),
+            x_data[0], x_data[-1])
+
+
+def decimate_for_display(x_data, y_data, x_min, x_max, nb_pixels):
+    """
+    Returns the samples of a curve between x_min and x_max (and the sample enclosing this band), decimated to
+    about 2 samples per pixel : the samples are grouped by blocks of consecutive samples, one block per pixel, and
+    the min and the max of each block are kept (see decimate_min_max).
+
+    The blocks match the pixels when the samples are evenly spaced on the scale of the axis, which is the case of
+    the frequency vector (log scale) and of the time vectors (linear scale).
+    """
+    start = max(np.searchsorted(x_data, x_min) - 1, 0)
+    stop = min(np.searchsorted(x_data, x_max, side="right") + 1, len(x_data))
+    x_data, y_data = x_data[start:stop], y_data[start:stop]
+    if len(x_data) <= 2 * nb_pixels:
+        return x_data, y_data
+    return decimate_min_max(x_data, y_data, -(-len(x_data) // nb_pixels))
+
 
 class MainGUI(QMainWindow):
     """Main Graphical User Interface window
@@ -271,6 +525,12 @@ class MainGUI(QMainWindow):
         - controller (CalculationController): The controller handling the calculation logic.
 
     """
+    # resolution of the coarse passes calculated while a slider is dragged, see calculate
+    DRAG_POINTS_PER_DECADE = 20
+    # delay (ms) without a new coarse pass before the full resolution pass is calculated
+    REFINE_DELAY = 300
+    # number of processes calculating the SPICE nodes
+    BACKGROUND_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1))
 
     def __init__(self, config_dict=None, version=""):
         super().__init__()
@@ -288,7 +548,11 @@ class MainGUI(QMainWindow):
         self.toolbars = None
         self.canvases = None
         self.controller = None
+        self.calculation_thread = None
+        self.background_executor = None
         self.calculation_timer = None
+        self.refine_timer = None
+        self.slider_dragging = False
         self.input_parameters = None
         self.default_parameters = None
         self.default_spice_circuit = None
@@ -301,6 +565,8 @@ class MainGUI(QMainWindow):
         self.grid_layout = None
         self.inputs = None
         self.latest_results = None
+        self.latest_old_results = None
+        self.latest_parameters = None
         self.background_curve_data = None
         self.reset_background_buttons = None
         self.button_states = {}
@@ -429,6 +695,8 @@ class MainGUI(QMainWindow):
         self.grid_layout.addWidget(self.global_slider_coarse_label, 0, 0)
         self.global_slider_coarse = QSlider(Qt.Orientation.Horizontal)
         self.global_slider_coarse.valueChanged.connect(lambda: self.update_selected_input_value('coarse'))
+        self.global_slider_coarse.sliderPressed.connect(self.start_slider_drag)
+        self.global_slider_coarse.sliderReleased.connect(self.end_slider_drag)
         self.grid_layout.addWidget(self.global_slider_coarse, 0, 1)
 
         # Add the label and the fine global slider
@@ -436,6 +704,8 @@ class MainGUI(QMainWindow):
         self.grid_layout.addWidget(self.global_slider_fine_label, 1, 0)
         self.global_slider_fine = QSlider(Qt.Orientation.Horizontal)
         self.global_slider_fine.valueChanged.connect(lambda: self.update_selected_input_value('fine'))
+        self.global_slider_fine.sliderPressed.connect(self.start_slider_drag)
+        self.global_slider_fine.sliderReleased.connect(self.end_slider_drag)
         self.grid_layout.addWidget(self.global_slider_fine, 1, 1)
 
         frequency_range_slider_label = QLabel("Frequency range :")
@@ -449,6 +719,8 @@ class MainGUI(QMainWindow):
         self.frequency_range_slider.setValue(
             (self.input_parameters["misc"]['f_start']["default"], self.input_parameters["misc"]['f_stop']["default"]))
         self.frequency_range_slider.valueChanged.connect(self.update_frequency_range)
+        self.frequency_range_slider.sliderPressed.connect(self.start_slider_drag)
+        self.frequency_range_slider.sliderReleased.connect(self.end_slider_drag)
         self.grid_layout.addWidget(self.frequency_range_slider, 2, 1)
 
         self.frequency_values_label = QLabel(
@@ -508,6 +780,11 @@ class MainGUI(QMainWindow):
         self.calculation_timer.setInterval(timer_value)  # Delay in milliseconds
         self.calculation_timer.setSingleShot(True)
         self.calculation_timer.timeout.connect(self.delayed_calculate)
+        # full resolution pass replacing the coarse passes of a slider drag, see calculate
+        self.refine_timer = QTimer(self)
+        self.refine_timer.setInterval(self.REFINE_DELAY)
+        self.refine_timer.setSingleShot(True)
+        self.refine_timer.timeout.connect(lambda: self.calculate(full_resolution=True))
 
     def init_controller(self, backups_count=3):
         """
@@ -515,6 +792,13 @@ class MainGUI(QMainWindow):
         :return:
         """
         self.controller = CalculationController(backups_count=backups_count)
+        # the SPICE nodes are calculated in background processes, started at the first simulation
+        self.background_executor = ProcessPoolExecutor(
+            max_workers=self.BACKGROUND_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+            initializer=set_spice_cache_directory, initargs=(get_spice_cache().directory, get_spice_cache().max_disk_bytes))
+        self.calculation_thread = CalculationThread(self.controller, executor=self.background_executor)
+        self.calculation_thread.calculation_finished.connect(self.on_calculation_finished)
+        self.calculation_thread.calculation_failed.connect(self.display_error)
 
         for parameter, line_edit in self.inputs.items():
             line_edit.mousePressEvent = (lambda event, le=line_edit,
@@ -539,6 +823,7 @@ class MainGUI(QMainWindow):
         for buttons in self.all_buttons:
             for button in buttons:
                 button.setStyleSheet("background-color: none")
+        self.wait_for_calculations()
         self.controller.clear_calculation_results()
 
         for i in range(len(self.saved_parameters)):
@@ -614,11 +899,11 @@ class MainGUI(QMainWindow):
 
             checkbox = QCheckBox("Show Old Curve")
             self.checkboxes.append(checkbox)
-            checkbox.stateChanged.connect(self.update_plot)
+            checkbox.stateChanged.connect(lambda _, idx=i: self.update_plot(idx))
 
             combo_box = QComboBox()
             combo_box.setSizeAdjustPolicy(QComboBox.SizeAdjustPolicy.AdjustToContents)
-            combo_box.currentIndexChanged.connect(self.update_plot)
+            combo_box.currentIndexChanged.connect(lambda _, idx=i: self.update_plot(idx))
             self.comboboxes.append(combo_box)
 
             background_button = QPushButton("Load Background curve")
@@ -720,6 +1005,7 @@ class MainGUI(QMainWindow):
 
         # get the "current" spice strategies
         if len(self.saved_spice_strategies) > 0:
+            self.wait_for_calculations()
             self.controller.delete_spice_nodes(self.saved_spice_strategies)
             self.saved_spice_strategies = []
 
@@ -923,6 +1209,15 @@ class MainGUI(QMainWindow):
         # Initialize controllers, assuming there are as many save buttons as there are canvases
         self.init_controller(backups_count=3)
 
+    def closeEvent(self, event):
+        # the calculation thread must not be destroyed while calculating
+        if self.background_executor is not None:
+            self.background_executor.shutdown(wait=False, cancel_futures=True)
+        if self.calculation_thread is not None:
+            self.calculation_thread.wait_idle()
+            self.calculation_thread.wait()
+        super().closeEvent(event)
+
     def init_menu(self):
         """
         Initializes the menu bar with options for exporting and importing parameters.
@@ -986,6 +1281,7 @@ class MainGUI(QMainWindow):
             # if no .png extension is provided, add it
             if not path.endswith(".png"):
                 path += ".png"
+            self.wait_for_calculations()
             message = self.controller.export_CLTF_NEMI(path)
             QMessageBox.information(self, "Export Successful", "The CLTF NEMI has been exported successfully.")
         except Exception as e:
@@ -1111,8 +1407,7 @@ class MainGUI(QMainWindow):
         try:
             file_path, _ = QFileDialog.getOpenFileName(self, "Select Background Curve File", "", "CSV Files (*.csv)")
             if file_path:
-                x_data, y_data = self.load_and_normalize_curve(file_path)
-                self.background_curve_data[canvas_index] = (x_data, y_data)
+                self.background_curve_data[canvas_index] = self.load_and_normalize_curve(file_path)
                 print(f"Background curve loaded from {file_path} for plot {canvas_index}")
                 print(f"Background curve loaded for plot {canvas_index}")
                 self.update_plot(canvas_index)
@@ -1127,14 +1422,19 @@ class MainGUI(QMainWindow):
 
     def export_results(self):
         """
-        Exports the latest calculation results to a CSV file.
+        Exports the latest calculation results to a CSV file, or to an HDF5 file (see ResultWriter).
         The user is prompted to select a file location for the export.
         :return: None
         """
-        fileName, _ = QFileDialog.getSaveFileName(self, "Export Results", "", "CSV Files (*.csv)")
+        fileName, _ = QFileDialog.getSaveFileName(self, "Export Results", "",
+                                                  "CSV Files (*.csv);;HDF5 Files (*.h5)")
         if not fileName:
             return  # User canceled the dialog
 
+        if fileName.endswith(".h5"):
+            self.export_results_to_hdf5(fileName)
+            return
+
         frequency_vector = (self.latest_results.get('frequency_vector', []))["data"]
         headers = ['Frequency'] if len(frequency_vector) else []
         data = [frequency_vector] if len(frequency_vector) else []
@@ -1159,7 +1459,11 @@ class MainGUI(QMainWindow):
                 if len(data) == 0:  # No frequency vector, just a single row for the scalar
                     data.append(f"{[value]} ( {units[0]} )")
                 else:
-                    data.append([value] * len(frequency_vector))
+                    data.append(itertools.repeat(value, len(frequency_vector)))
+            elif isinstance(value, ColumnarData):  # Columns sharing the frequency vector
+                for col_index, column in enumerate(value.columns, start=1):
+                    headers.append(f"{key}_{col_index}( {units[col_index]} )")
+                    data.append(column)
             elif value.ndim == 1:  # Vector
                 headers.append(f"{key}( {units[0]} )")
                 data.append(value)
@@ -1168,14 +1472,25 @@ class MainGUI(QMainWindow):
                     headers.append(f"{key}_{col_index}( {units[col_index]} )")
                     data.append(value[:, col_index])
 
-        # Transpose data for CSV writing
-        data = zip(*data)
-
+        # Rows are built one at a time while writing
         with open(fileName, 'w', newline='') as file:
             writer = csv.writer(file)
             writer.writerow(headers)
-            for row in data:
-                writer.writerow(row)
+            writer.writerows(zip(*data))
+
+    def export_results_to_hdf5(self, fileName):
+        """
+        Exports the parameters and the latest calculation results to an HDF5 file (see ResultWriter) : the
+        scalar nodes and the nodes sharing the frequency vector.
+        """
+        frequency_vector = self.latest_results["frequency_vector"]["data"]
+        outputs = [key for key, value in self.latest_results.items()
+                   if key != 'frequency_vector' and not key.startswith('Display_')
+                   and (np.isscalar(value["data"]) or
+                        (isinstance(value["data"], ColumnarData) and value["data"].axis is frequency_vector))]
+
+        with ResultWriter(fileName, outputs=outputs) as writer:
+            writer.append(self.latest_parameters or {}, self.latest_results)
 
     def import_flicker_data_from_json(self):
         """
@@ -1286,14 +1601,12 @@ class MainGUI(QMainWindow):
 
     def load_and_normalize_curve(self, file_path):
         """
-        Loads a curve from a CSV file and return x and y data.
+        Loads a curve from a CSV file. The CSV file is converted once into a memory-mapped reference curve store
+        next to it (see src/model/reference_curve.py), the plots only read the samples of the displayed band.
         :param file_path: FULL path to the CSV file
-        :return: x_data, y_data
+        :return: ReferenceCurve
         """
-        df = pd.read_csv(file_path)
-        x_data = df.iloc[:, 0].values
-        y_data = df.iloc[:, 1].values
-        return x_data, y_data
+        return load_reference_curve(file_path)
 
     def log_scale(self, value, min_val, max_val, min_log, max_log):
         """Converts a linear slider value to a logarithmic frequency value."""
@@ -1325,7 +1638,7 @@ class MainGUI(QMainWindow):
 
         self.frequency_values_label.setText(
             f"Frequency Start: {self.f_start_value}, Frequency Stop: {self.f_stop_value}")
-        self.calculation_timer.start()
+        self.schedule_calculation()
 
     def delayed_calculate(self):
         """
@@ -1334,6 +1647,34 @@ class MainGUI(QMainWindow):
         """
         self.calculate()
 
+    def schedule_calculation(self):
+        """
+        Requests a calculation after a slider move : at once while the slider is dragged (the coarse passes are
+        cheap and coalesced by the calculation thread), after the calculation_timer delay otherwise.
+        """
+        if self.slider_dragging:
+            self.calculation_timer.stop()
+            self.calculate()
+        else:
+            self.calculation_timer.start()
+
+    def start_slider_drag(self):
+        """
+        Triggered when a slider is pressed : the calculations requested until it is released are coarse passes,
+        see calculate.
+        """
+        self.slider_dragging = True
+
+    def end_slider_drag(self):
+        """
+        Triggered when a slider is released : the coarse result of the drag, if any, is replaced by a full
+        resolution one without waiting for the refine timer.
+        """
+        self.slider_dragging = False
+        if self.refine_timer.isActive():
+            self.calculation_timer.stop()
+            self.calculate(full_resolution=True)
+
     def bind_slider_to_input(self, line_edit, parameter):
         """
         Binds the coarse and fine sliders to a selected input field, allowing for parameter adjustment.
@@ -1437,7 +1778,7 @@ class MainGUI(QMainWindow):
 
         try:
             line_edit.setText(f"{new_value:.3f}")  # Format with 3 decimal places
-            self.calculation_timer.start()
+            self.schedule_calculation()
         except RuntimeError as e:
             print(f"Error updating input value: {e}")
 
@@ -1493,11 +1834,18 @@ class MainGUI(QMainWindow):
 
         return params_dict
 
-    def calculate(self):
+    def calculate(self, full_resolution=False):
         """
-        Gathers the current parameter values from the input fields, initiates the calculation process through
-        the controller,
-        and triggers the plotting of the results. Uses unit conversion for parameters requiring it.
+        Gathers the current parameter values from the input fields and requests their calculation to the
+        calculation thread : the results are plotted by on_calculation_finished when they are ready. Uses unit
+        conversion for parameters requiring it.
+
+        While a slider is dragged, the calculation is a coarse pass : the frequency vector has only
+        DRAG_POINTS_PER_DECADE points per decade, so that the plots follow the slider whatever the resolution.
+        The full resolution pass replacing it is requested when the slider is released, or after REFINE_DELAY
+        milliseconds without a new calculation (see refine_timer).
+
+        :param full_resolution: calculate at the resolution of the inputs even if a slider is dragged
         """
         # Retrieve parameters from inputs and convert units where necessary
 
@@ -1505,18 +1853,38 @@ class MainGUI(QMainWindow):
             return
         params_dict = self.retrieve_parameters()
 
-        if hasattr(self.controller, 'update_parameters'):
-            self.controller.update_parameters(params_dict)
+        if (self.slider_dragging and not full_resolution and params_dict is not None
+                and params_dict.get("nb_points_per_decade", 0) > self.DRAG_POINTS_PER_DECADE):
+            self.calculation_thread.request(dict(params_dict, nb_points_per_decade=self.DRAG_POINTS_PER_DECADE),
+                                            coarse=True)
+            self.refine_timer.start()
+            return
 
-        self.on_calculation_finished(self.controller.get_current_results())
+        self.refine_timer.stop()
+        self.calculation_thread.request(params_dict)
 
-    def on_calculation_finished(self, calculation_results):
+    def wait_for_calculations(self):
+        """
+        Waits for the requested calculations and plots their results. The operations reading or modifying the
+        calculation engine from the GUI thread (strategy changes, saved results ...) call it first. A pending full
+        resolution pass is requested first, the results are never coarse ones.
+        """
+        if self.refine_timer.isActive():
+            self.calculate(full_resolution=True)
+        self.calculation_thread.wait_idle()
+        QApplication.processEvents()
+
+    def on_calculation_finished(self, calculation_results, old_results=None, params_dict=None):
         """
         Callback method for handling the completion of the calculation process.
-        :param calculation_results:
+        :param calculation_results: the current results
+        :param old_results: the results of the previous calculation
+        :param params_dict: the calculated parameters
         :return:
         """
         self.latest_results = calculation_results  # Store the latest results
+        self.latest_old_results = old_results
+        self.latest_parameters = params_dict
         self.plot_results(calculation_results)
         print("Calculation completed successfully.")
 
@@ -1533,78 +1901,111 @@ class MainGUI(QMainWindow):
         QMessageBox.critical(self, "An error occurred", f"{error_message}")
 
     def update_plot(self, index):
-        def plot_curve(data_with_meta, x_vector, linestyle='-', color=None):
-            """Plot a curve with metadata based on either frequency or time."""
+        """
+        Updates the plot of a canvas : the current result of its selected node, the old result if 'Show Old Curve'
+        is checked, the saved results and the background curve.
+
+        The lines of the canvas are kept between the updates. If the canvas still displays the same curves (same
+        node, same series and labels), only the lines whose result was recomputed are updated and blitted (see
+        MplCanvas.refresh), and the canvas isn't touched at all if none was. Otherwise the plot is rebuilt.
+        """
+        def get_curves(data_with_meta, x_vector):
+            """Returns the (label, y values) curves of a result, based on either frequency or time."""
             data = data_with_meta["data"]
             labels = data_with_meta.get("labels", ["", ""])
 
+            curves = []
             if np.isscalar(data):
-                y_values = np.full_like(x_vector, data)
-                canvas.axes.plot(x_vector, y_values, label=f"{labels[0]}", linestyle=linestyle,
-                                 color=color)
+                curves.append((f"{labels[0]}", np.full_like(x_vector, data)))
+            elif isinstance(data, ColumnarData):
+                for col_index, y_values in enumerate(data.columns, start=1):
+                    if len(y_values) == len(x_vector):  # Ensure matching lengths
+                        curves.append((f"{labels[col_index]}", y_values))
             elif isinstance(data, np.ndarray) and data.ndim == 1:
                 if len(data) == len(x_vector):  # Ensure matching lengths
-                    canvas.axes.plot(x_vector, data, label=f"{labels[0]}", linestyle=linestyle,
-                                     color=color)
+                    curves.append((f"{labels[0]}", data))
             elif isinstance(data, np.ndarray) and data.ndim > 1:
                 for col_index in range(1, data.shape[1]):
                     y_values = data[:, col_index]
                     if len(y_values) == len(x_vector):  # Ensure matching lengths
-                        canvas.axes.plot(x_vector, y_values, label=f"{labels[col_index]}",
-                                         linestyle=linestyle, color=color)
+                        curves.append((f"{labels[col_index]}", y_values))
+            return curves
 
         def get_x_vector(data_meta, default_vector):
             if "Time" in data_meta.get("labels", []):
-                return data_meta["data"][:, 0]  # Use the first column as the time vector
+                data = data_meta["data"]
+                if isinstance(data, ColumnarData):
+                    return data.axis  # The time vector is the axis of the columns
+                return data[:, 0]  # Use the first column as the time vector
             return default_vector
 
+        canvas = self.canvases[index]
+        selected_key = self.comboboxes[index].currentText()
+        if not selected_key:
+            return
 
-        for i, (canvas, combo_box, checkbox) in enumerate(zip(self.canvases, self.comboboxes, self.checkboxes)):
-            selected_key = combo_box.currentText()
-            if not selected_key:
-                continue
-
-            canvas.axes.clear()  # Clear the canvas for new plotting
-
-            current_results = self.controller.get_current_results()
-            old_results = self.controller.get_old_results()
-
-            frequency_vector = current_results.get('frequency_vector', [])["data"]
-            default_x_vector = frequency_vector
-
-            # Plot Current Data
-            current_data_meta = current_results.get(selected_key, {})
-            current_x_vector = get_x_vector(current_data_meta, default_x_vector)
-            if current_data_meta:
-                plot_curve(current_data_meta, current_x_vector, linestyle='-')
-                self.set_labels(current_data_meta, canvas)
-
-            # Plot Old Data if checkbox is checked
-            if checkbox.isChecked() and old_results:
-                old_data_meta = old_results.get(selected_key, {})
-                old_x_vector = get_x_vector(old_data_meta, default_x_vector)
-                if old_data_meta:
-                    plot_curve(old_data_meta, old_x_vector, linestyle=':', color='gray')
-
-            # Plot Saved Data from saved_data_results
-            for saved_index, saved_results in enumerate(self.controller.engine.saved_data_results):
-                saved_data_meta = saved_results.results.get(selected_key, {})
-                saved_x_vector = get_x_vector(saved_data_meta, default_x_vector)
-                if saved_data_meta:
-                    plot_curve(saved_data_meta, saved_x_vector, linestyle='--', color=None)
-
-            # Plot Background Curve if available
-            if self.background_curve_data[i] is not None:
-                x_background, y_background = self.background_curve_data[i]
-                mask = (x_background >= min(frequency_vector)) & (x_background <= max(frequency_vector))
-                x_background_filtered = x_background[mask]
-                y_background_filtered = y_background[mask]
-                canvas.axes.plot(x_background_filtered, y_background_filtered, label='Background Curve', linestyle='-',
-                                 color='black')
+        current_results = self.latest_results
+        old_results = self.latest_old_results
+
+        frequency_vector_meta = current_results.get('frequency_vector', [])
+        frequency_vector = frequency_vector_meta["data"]
+
+        # (name, result, line style) of each displayed series : current, old and saved data
+        series = [("current", current_results.get(selected_key), {"linestyle": '-'})]
+        if self.checkboxes[index].isChecked() and old_results:
+            series.append(("old", old_results.get(selected_key), {"linestyle": ':', "color": 'gray'}))
+        for saved_index, saved_results in enumerate(self.controller.engine.saved_data_results):
+            series.append((f"saved_{saved_index}", saved_results.results.get(selected_key),
+                           {"linestyle": '--', "color": None}))
+
+        displayed_results = {name: result for name, result, _ in series}
+        displayed_results["frequency_vector"] = frequency_vector_meta
+        displayed_results["background"] = self.background_curve_data[index]
+        changed_series = [name for name, result in displayed_results.items()
+                          if canvas.displayed_results.get(name) is not result]
+        if not changed_series and canvas.selected_key == selected_key:
+            return  # none of the displayed results was recomputed
+
+        curves = []
+        for name, data_meta, style in series:
+            if data_meta:
+                x_vector = get_x_vector(data_meta, frequency_vector)
+                for label, y_values in get_curves(data_meta, x_vector):
+                    curves.append((name, (name, label), x_vector, y_values, dict(style, label=label)))
+
+        background_curve = self.background_curve_data[index]
+        if background_curve is not None:
+            # read from the reference curve store at about 2 samples per pixel, again when zoomed
+            background_source = lambda x_min, x_max, nb_pixels: background_curve.get_band(
+                x_min, x_max, max_points=2 * nb_pixels, enclosing=True)
+
+        layout = (selected_key, tuple(key for _, key, _, _, _ in curves), background_curve is not None)
+        if layout == canvas.plot_layout:
+            # same curves : the data of the recomputed ones is updated in place
+            for name, key, x_vector, y_values, _ in curves:
+                if name in changed_series or "frequency_vector" in changed_series:
+                    canvas.update_curve(key, x_vector, y_values)
+            if background_curve is not None and "frequency_vector" in changed_series:
+                canvas.update_source("background", background_source, min(frequency_vector),
+                                     max(frequency_vector))
+            canvas.refresh()
+        else:
+            canvas.clear_axes()  # Clear the canvas for new plotting
+            for _, key, x_vector, y_values, style in curves:
+                canvas.plot_decimated(x_vector, y_values, key=key, **style)
+            if current_results.get(selected_key):
+                self.set_labels(current_results[selected_key], canvas)
+            if background_curve is not None:
+                canvas.plot_source(background_source, min(frequency_vector), max(frequency_vector),
+                                   key="background", label='Background Curve', linestyle='-', color='black')
 
             canvas.axes.grid(which='both')
-            canvas.axes.legend()
-            canvas.draw()
+            canvas.axes.legend().set_animated(True)
+            canvas.draw_idle()
+
+        canvas.plot_layout = layout
+        canvas.selected_key = selected_key
+        canvas.displayed_results = displayed_results
 
     def set_labels(self, data_meta, canvas):
         """Set labels and scales based on data type."""
@@ -1659,19 +2060,23 @@ class MainGUI(QMainWindow):
 
         for i, combo_box in enumerate(self.comboboxes):
             if available_results:
-                combo_box.blockSignals(True)
-                combo_box.clear()
-                combo_box.addItems(available_results)
-
-                # Restore the previous selection if it's still available; otherwise, use the first available result
-                if previous_selections[i] in available_results:
-                    combo_box.setCurrentText(previous_selections[i])
-                else:
-                    combo_box.setCurrentIndex(0)  # or handle differently as needed
+                # the combo box is only repopulated if the available results changed (strategy map swapped ...)
+                if [combo_box.itemText(item) for item in range(combo_box.count())] != available_results:
+                    combo_box.blockSignals(True)
+                    combo_box.clear()
+                    combo_box.addItems(available_results)
+
+                    # Restore the previous selection if it's still available; otherwise, use the first available
+                    # result
+                    if previous_selections[i] in available_results:
+                        combo_box.setCurrentText(previous_selections[i])
+                    else:
+                        combo_box.setCurrentIndex(0)  # or handle differently as needed
 
-                combo_box.blockSignals(False)
+                    combo_box.blockSignals(False)
 
-                # Trigger update_plot now with the restored or updated selection
+                # Trigger update_plot now with the restored or updated selection, only the canvases whose results
+                # were recomputed are redrawn
                 self.update_plot(i)
 
     def reset_parameters(self, reload=True):
@@ -1778,6 +2183,7 @@ class MainGUI(QMainWindow):
 
         params_dict = self.retrieve_parameters()
 
+        self.wait_for_calculations()
         try:
             self.controller.set_node_strategy(node_name, strategy_class, params_dict)
         except Exception as e:
@@ -1803,6 +2209,7 @@ class MainGUI(QMainWindow):
                         except ValueError:
                             print(
                                 f"Warning: Skipping parameter '{param_name}' with non-numeric input '{current_value}'.")
+            self.wait_for_calculations()
             self.controller.save_current_results(index)
             self.saved_parameters[index] = copy.deepcopy(current_parameters)
 
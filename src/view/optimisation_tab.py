@@ -121,16 +121,21 @@ class OptimisationTab(QWidget):
             self.add_hyperparameter_field("Number of Generations", "20")
             self.add_hyperparameter_field("Population Size", "100")
             self.add_hyperparameter_field("Mutation Rate", "0.3")
+            self.add_hyperparameter_field("Number of Workers", "1")
         elif method == "Particle Swarm optimisation":
             self.add_hyperparameter_field("w1", "0.5")
             self.add_hyperparameter_field("c1", "1.0")
             self.add_hyperparameter_field("c2", "1.0")
             self.add_hyperparameter_field("Number of Particles", "50")
             self.add_hyperparameter_field("Number of Iterations", "50")
+            self.add_hyperparameter_field("Topology (global/ring)", "global")
         elif method == "Simulated Annealing":
             self.add_hyperparameter_field("Cooling Rate", "0.99")
             self.add_hyperparameter_field("Initial Temperature", "5000")
             self.add_hyperparameter_field("Number of Iterations", "2000")
+            self.add_hyperparameter_field("Number of Chains", "1")
+            self.add_hyperparameter_field("Exchange Interval", "0")
+            self.add_hyperparameter_field("Restart Interval", "0")
 
     def add_hyperparameter_field(self, label_text, default_value):
         """
@@ -286,18 +291,28 @@ class OptimisationTab(QWidget):
                 self.optimisation.generations = int(hyperparameters["Number of Generations"])
                 self.optimisation.population_size = int(hyperparameters["Population Size"])
                 self.optimisation.mutation_rate = float(hyperparameters["Mutation Rate"])
+                self.optimisation.n_workers = int(hyperparameters["Number of Workers"])
                 total_iterations = self.optimisation.generations
             elif self.method_combobox.currentText() == "Particle Swarm optimisation":
-                self.pso_optimisation.w1 = float(hyperparameters["w1"])
+                self.pso_optimisation.w = float(hyperparameters["w1"])
                 self.pso_optimisation.c1 = float(hyperparameters["c1"])
                 self.pso_optimisation.c2 = float(hyperparameters["c2"])
                 self.pso_optimisation.n_particles = int(hyperparameters["Number of Particles"])
                 self.pso_optimisation.n_iterations = int(hyperparameters["Number of Iterations"])
+                topology = hyperparameters["Topology (global/ring)"].strip().lower()
+                if topology not in ParticleSwarmOptimization.TOPOLOGIES:
+                    QMessageBox.warning(self, "Invalid Input", f"Unknown topology {topology}, expected one of "
+                                                               f"{ParticleSwarmOptimization.TOPOLOGIES}.")
+                    return
+                self.pso_optimisation.topology = topology
                 total_iterations = self.pso_optimisation.n_iterations
             elif self.method_combobox.currentText() == "Simulated Annealing":
                 self.sa_optimisation.cooling_rate = float(hyperparameters["Cooling Rate"])
                 self.sa_optimisation.initial_temperature = float(hyperparameters["Initial Temperature"])
                 self.sa_optimisation.n_iterations = int(hyperparameters["Number of Iterations"])
+                self.sa_optimisation.n_chains = int(hyperparameters["Number of Chains"])
+                self.sa_optimisation.exchange_interval = int(hyperparameters["Exchange Interval"])
+                self.sa_optimisation.restart_interval = int(hyperparameters["Restart Interval"])
                 total_iterations = self.sa_optimisation.n_iterations
 
             self.progress_dialog = QProgressDialog("Optimizing...", "Abort", 0, total_iterations, self)
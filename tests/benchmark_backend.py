@@ -0,0 +1,43 @@
+"""
+Benchmark of the strategies computed with evaluate (src/model/strategies/backend.py), with each available backend.
+
+Run from the root of the repository : python -m tests.benchmark_backend
+"""
+import time
+
+import numpy as np
+
+from src.model.input_parameters import InputParameters
+from src.model.strategies import backend, ColumnarData
+from src.model.strategies.strategy_lib.CLTF import CLTF_Strategy
+from src.model.strategies.strategy_lib.impedance import AnalyticalImpedanceStrategy
+from src.model.strategies.strategy_lib.Noise import NSD_e_in, NSD_normalisation
+
+
+def benchmark_backends(nb_points, nb_runs=10):
+    frequency_vector = np.logspace(0, 6, nb_points)
+    column = np.ones(nb_points)
+    dependencies = {name: {"data": value} for name, value in (
+        ("resistance", 300.), ("inductance", 0.5), ("capacitance", 1e-10), ("mu_app", 1000.),
+        ("frequency_vector", frequency_vector))}
+    for name in ("impedance", "TF_ASIC_Stage_1", "TF_ASIC_Stage_2", "NSD_normalisation"):
+        dependencies[name] = {"data": ColumnarData(frequency_vector, (column,))}
+    parameters = InputParameters({"e_in": 1e-12, "mutual_inductance": 0.1, "feedback_resistance": 1000,
+                                  "nb_spire": 12100, "ray_spire": 5e-3})
+
+    previous_backend = backend.get_backend()
+    for backend_name in backend.AVAILABLE_BACKENDS:
+        backend.set_backend(backend_name)
+        for strategy in (AnalyticalImpedanceStrategy(), NSD_e_in(), NSD_normalisation(), CLTF_Strategy()):
+            timings = []
+            for _ in range(nb_runs):
+                start = time.perf_counter()
+                strategy.calculate(dependencies, parameters)
+                timings.append(time.perf_counter() - start)
+            print(f"{nb_points} points, {backend_name}, {type(strategy).__name__}: {min(timings) * 1e3:.2f} ms")
+    backend.set_backend(previous_backend)
+
+
+if __name__ == "__main__":
+    for nb_points in (10 ** 5, 10 ** 6):
+        benchmark_backends(nb_points)
@@ -0,0 +1,321 @@
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.controler.controller import CalculationController
+from src.model.engine import CalculationCancelled
+from src.model.input_parameters import InputParameters
+from src.model.result_cache import ResultCache
+from src.model.strategies.strategy_lib.impedance import AnalyticalImpedanceStrategy
+from src.model.strategies.strategy_lib.resistance import MultiLayerResistanceStrategy
+
+parameters_dict = {
+    'f_start': 1,
+    'f_stop': 100000,
+    'nb_points_per_decade': 100,
+    'mu_insulator': 1,
+    'epsilon_insulator': 3.4,
+    'len_coil': 155e-3,
+    'kapton_thick': 30e-6,
+    'insulator_thick': 10e-6,
+    'diam_out_mandrel': 3.2e-3,
+    'diam_wire': 90e-6,
+    'capa_tuning': 1e-12,
+    'capa_triwire': 150e-12,
+    'len_core': 20e-2,
+    'diam_core': 3.2e-3,
+    'diabolo_diam_core': 16e-3,
+    'mu_r': 100000,
+    'nb_spire': 12100,
+    'nb_spire_feedback': 144,
+    'ray_spire': 5e-3,
+    'rho_wire': 1.6,
+    'coeff_expansion': 1,
+    'stage_1_cutting_freq': 100,
+    'stage_2_cutting_freq': 20000,
+    'gain_1_linear': 1,
+    'gain_2_linear': 1,
+    'mutual_inductance': 1,
+    'feedback_resistance': 1000,
+    'temperature': 296,
+    'Para_A': 766,
+    'Para_B': 34,
+    'Alpha': 7,
+    'e_en': 1e-9,
+    'e_in': 1e-12,
+}
+
+
+class TestExecutionPlan(unittest.TestCase):
+    def setUp(self):
+        self.controller = CalculationController()
+        self.engine = self.controller.engine
+
+    def test_plan_is_topologically_sorted(self):
+        for node, slot, dependency_slots in self.engine.execution_plan:
+            for dep_name, dep_slot in dependency_slots:
+                self.assertLess(dep_slot, slot, f"{dep_name} must be calculated before {node.name}")
+
+    def test_plan_covers_all_strategy_nodes(self):
+        planned = {node.name for node, _, _ in self.engine.execution_plan}
+        self.assertEqual(planned, set(self.controller.STRATEGY_MAP.keys()))
+
+    def test_run_calculations(self):
+        results = self.controller.update_parameters(dict(parameters_dict))
+        for node_name in self.controller.STRATEGY_MAP:
+            self.assertIsNotNone(results.get(node_name), node_name)
+
+        impedance = results["impedance"]["data"]
+        R = results["resistance"]["data"]
+        L = results["inductance"]["data"]
+        C = results["capacitance"]["data"]
+        omega = 2 * np.pi * impedance[:, 0]
+        expected = np.sqrt((R ** 2 + (L * omega) ** 2) / ((1 - L * C * omega ** 2) ** 2 + (R * C * omega) ** 2))
+        np.testing.assert_allclose(impedance[:, 1], expected)
+
+    def test_missing_parameter(self):
+        params = dict(parameters_dict)
+        params.pop("temperature")
+        self.assertRaises(ValueError, self.controller.update_parameters, params)
+
+    def test_delete_node_recompiles_plan(self):
+        self.engine.delete_node("NEMI")
+        planned = {node.name for node, _, _ in self.engine.execution_plan}
+        self.assertNotIn("NEMI", planned)
+
+
+class TestIncrementalRecalculation(unittest.TestCase):
+    def setUp(self):
+        self.controller = CalculationController()
+        self.engine = self.controller.engine
+        self.results = dict(self.controller.update_parameters(dict(parameters_dict)))
+
+    def test_temperature_closure(self):
+        affected = self.engine.get_affected_nodes({"temperature": {}})
+        self.assertEqual(affected, {"PSD_R_cr", "PSD_R_Coil", "PSD_Total", "Display_all_PSD",
+                                    "Display_all_PSD_filtered", "NEMI"})
+
+    def test_only_downstream_nodes_are_recalculated(self):
+        params = dict(parameters_dict)
+        params["temperature"] = 350
+        new_results = self.controller.update_parameters(params)
+
+        affected = self.engine.get_affected_nodes({"temperature": {}})
+        for node_name, value in self.results.items():
+            if node_name in affected:
+                self.assertIsNot(new_results[node_name], value, node_name)
+            else:
+                self.assertIs(new_results[node_name], value, node_name)
+
+    def test_strategy_update_invalidates_dependents(self):
+        from src.model.strategies.strategy_lib.lambda_strategy import ClercAnalyticalLambdaStrategy
+
+        self.engine.add_or_update_node("lambda_param", ClercAnalyticalLambdaStrategy())
+        self.engine.run_calculations()
+        new_results = self.engine.current_output_data.results
+        self.assertIsNot(new_results["inductance"], self.results["inductance"])
+        self.assertIsNot(new_results["NEMI"], self.results["NEMI"])
+        self.assertIs(new_results["resistance"], self.results["resistance"])
+
+    def test_old_results_share_unchanged_results(self):
+        params = dict(parameters_dict)
+        params["temperature"] = 350
+        self.controller.update_parameters(params)
+
+        old_results = self.engine.old_output_data.results
+        affected = self.engine.get_affected_nodes({"temperature": {}})
+        for node_name, value in self.results.items():
+            self.assertIs(old_results[node_name], value, node_name)
+            if node_name not in affected:
+                self.assertIs(self.engine.current_output_data.results[node_name], value, node_name)
+
+    def test_results_are_read_only(self):
+        with self.assertRaises(ValueError):
+            self.results["impedance"]["data"].column(1)[0] = 0
+
+    def test_saved_results_are_snapshots(self):
+        self.engine.save_calculation_results(0)
+        self.controller.update_parameters(dict(parameters_dict, temperature=350))
+        saved_results = self.engine.saved_data_results[0].results
+        self.assertIs(saved_results["NEMI"], self.results["NEMI"])
+        self.assertIsNot(self.engine.current_output_data.results["NEMI"], self.results["NEMI"])
+
+
+    def test_cancelled_calculations_are_resumed(self):
+        calls = []
+        self.engine.cancel_check = lambda: len(calls) >= 2 or calls.append(None)
+        with self.assertRaises(CalculationCancelled):
+            self.controller.update_parameters(dict(parameters_dict, temperature=350))
+
+        self.engine.cancel_check = None
+        results = self.controller.update_parameters(dict(parameters_dict, temperature=360))
+        expected = CalculationController().update_parameters(dict(parameters_dict, temperature=360))
+        for node_name in ("PSD_R_Coil", "NEMI"):
+            np.testing.assert_array_equal(results[node_name]["data"].to_matrix(),
+                                          expected[node_name]["data"].to_matrix())
+
+
+class BackgroundImpedanceStrategy(AnalyticalImpedanceStrategy):
+    expensive = True
+
+
+class TestBackgroundCalculations(unittest.TestCase):
+    def setUp(self):
+        self.controller = CalculationController()
+        self.engine = self.controller.engine
+        self.engine.add_or_update_node("impedance", BackgroundImpedanceStrategy())
+        self.executor = ProcessPoolExecutor(max_workers=1)
+        self.engine.executor = self.executor
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_expensive_nodes_are_merged_when_ready(self):
+        params = dict(parameters_dict)
+        results = self.controller.update_parameters(params)
+        # the rest of the graph is calculated without waiting, the nodes depending on impedance wait for it
+        self.assertIn("impedance", self.engine.pending_nodes)
+        self.assertIn("resistance", results)
+        self.assertNotIn("NEMI", results)
+
+        self.engine.wait_background_results()
+        self.assertEqual(self.engine.pending_nodes, {})
+        expected = CalculationController().update_parameters(dict(params))
+        for node_name in ("impedance", "NEMI"):
+            np.testing.assert_array_equal(results[node_name]["data"].to_matrix(),
+                                          expected[node_name]["data"].to_matrix())
+
+        # the previous results are kept until the new ones are merged
+        nemi = results["NEMI"]
+        params = dict(params, nb_spire=10000)
+        self.controller.update_parameters(params)
+        self.assertIn("impedance", self.engine.pending_nodes)
+        self.assertIs(results["NEMI"], nemi)
+        self.engine.wait_background_results()
+        expected = CalculationController().update_parameters(dict(params))
+        np.testing.assert_array_equal(results["NEMI"]["data"].to_matrix(), expected["NEMI"]["data"].to_matrix())
+
+    def test_unchanged_background_calculation_is_kept(self):
+        self.controller.update_parameters(dict(parameters_dict))
+        future = self.engine.pending_nodes["impedance"][0]
+        self.controller.update_parameters(dict(parameters_dict, temperature=350))
+        self.assertIs(self.engine.pending_nodes["impedance"][0], future)
+        self.engine.wait_background_results()
+
+
+class TestColumnarData(unittest.TestCase):
+    def setUp(self):
+        self.results = CalculationController(dict(parameters_dict)).get_current_results()
+
+    def test_frequency_axis_is_shared(self):
+        frequency_vector = self.results["frequency_vector"]["data"]
+        for node_name in ["impedance", "CLTF", "PSD_Total", "NEMI", "Display_all_PSD"]:
+            data = self.results[node_name]["data"]
+            self.assertIs(data.axis, frequency_vector, node_name)
+            for column in data.columns:
+                self.assertTrue(column.flags.c_contiguous, node_name)
+
+    def test_matrix_view(self):
+        data = self.results["NEMI"]["data"]
+        matrix = np.asarray(data)
+        self.assertEqual(matrix.shape, data.shape)
+        np.testing.assert_array_equal(matrix[:, 0], self.results["frequency_vector"]["data"])
+        np.testing.assert_array_equal(data[:, 1], matrix[:, 1])
+        np.testing.assert_array_equal(data[..., 2], matrix[:, 2])
+        np.testing.assert_array_equal(data[10:20, -1], matrix[10:20, -1])
+        self.assertEqual(len(data), len(matrix))
+
+
+class TestBatchEvaluation(unittest.TestCase):
+    def test_batch_matches_sequential_evaluation(self):
+        nb_spire = np.array([8000., 12100., 15000.])
+        temperature = np.array([250., 296., 320.])
+
+        params = dict(parameters_dict)
+        params.update({"nb_spire": nb_spire, "temperature": temperature})
+        batch_results = CalculationController(params).get_current_results()
+        self.assertEqual(batch_results["NEMI"]["data"].shape, (3, 501, 3))
+
+        for index in range(len(nb_spire)):
+            params = dict(parameters_dict)
+            params.update({"nb_spire": nb_spire[index], "temperature": temperature[index]})
+            results = CalculationController(params).get_current_results()
+            for node_name in ["impedance", "CLTF", "NEMI", "Display_all_PSD"]:
+                np.testing.assert_allclose(batch_results[node_name]["data"][index], results[node_name]["data"])
+
+    def test_batch_size_mismatch(self):
+        self.assertRaises(ValueError, InputParameters, {"nb_spire": np.ones(3), "temperature": np.ones(4)})
+
+    def test_invalid_designs_are_nan(self):
+        # the wire of the second design is wider than its coil
+        params = dict(parameters_dict)
+        params.update({"len_coil": np.array([parameters_dict["len_coil"], 0.5 * parameters_dict["diam_wire"]])})
+        results = CalculationController(params).get_current_results()
+        for node_name in ["capacitance", "impedance", "NEMI"]:
+            data = np.asarray(results[node_name]["data"])
+            self.assertTrue(np.all(np.isfinite(data[0])), node_name)
+            self.assertTrue(np.all(np.isnan(data[1][..., -1])), node_name)
+        resistance = MultiLayerResistanceStrategy().calculate({}, InputParameters(params))["data"]
+        self.assertTrue(np.isfinite(resistance[0, 0]) and np.isnan(resistance[1, 0]))
+
+
+class TestResultCache(unittest.TestCase):
+    def test_revisited_parameters_hit_the_cache(self):
+        controller = CalculationController(dict(parameters_dict))
+        first_results = dict(controller.get_current_results())
+
+        controller.update_parameters(dict(parameters_dict, temperature=350))
+        hits = controller.get_cache_statistics()["hits"]
+        results = controller.update_parameters(dict(parameters_dict))
+
+        for node_name, value in first_results.items():
+            self.assertIs(results[node_name], value, node_name)
+        affected = controller.engine.get_affected_nodes({"temperature": {}})
+        self.assertEqual(controller.get_cache_statistics()["hits"] - hits, len(affected))
+
+    def test_strategy_is_part_of_the_key(self):
+        from src.model.strategies.strategy_lib.lambda_strategy import ClercAnalyticalLambdaStrategy, \
+            LukoschusAnalyticalLambdaStrategy
+
+        controller = CalculationController(dict(parameters_dict))
+        engine = controller.engine
+        inductance = engine.current_output_data.results["inductance"]
+
+        engine.add_or_update_node("lambda_param", ClercAnalyticalLambdaStrategy())
+        engine.run_calculations()
+        self.assertFalse(np.allclose(engine.current_output_data.results["inductance"]["data"], inductance["data"]))
+
+        engine.add_or_update_node("lambda_param", LukoschusAnalyticalLambdaStrategy())
+        engine.run_calculations()
+        self.assertIs(engine.current_output_data.results["inductance"], inductance)
+
+    def test_memory_budget(self):
+        cache = ResultCache(max_bytes=3 * 800)
+        for index in range(5):
+            cache.put(bytes([index]), {"data": np.zeros(100)})
+        self.assertEqual(len(cache), 3)
+        self.assertLessEqual(cache.current_bytes, cache.max_bytes)
+        self.assertIsNone(cache.get(bytes([0])))
+        self.assertIsNotNone(cache.get(bytes([4])))
+        self.assertEqual(cache.get_statistics()["hit_rate"], 0.5)
+
+    def test_disabled_cache(self):
+        from src.model.engine import CalculationEngine
+
+        engine = CalculationEngine(cache_size=0)
+        self.assertIsNone(engine.result_cache)
+
+    def test_controller_cache_size(self):
+        from src.model.optimisation.impedance_strategy_map import IMPEDANCE_STRATEGY_MAP
+
+        controller = CalculationController(cache_size=0)
+        self.assertIsNone(controller.get_cache_statistics())
+        controller.swap_strategy_map(IMPEDANCE_STRATEGY_MAP)
+        self.assertIsNone(controller.engine.result_cache)
+        controller.swap_strategy_map(IMPEDANCE_STRATEGY_MAP, cache_size=1024 ** 2)
+        self.assertEqual(controller.engine.result_cache.max_bytes, 1024 ** 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
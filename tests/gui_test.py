@@ -3,9 +3,11 @@ import unittest
 from unittest.mock import patch
 import os
 import json
+import numpy as np
 from PyQt6.QtWidgets import QApplication
 
-from src.view.gui import MainGUI
+from src.view.gui import MainGUI, MplCanvas, decimate_for_display
+from tests.engine_test import BackgroundImpedanceStrategy
 app = QApplication.instance() or QApplication(sys.argv)
 
 
@@ -50,5 +52,143 @@ class TestMainGUI(unittest.TestCase):
         self.assertEqual(self.gui.input_parameters, expected_data)
 
 
+class TestMplCanvas(unittest.TestCase):
+    def setUp(self):
+        self.canvas = MplCanvas()
+        self.canvas.resize(500, 400)
+        self.x = np.logspace(0, 6, 600000)
+        self.y = 1 / np.abs(1 - (self.x / 24430) ** 2 + 1e-4j)
+
+    def test_decimate_for_display_keeps_peaks(self):
+        x, y = decimate_for_display(self.x, self.y, 10, 1e5, 400)
+        self.assertLessEqual(len(x), 2 * 400)
+        self.assertEqual(y.max(), self.y.max())
+        self.assertLessEqual(x[0], 10)
+        self.assertGreaterEqual(x[-1], 1e5)
+
+    def test_redecimate_on_zoom(self):
+        self.canvas.axes.set_xscale("log")
+        line = self.canvas.plot_decimated(self.x, self.y)
+        nb_pixels = self.canvas.get_pixel_width()
+        self.assertLessEqual(len(line.get_xdata()), 2 * nb_pixels)
+
+        self.canvas.axes.set_xlim(24000, 25000)
+        x_data = line.get_xdata()
+        self.assertLessEqual(len(x_data), 2 * nb_pixels)
+        self.assertGreater(len(x_data), 100)
+        self.assertLessEqual(x_data[0], 24000)
+        self.assertGreaterEqual(x_data[-1], 25000)
+
+        self.canvas.clear_axes()
+        self.assertEqual(self.canvas.line_sources, {})
+        line = self.canvas.plot_decimated(self.x, self.y)
+        self.canvas.axes.set_xlim(1, 10)
+        self.assertLess(line.get_xdata()[-1], 20)
+
+    def test_refresh_blits_small_changes(self):
+        self.canvas.axes.set_xscale("log")
+        self.canvas.axes.set_yscale("log")
+        line = self.canvas.plot_decimated(self.x, self.y, key="impedance")
+        self.canvas.draw()
+        self.assertIsNotNone(self.canvas.background)
+
+        with patch.object(self.canvas, 'blit') as blit, patch.object(self.canvas, 'draw_idle') as draw_idle:
+            self.canvas.update_curve("impedance", self.x, self.y * 1.01)
+            self.canvas.refresh()
+            blit.assert_called_once()
+            draw_idle.assert_not_called()
+            np.testing.assert_allclose(line.get_ydata().max(), self.y.max() * 1.01)
+
+            # out of the view : the view is rescaled and the canvas drawn again
+            self.canvas.update_curve("impedance", self.x, self.y * 1e3)
+            self.canvas.refresh()
+            blit.assert_called_once()
+            draw_idle.assert_called_once()
+
+
+class TestIncrementalPlot(unittest.TestCase):
+    def setUp(self):
+        with open('config.json', 'r') as file:
+            self.gui = MainGUI(config_dict=json.load(file))
+        self.gui.calculate()
+        self.gui.wait_for_calculations()
+        self.gui.comboboxes[0].setCurrentText("impedance")
+        self.gui.comboboxes[1].setCurrentText("resistance")
+
+    def test_only_recomputed_canvases_are_updated(self):
+        impedance_line = self.gui.canvases[0].lines[("current", "Impedance")]
+        resistance_line = self.gui.canvases[1].lines[("current", "Resistance")]
+        resistance_data = resistance_line.get_ydata()
+
+        parameters = dict(self.gui.controller.engine.current_parameters.data)
+        parameters["capa_tuning"] *= 1.01
+        with patch.object(self.gui.canvases[1], 'refresh') as refresh:
+            self.gui.calculation_thread.request(parameters)
+            self.gui.wait_for_calculations()
+            refresh.assert_not_called()
+
+        # the lines are kept, their data is updated
+        self.assertIs(self.gui.canvases[0].lines[("current", "Impedance")], impedance_line)
+        self.assertIs(resistance_line.get_ydata(), resistance_data)
+        impedance = self.gui.latest_results["impedance"]["data"]
+        self.assertEqual(impedance_line.get_ydata().max(), impedance[:, 1].max())
+
+    def test_requests_are_coalesced(self):
+        finished = []
+        self.gui.calculation_thread.calculation_finished.connect(
+            lambda results, old_results, params: finished.append(params["capa_tuning"]))
+        parameters = dict(self.gui.controller.engine.current_parameters.data)
+        requested = [parameters["capa_tuning"] * (1 + 0.01 * step) for step in range(1, 21)]
+        for capa_tuning in requested:
+            self.gui.calculation_thread.request(dict(parameters, capa_tuning=capa_tuning))
+        self.gui.wait_for_calculations()
+
+        # the outdated requests are dropped, the latest one is always calculated and displayed
+        self.assertLess(len(finished), len(requested))
+        self.assertEqual(finished[-1], requested[-1])
+        self.assertEqual(self.gui.latest_parameters["capa_tuning"], requested[-1])
+
+    def test_background_results_are_merged(self):
+        self.gui.controller.engine.add_or_update_node("impedance", BackgroundImpedanceStrategy())
+        impedance = self.gui.latest_results["impedance"]
+        finished = []
+        self.gui.calculation_thread.calculation_finished.connect(
+            lambda results, old_results, params: finished.append(results["impedance"]))
+        parameters = dict(self.gui.controller.engine.current_parameters.data)
+        self.gui.calculation_thread.request(dict(parameters, nb_spire=parameters["nb_spire"] * 1.1))
+        self.gui.wait_for_calculations()
+
+        # the analytical nodes are displayed first, with the previous impedance, then the merged impedance
+        self.assertEqual(len(finished), 2)
+        self.assertIs(finished[0], impedance)
+        self.assertIsNot(finished[1], impedance)
+        self.assertIs(self.gui.latest_results["impedance"], finished[1])
+
+    def test_slider_drag_is_progressive(self):
+        full_results = self.gui.latest_results
+        frequency_vector = full_results["frequency_vector"]["data"]
+        self.gui.bind_slider_to_input(self.gui.inputs["capa_tuning"], "capa_tuning")
+        self.gui.refine_timer.setInterval(60000)  # the slider is held still during the coarse pass
+
+        self.gui.start_slider_drag()
+        self.gui.global_slider_fine.setValue(self.gui.global_slider_fine.value() + 10)
+        self.gui.calculation_thread.wait_idle()
+        QApplication.processEvents()
+        # coarse pass, plotted at once, the old results are the ones displayed before the drag
+        self.assertEqual(self.gui.latest_parameters["nb_points_per_decade"], self.gui.DRAG_POINTS_PER_DECADE)
+        self.assertLess(len(self.gui.latest_results["frequency_vector"]["data"]), len(frequency_vector))
+        self.assertIs(self.gui.latest_old_results["impedance"], full_results["impedance"])
+        self.assertTrue(self.gui.refine_timer.isActive())
+
+        # the full resolution pass replaces it when the slider is released
+        self.gui.end_slider_drag()
+        self.gui.wait_for_calculations()
+        self.assertFalse(self.gui.refine_timer.isActive())
+        np.testing.assert_array_equal(self.gui.latest_results["frequency_vector"]["data"], frequency_vector)
+        self.assertIs(self.gui.latest_old_results["impedance"], full_results["impedance"])
+        line = self.gui.canvases[0].lines[("current", "Impedance")]
+        self.assertEqual(len(line.get_xdata()), len(frequency_vector))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,124 @@
+import os
+import unittest
+
+import numpy as np
+
+from src.controler.controller import CalculationController
+from src.controler.models.scm_fused_noise_model import FUSED_NOISE_STRATEGY_MAP
+from src.model.monte_carlo import StreamingQuantiles, get_tolerances, run_monte_carlo, sample_parameters
+from src.model.result_writer import extract_output
+from src.model.strategies.strategy_lib.lambda_strategy import ClercAnalyticalLambdaStrategy
+from src.model.sweep import load_parameters
+
+PARAMETERS_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "default.json")
+
+
+class TestStreamingQuantiles(unittest.TestCase):
+    def test_matches_exact_quantiles(self):
+        rng = np.random.default_rng(0)
+        estimator = StreamingQuantiles(nb_bins=256)
+        chunks = []
+        # the spread grows with the chunks : the histograms are expanded several times
+        for index in range(20):
+            chunk = rng.lognormal(0, 0.05 * (1 + index), (200, 3, 2))
+            chunks.append(chunk)
+            estimator.update(chunk)
+        samples = np.concatenate(chunks)
+        quantiles = [0., 0.01, 0.5, 0.95, 1.]
+
+        self.assertTrue(estimator.log)
+        self.assertEqual(estimator.counts.shape, (6, 256))
+        estimates = estimator.get_quantiles(quantiles)
+        self.assertEqual(estimates.shape, (5, 3, 2))
+        error = np.abs(np.log10(estimates) - np.log10(np.quantile(samples, quantiles, axis=0)))
+        self.assertTrue(np.all(error <= estimator.width.reshape(3, 2)))
+        np.testing.assert_array_equal(estimates[0], samples.min(axis=0))
+        np.testing.assert_array_equal(estimates[-1], samples.max(axis=0))
+
+    def test_linear_scale_and_failed_samples(self):
+        estimator = StreamingQuantiles()
+        samples = np.linspace(-1, 1, 1001)[:, np.newaxis]
+        estimator.update(np.concatenate((samples, [[np.nan]])))
+        self.assertFalse(estimator.log)
+        self.assertEqual(estimator.nb_samples, 1001)
+        np.testing.assert_allclose(estimator.get_quantiles([0.25, 0.5])[:, 0], [-0.5, 0.],
+                                   atol=2 * estimator.width[0])
+
+    def test_invalid_arguments(self):
+        self.assertRaises(ValueError, StreamingQuantiles, 100)
+        self.assertRaises(ValueError, StreamingQuantiles().get_quantiles, [0.5])
+
+
+class TestMonteCarlo(unittest.TestCase):
+    def setUp(self):
+        self.parameters, self.attributes = load_parameters(PARAMETERS_FILE)
+        self.parameters["nb_points_per_decade"] = 10
+
+    def test_tolerances_of_the_parameters_file(self):
+        tolerances = get_tolerances(self.attributes)
+        self.assertTrue({"nb_spire", "diam_wire", "mu_r", "capa_tuning", "e_en"} <= set(tolerances))
+
+        attributes = dict(self.attributes, nb_spire=dict(self.attributes["nb_spire"], tolerance={"spread": 1}))
+        self.assertRaises(ValueError, get_tolerances, attributes)
+
+    def test_samples_are_clipped(self):
+        tolerances = {"diam_wire": {"distribution": "normal", "spread": 0.1, "relative": True},
+                      "capa_tuning": {"distribution": "uniform", "spread": 0.5, "relative": True}}
+        samples = sample_parameters(self.parameters, self.attributes, tolerances, 10000, np.random.default_rng(0))
+        self.assertAlmostEqual(np.std(samples["diam_wire"]) / self.parameters["diam_wire"], 0.1, places=2)
+        # the nominal tuning capacitance is its minimum
+        self.assertEqual(samples["capa_tuning"].min(), self.parameters["capa_tuning"])
+
+    def test_integer_samples(self):
+        tolerances = get_tolerances(self.attributes)
+        self.assertTrue(tolerances["nb_spire"]["integer"])
+        samples = sample_parameters(self.parameters, self.attributes, tolerances, 1000, np.random.default_rng(0))
+        np.testing.assert_array_equal(samples["nb_spire"], np.round(samples["nb_spire"]))
+        self.assertGreater(len(np.unique(samples["nb_spire"])), 10)
+
+        # rounded before being clipped : the bounds are kept
+        tolerances = {"nb_spire": dict(tolerances["nb_spire"], spread=1.)}
+        samples = sample_parameters(self.parameters, self.attributes, tolerances, 1000, np.random.default_rng(0))
+        self.assertEqual(samples["nb_spire"].min(), float(self.attributes["nb_spire"]["min"]))
+        self.assertEqual(samples["nb_spire"].max(), float(self.attributes["nb_spire"]["max"]))
+        np.testing.assert_array_equal(samples["nb_spire"], np.round(samples["nb_spire"]))
+
+    def test_envelopes(self):
+        results = CalculationController(self.parameters).run_monte_carlo(self.attributes, 300, chunk_size=64,
+                                                                         seed=0)
+        nb_points = len(results["frequency_vector"])
+        self.assertEqual(results["nb_samples"], 300)
+        for name in ["NEMI", "CLTF", "impedance"]:
+            output = results["outputs"][name]
+            self.assertEqual(output["data"].shape, (5,) + output["nominal"].shape, name)
+            self.assertEqual(output["nominal"].shape[0], nb_points, name)
+            self.assertTrue(np.all(np.diff(output["data"], axis=0) >= 0), name)
+        # the median impedance is close to the nominal one
+        impedance = results["outputs"]["impedance"]
+        np.testing.assert_allclose(impedance["data"][2], impedance["nominal"], rtol=0.1)
+
+    def test_process_pool(self):
+        serial = run_monte_carlo(self.parameters, self.attributes, 128, outputs=["impedance"], chunk_size=32, seed=1)
+        pool = run_monte_carlo(self.parameters, self.attributes, 128, outputs=["impedance"], chunk_size=32, seed=1,
+                               n_workers=2)
+        np.testing.assert_array_equal(serial["outputs"]["impedance"]["data"], pool["outputs"]["impedance"]["data"])
+
+    def test_model_of_the_controller(self):
+        controller = CalculationController()
+        controller.swap_strategy_map(FUSED_NOISE_STRATEGY_MAP)
+        controller.update_parameters(dict(self.parameters))
+        controller.set_node_strategy("lambda_param", ClercAnalyticalLambdaStrategy, dict(self.parameters))
+        nemi = extract_output(controller.get_current_results()["NEMI"], 1)[0]
+        default_nemi = extract_output(CalculationController(dict(self.parameters)).get_current_results()["NEMI"], 1)[0]
+        self.assertGreater(np.max(np.abs(nemi / default_nemi - 1)), 1e-3)
+
+        # the noise_model node only exists in the fused noise model
+        for n_workers in (1, 2):
+            results = controller.run_monte_carlo(self.attributes, 64, outputs=["noise_model", "NEMI"], chunk_size=32,
+                                                 seed=0, n_workers=n_workers)
+            np.testing.assert_array_equal(results["outputs"]["NEMI"]["nominal"], nemi)
+            np.testing.assert_allclose(results["outputs"]["NEMI"]["data"][2], nemi, rtol=0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
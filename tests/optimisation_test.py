@@ -0,0 +1,160 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.controler.controller import STRATEGY_MAP
+from src.controler.pool_worker import create_worker_controller
+from src.model.optimisation.cost_function import NEMIEvaluator, ResonanceFrequencyEvaluator
+from src.model.optimisation.genetic_optimisation import GeneticOptimisation, parameters_dict
+from src.model.optimisation.impedance_strategy_map import IMPEDANCE_STRATEGY_MAP
+from src.model.optimisation.particle_swarm_optimisation import ParticleSwarmOptimization
+from src.model.optimisation.simulated_annealing import SimulatedAnnealing
+from src.model.reference_curve import convert_curve
+from src.model.result_writer import load_results
+from src.model.strategies.strategy_lib.resonance import AnalyticalResonanceFrequencyStrategy
+from tests.engine_test import parameters_dict as full_parameters_dict
+
+
+class TestGeneticOptimisation(unittest.TestCase):
+    def test_evaluate(self):
+        optimisation = GeneticOptimisation(10, 1, 0.3, parameters_dict, target_resonance_freq=24430)
+        fitness, = optimisation.evaluate([155e-3, 90e-6, 12100, 1e-12, 150e-12])
+        self.assertLess(fitness, 1e6)
+
+    def test_invalid_design_gets_the_penalty(self):
+        # the wire is wider than the coil, whatever the target
+        optimisation = GeneticOptimisation(10, 1, 0.3, parameters_dict,
+                                           target_resonance_freq=parameters_dict["f_start"])
+        self.assertEqual(optimisation.evaluate([50e-6, 90e-6, 12100, 1e-12, 150e-12]), (1e6,))
+
+    def test_parallel_matches_sequential(self):
+        results = []
+        for n_workers in (1, 2):
+            random.seed(0)
+            optimisation = GeneticOptimisation(20, 2, 0.3, parameters_dict, target_resonance_freq=24430,
+                                               n_workers=n_workers)
+            results.append(optimisation.run_optimisation())
+        self.assertEqual(results[0], results[1])
+
+    def test_history(self):
+        with tempfile.TemporaryDirectory() as directory:
+            history_path = os.path.join(directory, "history.h5")
+            optimisation = GeneticOptimisation(10, 3, 0.3, parameters_dict, target_resonance_freq=24430,
+                                               history_path=history_path)
+            optimisation.run_optimisation()
+            history = load_results(history_path)
+        np.testing.assert_array_equal(history["values"]["generation"], np.repeat([0., 1., 2.], 10))
+        self.assertEqual(len(history["values"]["fitness"]), 30)
+        self.assertEqual(history["attributes"]["target_resonance_freq"], 24430)
+
+
+class TestParticleSwarmOptimization(unittest.TestCase):
+    def test_swarm_evaluation_matches_particle_evaluation(self):
+        optimisation = ParticleSwarmOptimization(dict(parameters_dict), target_resonance_freq=24430, max_batch_size=7)
+        positions = np.random.uniform(*np.array(optimisation.bounds).T, (20, len(optimisation.bounds)))
+        positions[3, :2] = [50e-6, 90e-6]  # invalid design : the wire is wider than the coil
+        scores = optimisation.evaluate_swarm(positions)
+        self.assertEqual(scores[3], 1e6)
+        expected = [optimisation.evaluate(position)[0] for position in positions]
+        np.testing.assert_allclose(scores, expected)
+
+    def test_ring_topology(self):
+        optimisation = ParticleSwarmOptimization(dict(parameters_dict), topology="ring", neighbourhood_size=1)
+        positions = np.arange(5.)[:, np.newaxis]
+        scores = np.array([3., 1., 4., 0., 5.])
+        best = optimisation.neighbourhood_best_positions(positions, scores)
+        np.testing.assert_array_equal(best[:, 0], [1., 1., 3., 3., 3.])
+
+    def test_unknown_topology(self):
+        self.assertRaises(ValueError, ParticleSwarmOptimization, dict(parameters_dict), topology="star")
+
+    def test_run_optimization(self):
+        optimisation = ParticleSwarmOptimization(dict(parameters_dict), target_resonance_freq=24430,
+                                                 n_particles=20, n_iterations=3)
+        best_params, resonance_freq = optimisation.run_optimization()
+        self.assertEqual(set(best_params), {'len_coil', 'diam_wire', 'nb_spire', 'diam_out_mandrel', 'len_core',
+                                            'diam_core'})
+        self.assertGreater(resonance_freq, 0)
+
+
+class TestSimulatedAnnealing(unittest.TestCase):
+    def test_chains_evaluation_matches_single_evaluation(self):
+        optimisation = SimulatedAnnealing(dict(parameters_dict), target_resonance_freq=24430)
+        positions = np.random.uniform(*np.array(optimisation.bounds).T, (8, len(optimisation.bounds)))
+        positions[0, :2] = [50e-6, 90e-6]  # invalid design : the wire is wider than the coil
+        costs = optimisation.evaluate_chains(positions)
+        self.assertEqual(costs[0], 1e6)
+        np.testing.assert_allclose(costs, [optimisation.evaluate(position) for position in positions])
+
+    def test_exchange_replicas(self):
+        optimisation = SimulatedAnnealing(dict(parameters_dict))
+        positions = np.array([[0.], [1.], [2.]])
+        costs = np.array([0., 5., 1.])
+        # The hot chain 0 found a better design than the cold chain 1 : the swap is always accepted
+        optimisation.exchange_replicas(positions, costs, np.array([10., 1., 0.1]), 0)
+        np.testing.assert_array_equal(positions[:, 0], [1., 0., 2.])
+        np.testing.assert_array_equal(costs, [5., 0., 1.])
+
+    def test_run_multi_chain(self):
+        optimisation = SimulatedAnnealing(dict(parameters_dict), target_resonance_freq=24430, n_iterations=20,
+                                          initial_temperature=1000, cooling_rate=0.99, n_chains=4,
+                                          exchange_interval=5, restart_interval=10)
+        best_params, resonance_freq = optimisation.run_multi_chain()
+        self.assertEqual(len(best_params), 6)
+        self.assertGreater(resonance_freq, 0)
+
+
+class TestAnalyticalResonanceFrequency(unittest.TestCase):
+    def calculate(self, R, L, C):
+        dependencies = {"resistance": {"data": R}, "inductance": {"data": L}, "capacitance": {"data": C}}
+        return AnalyticalResonanceFrequencyStrategy().calculate(dependencies, None)["data"]
+
+    def test_lossless_resonance(self):
+        self.assertAlmostEqual(self.calculate(0., 1e-3, 1e-9), 1 / (2 * np.pi * np.sqrt(1e-3 * 1e-9)))
+
+    def test_matches_impedance_maximum(self):
+        R, L, C = 300., 1.2, 2e-10
+        freq = np.logspace(3, 5, 200001)
+        omega = 2 * np.pi * freq
+        impedance = (R ** 2 + (L * omega) ** 2) / ((1 - L * C * omega ** 2) ** 2 + (R * C * omega) ** 2)
+        self.assertAlmostEqual(self.calculate(R, L, C) / freq[impedance.argmax()], 1, places=4)
+
+    def test_overdamped(self):
+        self.assertEqual(self.calculate(1e6, 1e-3, 1e-6), 0.)
+
+    def test_evaluator_matches_sweep(self):
+        individual = [155e-3, 90e-6, 12100, 1e-12, 150e-12]
+        params = dict(parameters_dict, len_coil=155e-3, diam_wire=90e-6, nb_spire=12100, capa_tuning=1e-12,
+                      capa_triwire=150e-12)
+        impedance = create_worker_controller(IMPEDANCE_STRATEGY_MAP).update_parameters(params)["impedance"]["data"]
+        sweep = impedance[impedance[:, 1].argmax(), 0]
+        analytical = ResonanceFrequencyEvaluator(parameters_dict, 0).evaluate(individual)[0]
+        # Precision of the sweep : 1000 points per decade
+        self.assertAlmostEqual(analytical / sweep, 1, delta=10 ** (1 / 1000) - 1)
+
+
+class TestNEMIEvaluator(unittest.TestCase):
+    def test_reference_curve_target(self):
+        evaluator = NEMIEvaluator(dict(full_parameters_dict), None, STRATEGY_MAP)
+        nemi = evaluator.controller.update_parameters(dict(full_parameters_dict))["NEMI"]["data"]
+        individual = [full_parameters_dict[name] for name in
+                      ("len_coil", "diam_wire", "nb_spire", "capa_tuning", "capa_triwire")]
+
+        evaluator.update_target(np.array(nemi[:, 1]))
+        fitness, = evaluator.evaluate(individual)
+        self.assertEqual(fitness, 0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, "nemi.csv")
+            np.savetxt(csv_path, np.column_stack((nemi[:, 0], 2 * nemi[:, 1])), delimiter=",",
+                       header="Frequency,NEMI", comments="")
+            evaluator.update_target(convert_curve(csv_path))
+            fitness, = evaluator.evaluate(individual)
+        self.assertAlmostEqual(fitness / np.sum(nemi[:, 1] ** 2), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
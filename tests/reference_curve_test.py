@@ -0,0 +1,81 @@
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from src.model import reference_curve
+from src.model.reference_curve import ReferenceCurve, convert_curve, decimate_min_max, load_reference_curve
+
+
+class TestReferenceCurve(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.directory.name, "curve.csv")
+        rng = np.random.default_rng(0)
+        self.x = np.logspace(-1, 5, 50000)
+        self.y = 1e-12 * (1 + 1 / self.x) * (1 + rng.random(len(self.x)))
+        np.savetxt(self.csv_path, np.column_stack((self.x, self.y)), delimiter=",", header="Frequency,NEMI",
+                   comments="")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_convert(self):
+        curve = convert_curve(self.csv_path)
+        self.assertEqual(curve.labels, ["Frequency", "NEMI"])
+        self.assertEqual(curve.nb_samples, len(self.x))
+        np.testing.assert_array_equal(curve.levels[0], [self.x, self.y])
+        # each level keeps the peaks of the curve
+        for level in curve.levels[1:]:
+            self.assertEqual(level[1].max(), self.y.max())
+            self.assertEqual(level[1].min(), self.y.min())
+            self.assertTrue(np.all(np.diff(level[0]) >= 0))
+        self.assertLess(len(curve.levels[-1][0]), reference_curve.MIN_LEVEL_SIZE)
+
+    def test_find_matches_searchsorted(self):
+        curve = convert_curve(self.csv_path)
+        frequencies = np.concatenate((self.x[::997], np.geomspace(1e-2, 1e6, 500), [0, -1]))
+        for frequency in frequencies:
+            self.assertEqual(curve.find(frequency), np.searchsorted(self.x, frequency))
+
+    def test_get_band(self):
+        curve = convert_curve(self.csv_path)
+        x, y = curve.get_band(10, 1000)
+        mask = (self.x >= 10) & (self.x <= 1000)
+        np.testing.assert_array_equal(x, self.x[mask])
+        np.testing.assert_array_equal(y, self.y[mask])
+
+        x_decimated, y_decimated = curve.get_band(10, 1000, max_points=1000)
+        self.assertLessEqual(len(x_decimated), 1000)
+        self.assertGreater(len(x_decimated), 100)
+        self.assertEqual(y_decimated.max(), y.max())
+
+    def test_interpolate(self):
+        y = 1e-12 * (1 + 1 / self.x)
+        np.savetxt(self.csv_path, np.column_stack((self.x, y)), delimiter=",", header="f,v", comments="")
+        curve = convert_curve(self.csv_path)
+        frequency_vector = np.geomspace(1, 1e4, 100)
+        np.testing.assert_allclose(curve.interpolate(frequency_vector), 1e-12 * (1 + 1 / frequency_vector),
+                                   rtol=1e-3)
+
+    def test_load_reuses_store(self):
+        curve = load_reference_curve(self.csv_path)
+        modification_time = os.path.getmtime(os.path.join(curve.path, "meta.json"))
+        time.sleep(0.01)
+        self.assertIsInstance(load_reference_curve(self.csv_path), ReferenceCurve)
+        self.assertEqual(os.path.getmtime(os.path.join(curve.path, "meta.json")), modification_time)
+        self.assertEqual(load_reference_curve(curve.path).nb_samples, len(self.x))
+
+    def test_unsorted_curve(self):
+        np.savetxt(self.csv_path, np.column_stack((self.x[::-1], self.y)), delimiter=",", header="f,v",
+                   comments="")
+        self.assertRaises(ValueError, convert_curve, self.csv_path)
+
+    def test_decimate_min_max(self):
+        x = np.arange(10.)
+        y = np.array([3., 1., 2., 5., 0., 9., 4., 8., 6., 7.])
+        x_decimated, y_decimated = decimate_min_max(x, y, 4)
+        np.testing.assert_array_equal(x_decimated, [1., 3., 4., 5., 8., 9.])
+        np.testing.assert_array_equal(y_decimated, [1., 5., 0., 9., 6., 7.])
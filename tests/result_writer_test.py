@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.controler.controller import CalculationController
+from src.model.result_writer import ResultWriter, load_results
+from tests.engine_test import parameters_dict
+
+
+class TestResultWriter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "results.h5")
+        self.controller = CalculationController()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_append_designs(self):
+        nb_spires = [8000., 10000., 12000., 14000., 16000.]
+        expected_nemi = []
+        with ResultWriter(self.path, outputs=["inductance", "NEMI"], chunk_size=2) as writer:
+            for nb_spire in nb_spires:
+                results = self.controller.update_parameters(dict(parameters_dict, nb_spire=nb_spire))
+                writer.append({"nb_spire": nb_spire}, results)
+                expected_nemi.append(np.asarray(results["NEMI"]["data"])[:, 1:])
+                # only the designs of the current chunk are buffered
+                self.assertLess(writer.nb_buffered, 2)
+
+        results = load_results(self.path)
+        np.testing.assert_array_equal(results["values"]["nb_spire"], nb_spires)
+        np.testing.assert_array_equal(results["outputs"]["NEMI"]["data"], expected_nemi)
+        self.assertEqual(results["outputs"]["NEMI"]["units"], ["Hz", "T/sqrt(Hz)", "T/sqrt(Hz)"])
+        self.assertEqual(results["outputs"]["inductance"]["data"].shape, (5,))
+
+        nemi = load_results(self.path, names=["NEMI"], rows=slice(3, 4))["outputs"]["NEMI"]["data"]
+        np.testing.assert_array_equal(nemi[0], expected_nemi[3])
+
+    def test_append_batch(self):
+        nb_spire = np.array([8000., 12000.])
+        results = self.controller.update_parameters(dict(parameters_dict, nb_spire=nb_spire))
+        with ResultWriter(self.path, outputs=["impedance", "resistance"]) as writer:
+            writer.append({"nb_spire": nb_spire}, results)
+        impedance = load_results(self.path)["outputs"]["impedance"]["data"]
+        np.testing.assert_array_equal(impedance[..., 0], results["impedance"]["data"][..., 1])
+
+    def test_frequency_vector_must_be_shared(self):
+        with ResultWriter(self.path, outputs=["impedance"]) as writer:
+            writer.append({}, self.controller.update_parameters(dict(parameters_dict)))
+            results = self.controller.update_parameters(dict(parameters_dict, nb_points_per_decade=10))
+            self.assertRaises(ValueError, writer.append, {}, results)
+
+
+if __name__ == '__main__':
+    unittest.main()
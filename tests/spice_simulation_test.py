@@ -0,0 +1,216 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from PySpice.Spice.Netlist import Circuit
+from PySpice.Spice.Simulation import CircuitSimulation
+from PySpice.Unit import u_F, u_Hz, u_V, u_Ω
+
+from src.model.strategies import spice_simulation
+from src.model.strategies.strategy_lib import SPICE
+from src.model.input_parameters import InputParameters
+from src.model.strategies.spice_simulation import (SpiceAnalysis, SpiceCache, SpiceDeck, SpiceSession,
+                                                    get_frequency_sweep, get_points_per_decade, get_session,
+                                                    on_frequency_vector, parse_spice_number, simulate)
+from src.model.strategies.strategy_lib.frequency import FrequencyVectorStrategy
+
+OP_AMP_LIBRARY = 'src/model/strategies/strategy_lib/spice_lib/uA741.lib'
+
+
+def build_circuit(resistance=1000., library=OP_AMP_LIBRARY):
+    circuit = Circuit('RC filter')
+    circuit.include(library)
+    circuit.SinusoidalVoltageSource('input', 'in', circuit.gnd, amplitude=1 @ u_V)
+    circuit.R(1, 'in', 'out', resistance @ u_Ω)
+    circuit.C(1, 'out', circuit.gnd, 1e-6 @ u_F)
+    return circuit
+
+
+def get_sweep_frequencies(sweep):
+    """The frequencies of a SPICE decade sweep : every step up to the stop frequency"""
+    nb_steps = int(np.floor(np.log10(sweep["stop_frequency"] / sweep["start_frequency"]) * sweep["number_of_points"]))
+    return sweep["start_frequency"] * 10 ** (np.arange(nb_steps + 1) / sweep["number_of_points"])
+
+
+def build_deck(circuit, temperature=25., stop_frequency=1e6):
+    deck = SpiceDeck(circuit, temperature=temperature, nominal_temperature=25)
+    deck.ac(start_frequency=1 @ u_Hz, stop_frequency=stop_frequency @ u_Hz, number_of_points=10, variation='dec')
+    return deck
+
+
+class TestSpiceCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.analysis = SpiceAnalysis({"frequency": np.logspace(0, 6, 61), "out": np.linspace(1, 0, 61) + 0j})
+
+    def tearDown(self):
+        spice_simulation.set_spice_cache_directory(spice_simulation.DEFAULT_CACHE_DIRECTORY)
+        self.directory.cleanup()
+
+    def test_deck_key(self):
+        key = SpiceCache.deck_key(build_deck(build_circuit()))
+        self.assertEqual(SpiceCache.deck_key(build_deck(build_circuit())), key)
+        self.assertNotEqual(SpiceCache.deck_key(build_deck(build_circuit(resistance=1000.0001))), key)
+        self.assertNotEqual(SpiceCache.deck_key(build_deck(build_circuit(), temperature=20.)), key)
+        self.assertNotEqual(SpiceCache.deck_key(build_deck(build_circuit(), stop_frequency=1e5)), key)
+
+        # the included files are hashed by content, not by path
+        library = os.path.join(self.directory.name, "uA741.lib")
+        with open(OP_AMP_LIBRARY, "r") as source, open(library, "w") as copy:
+            copy.write(source.read())
+        self.assertEqual(SpiceCache.deck_key(build_deck(build_circuit(library=library))), key)
+        with open(library, "a") as copy:
+            copy.write("* modified model\n")
+        self.assertNotEqual(SpiceCache.deck_key(build_deck(build_circuit(library=library))), key)
+
+    def test_persistence(self):
+        cache = SpiceCache(self.directory.name)
+        self.assertIsNone(cache.get("key"))
+        cache.put("key", self.analysis)
+        self.assertIs(cache.get("key").waveforms, self.analysis.waveforms)
+
+        # a new session reads the analysis from the directory
+        cache = SpiceCache(self.directory.name)
+        analysis = cache.get("key")
+        np.testing.assert_array_equal(analysis.frequency, self.analysis.frequency)
+        np.testing.assert_array_equal(analysis["OUT"], self.analysis.waveforms["out"])
+        self.assertEqual(cache.get_statistics()["disk_hits"], 1)
+
+        cache.clear()
+        self.assertIsNone(SpiceCache(self.directory.name).get("key"))
+
+    def test_disk_budget(self):
+        cache = SpiceCache(self.directory.name, max_disk_bytes=None)
+        cache.put("a", self.analysis)
+        file_size = os.path.getsize(cache.get_path("a"))
+        cache.max_disk_bytes = 2 * file_size
+        cache.put("b", self.analysis)
+        os.utime(cache.get_path("a"), (1, 1))
+        os.utime(cache.get_path("b"), (2, 2))
+
+        # the least recently modified file is removed
+        cache.put("c", self.analysis)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["b.npz", "c.npz"])
+
+        # reading a file from the directory marks it as recently used
+        os.utime(cache.get_path("c"), (3, 3))
+        self.assertIsNotNone(SpiceCache(self.directory.name).get("b"))
+        cache.put("d", self.analysis)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["b.npz", "d.npz"])
+
+    def test_simulate_returns_cached_analysis(self):
+        spice_simulation.set_spice_cache_directory(self.directory.name)
+        cache = spice_simulation.get_spice_cache()
+        circuit = build_circuit()
+        cache.put(cache.deck_key(build_deck(circuit)), self.analysis)
+
+        # ngspice isn't run, it doesn't even need to be installed
+        analysis = simulate(circuit, 'ac', 25., start_frequency=1 @ u_Hz, stop_frequency=1e6 @ u_Hz,
+                            number_of_points=10, variation='dec')
+        np.testing.assert_array_equal(abs(analysis.out), abs(self.analysis.waveforms["out"]))
+        self.assertEqual(cache.get_statistics()["misses"], 0)
+
+
+class TestSpiceSession(unittest.TestCase):
+    def lines(self, deck):
+        return [line.strip() for line in str(deck).splitlines() if line.strip()]
+
+    def test_alterations(self):
+        session = SpiceSession()
+        self.assertIsNone(session.get_alterations(self.lines(build_deck(build_circuit()))))
+
+        session.loaded_lines = self.lines(build_deck(build_circuit()))
+        self.assertEqual(session.get_alterations(self.lines(build_deck(build_circuit()))), {})
+        self.assertEqual(session.get_alterations(self.lines(build_deck(build_circuit(resistance=1500.)))),
+                         {"R1": 1500.})
+        # anything else than a component value needs a new deck
+        self.assertIsNone(session.get_alterations(self.lines(build_deck(build_circuit(), temperature=20.))))
+        self.assertIsNone(session.get_alterations(self.lines(build_deck(build_circuit(), stop_frequency=1e5))))
+        circuit = build_circuit()
+        circuit.R(2, 'out', circuit.gnd, 1e6 @ u_Ω)
+        self.assertIsNone(session.get_alterations(self.lines(build_deck(circuit))))
+
+    def test_parse_spice_number(self):
+        self.assertEqual(parse_spice_number("1.5kOhm"), 1500.)
+        self.assertEqual(parse_spice_number("2MegOhm"), 2e6)
+        self.assertEqual(parse_spice_number("1.2345678901e-10"), 1.2345678901e-10)
+        self.assertAlmostEqual(parse_spice_number("10uF"), 1e-5)
+        self.assertIsNone(parse_spice_number("{R1}"))
+
+    def test_one_session_per_process(self):
+        session = get_session()
+        self.assertIs(get_session(), session)
+        # a pool worker doesn't reuse the session of its parent process
+        spice_simulation._session_pid = -1
+        self.assertIsNot(get_session(), session)
+
+
+class TestFrequencySweep(unittest.TestCase):
+    def setUp(self):
+        parameters = InputParameters({"f_start": 0.1, "f_stop": 100000, "nb_points_per_decade": 100})
+        self.frequency_vector = FrequencyVectorStrategy().calculate({}, parameters)["data"]
+
+    def test_sweep_holds_the_frequency_vector(self):
+        self.assertEqual(get_points_per_decade(self.frequency_vector), 100)
+        sweep = get_frequency_sweep(self.frequency_vector)
+        np.testing.assert_allclose(get_sweep_frequencies(sweep), self.frequency_vector, rtol=1e-12)
+
+        deck = SpiceDeck(build_circuit(), temperature=25., nominal_temperature=25)
+        deck.ac(**sweep)
+        self.assertIn(".ac dec 100 0.1Hz", str(deck))
+
+        values = np.linspace(1, 2, len(self.frequency_vector))
+        self.assertIs(on_frequency_vector(self.frequency_vector, get_sweep_frequencies(sweep), values), values)
+
+    def test_hybrid_sweep_is_interpolated_in_log_log_scale(self):
+        sweep = get_frequency_sweep(self.frequency_vector, 10)
+        frequency = get_sweep_frequencies(sweep)
+        self.assertEqual(len(frequency), 61)
+        self.assertLessEqual(frequency[0], self.frequency_vector[0])
+        self.assertGreaterEqual(frequency[-1], self.frequency_vector[-1])
+        np.testing.assert_allclose(on_frequency_vector(self.frequency_vector, frequency, frequency ** -1.5),
+                                   self.frequency_vector ** -1.5, rtol=1e-9)
+
+    def test_adaptive_frequency_vector(self):
+        frequency_vector = np.union1d(self.frequency_vector, [1234.5])
+        self.assertIsNone(get_points_per_decade(frequency_vector))
+        frequency = get_sweep_frequencies(get_frequency_sweep(frequency_vector))
+        self.assertGreaterEqual(frequency[-1], frequency_vector[-1])
+        self.assertGreaterEqual(len(frequency), len(self.frequency_vector))
+
+
+class DeckBuilt(Exception):
+    """Stops a SPICE strategy once its simulation deck is built, see TestSpiceStrategies"""
+
+
+class TestSpiceStrategies(unittest.TestCase):
+    def build_deck(self, circuit, analysis, temperature, nominal_temperature=25, **analysis_parameters):
+        # same deck as simulate, without running ngspice
+        deck = SpiceDeck(circuit, temperature=temperature, nominal_temperature=nominal_temperature)
+        getattr(CircuitSimulation, analysis)(deck, **analysis_parameters)
+        self.decks.append(str(deck))
+        raise DeckBuilt()
+
+    def test_decks(self):
+        parameters = InputParameters({"f_start": 0.1, "f_stop": 100000, "nb_points_per_decade": 10,
+                                      "spice_points_per_decade": 0, "spice_resistance_test": 1000.,
+                                      "temperature": 300., "R1": 1e3, "R2": 1e4, "R3": 1e4, "R4": 1e3, "R5": 1e4})
+        dependencies = {"frequency_vector": FrequencyVectorStrategy().calculate({}, parameters),
+                        "resistance": {"data": 100.}, "capacitance": {"data": 1e-10}, "inductance": {"data": 1.}}
+        analyses = {"SPICE_test": ".ac dec 10", "SPICE_op_Amp_gain": ".ac dec 10",
+                    "SPICE_op_Amp_noise": ".noise V(out,0) Vinput dec 10", "SPICE_op_Amp_transcient": ".tran",
+                    "SPICE_impedance": ".ac dec 10"}
+        for name, analysis in analyses.items():
+            if not hasattr(SPICE, name):  # not available on Windows
+                continue
+            with self.subTest(name), mock.patch.object(SPICE, "simulate", self.build_deck):
+                self.decks = []
+                self.assertRaises(DeckBuilt, getattr(SPICE, name)().calculate, dependencies, parameters)
+                self.assertEqual(len(self.decks), 1)
+                self.assertIn(analysis, self.decks[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
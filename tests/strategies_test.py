@@ -0,0 +1,113 @@
+import unittest
+
+import numpy as np
+
+from src.controler.controller import CalculationController
+from src.controler.models.scm_fused_noise_model import FUSED_NOISE_STRATEGY_MAP
+from src.model.strategies import backend
+from src.model.strategies.strategy_lib.frequency import AdaptiveFrequencyVectorStrategy
+from tests.engine_test import parameters_dict
+
+
+class TestAdaptiveFrequencyVector(unittest.TestCase):
+    def calculate(self, parameters):
+        controller = CalculationController(dict(parameters))
+        controller.engine.add_or_update_node("frequency_vector", AdaptiveFrequencyVectorStrategy())
+        controller.engine.run_calculations()
+        return controller.get_current_results()
+
+    def test_matches_fine_grid(self):
+        parameters = dict(parameters_dict, nb_points_per_decade=10)
+        results = self.calculate(parameters)
+        fine_results = CalculationController(dict(parameters_dict, nb_points_per_decade=2000)).get_current_results()
+
+        frequency_vector = results["frequency_vector"]["data"]
+        self.assertTrue(np.all(np.diff(frequency_vector) > 0))
+        self.assertLess(len(frequency_vector), len(fine_results["frequency_vector"]["data"]) / 10)
+
+        for node_name in ["impedance", "CLTF", "NEMI"]:
+            data = results[node_name]["data"]
+            fine_data = fine_results[node_name]["data"]
+            interpolated = np.interp(np.log10(fine_data[:, 0]), np.log10(data[:, 0]), np.log10(np.abs(data[:, 1])))
+            np.testing.assert_allclose(interpolated, np.log10(np.abs(fine_data[:, 1])), atol=2e-3, err_msg=node_name)
+
+    def test_contains_resonance_frequency(self):
+        results = self.calculate(dict(parameters_dict, nb_points_per_decade=10))
+        R, L, C = (results[name]["data"] for name in ["resistance", "inductance", "capacitance"])
+        impedance = results["impedance"]["data"]
+        resonance_frequency = impedance[impedance[:, 1].argmax(), 0]
+        omega = 2 * np.pi * resonance_frequency
+        # d|Z|^2/d(omega^2) is null at the resonance
+        x = omega ** 2
+        self.assertAlmostEqual((L ** 4 * C ** 2 * x ** 2 + 2 * L ** 2 * R ** 2 * C ** 2 * x) /
+                               (L ** 2 + 2 * L * C * R ** 2 - R ** 4 * C ** 2), 1)
+
+    def test_batch_mode(self):
+        nb_spire = np.array([8000., 12100.])
+        results = self.calculate(dict(parameters_dict, nb_points_per_decade=10, nb_spire=nb_spire))
+        frequency_vector = results["frequency_vector"]["data"]
+        self.assertEqual(results["impedance"]["data"].shape, (2, len(frequency_vector), 2))
+        for index in range(len(nb_spire)):
+            single = self.calculate(dict(parameters_dict, nb_points_per_decade=10, nb_spire=nb_spire[index]))
+            impedance = single["impedance"]["data"]
+            # The shared grid contains the resonance frequency of each parameter set
+            self.assertIn(impedance[impedance[:, 1].argmax(), 0], frequency_vector)
+
+
+class TestFusedNoiseModel(unittest.TestCase):
+    NOISE_NODES = ["NSD_normalisation", "CLTF", "PSD_R_cr", "PSD_R_Coil", "PSD_e_en", "PSD_e_in", "PSD_Total", "NEMI",
+                   "Display_all_PSD", "Display_all_PSD_filtered"]
+
+    def calculate(self, parameters):
+        controller = CalculationController()
+        controller.swap_strategy_map(FUSED_NOISE_STRATEGY_MAP)
+        controller.update_parameters(dict(parameters))
+        return controller.get_current_results()
+
+    def test_matches_noise_strategies(self):
+        results = self.calculate(parameters_dict)
+        expected_results = CalculationController(dict(parameters_dict)).get_current_results()
+        for node_name in self.NOISE_NODES:
+            self.assertEqual(results[node_name]["labels"], expected_results[node_name]["labels"], node_name)
+            np.testing.assert_allclose(results[node_name]["data"], expected_results[node_name]["data"], rtol=1e-12,
+                                       err_msg=node_name)
+
+    def test_nodes_share_the_noise_model_columns(self):
+        results = self.calculate(parameters_dict)
+        noise_model = results["noise_model"]
+        nemi = noise_model["data"].column(noise_model["labels"].index("NEMI"))
+        self.assertIs(results["NEMI"]["data"].column(1), nemi)
+
+    def test_batch_mode(self):
+        params = dict(parameters_dict, nb_spire=np.array([8000., 12100.]), temperature=np.array([250., 296.]))
+        results = self.calculate(params)
+        expected_results = CalculationController(dict(params)).get_current_results()
+        for node_name in self.NOISE_NODES:
+            np.testing.assert_allclose(results[node_name]["data"], expected_results[node_name]["data"], rtol=1e-12,
+                                       err_msg=node_name)
+
+
+class TestBackend(unittest.TestCase):
+    def tearDown(self):
+        backend.set_backend("numpy")
+
+    def test_numpy_backend(self):
+        a = np.linspace(1, 2, 10)
+        np.testing.assert_array_equal(backend.evaluate("sqrt(a ** 2 + b) / pi", {"a": a, "b": 3.}),
+                                      np.sqrt(a ** 2 + 3.) / np.pi)
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, backend.set_backend, "fortran")
+
+    @unittest.skipUnless("numexpr" in backend.AVAILABLE_BACKENDS, "NumExpr is not installed")
+    def test_numexpr_backend_matches_numpy(self):
+        expected_results = CalculationController(dict(parameters_dict)).get_current_results()
+        backend.set_backend("numexpr")
+        results = CalculationController(dict(parameters_dict)).get_current_results()
+        for node_name in ["impedance", "NSD_normalisation", "CLTF", "PSD_e_in", "NEMI"]:
+            np.testing.assert_array_equal(results[node_name]["data"], expected_results[node_name]["data"],
+                                          err_msg=node_name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.controler.controller import CalculationController
+from src.model.result_writer import load_results
+from src.model.sweep import load_parameters, generate_designs, run_sweep
+
+PARAMETERS_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "default.json")
+
+
+class TestGenerateDesigns(unittest.TestCase):
+    def setUp(self):
+        self.parameters, self.attributes = load_parameters(PARAMETERS_FILE)
+
+    def test_load_parameters_converts_units(self):
+        self.assertAlmostEqual(self.parameters["len_coil"], self.attributes["len_coil"]["default"] * 1e-3)
+        self.assertNotIn("SPICE_circuit", self.parameters)
+
+    def test_grid(self):
+        sweep = {"method": "grid", "parameters": {"nb_spire": {"min": 8000, "max": 12000, "nb_points": 3},
+                                                  "len_coil": {"values": [100, 200]}}}
+        designs = generate_designs(sweep, self.attributes)
+        self.assertEqual(len(designs["nb_spire"]), 6)
+        np.testing.assert_allclose(sorted(set(designs["len_coil"])), [0.1, 0.2])
+
+    def test_sampling_methods(self):
+        for method in ["latin_hypercube", "sobol"]:
+            sweep = {"method": method, "nb_samples": 64, "seed": 0,
+                     "parameters": {"nb_spire": {"min": 8000, "max": 12000},
+                                    "capa_tuning": {"min": 1, "max": 1000, "log": True}}}
+            designs = generate_designs(sweep, self.attributes)
+            self.assertEqual(len(designs["nb_spire"]), 64)
+            self.assertTrue(np.all((designs["nb_spire"] >= 8000) & (designs["nb_spire"] <= 12000)), method)
+            self.assertTrue(np.all((designs["capa_tuning"] >= 1e-12) & (designs["capa_tuning"] <= 1e-9)), method)
+
+    def test_unknown_method_or_parameter(self):
+        self.assertRaises(ValueError, generate_designs, {"method": "random", "parameters": {}}, self.attributes)
+        self.assertRaises(ValueError, generate_designs, {"parameters": {"foo": {"values": [1]}}}, self.attributes)
+
+
+class TestRunSweep(unittest.TestCase):
+    def setUp(self):
+        self.parameters, attributes = load_parameters(PARAMETERS_FILE)
+        self.parameters["nb_points_per_decade"] = 20
+        sweep = {"method": "grid", "parameters": {"nb_spire": {"min": 8000, "max": 12000, "nb_points": 3},
+                                                  "len_coil": {"values": [100, 200]}}}
+        self.designs = generate_designs(sweep, attributes)
+        self.output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.output_dir.cleanup()
+
+    def test_results_match_single_evaluation(self):
+        path = os.path.join(self.output_dir.name, "sweep.h5")
+        nb_designs = run_sweep(self.parameters, self.designs, path, outputs=["inductance", "NEMI"], chunk_size=4,
+                               sweep={"method": "grid"})
+        self.assertEqual(nb_designs, 6)
+
+        results = load_results(path, rows=slice(4, 6))
+        self.assertEqual(results["attributes"]["sweep"], {"method": "grid"})
+        nemi = results["outputs"]["NEMI"]
+        self.assertEqual(nemi["labels"], ["Frequency", "NEMI", "NEMI_filtered"])
+        self.assertEqual(nemi["data"].shape, (2, len(results["frequency_vector"]), 2))
+
+        params = dict(self.parameters, nb_spire=results["values"]["nb_spire"][1],
+                      len_coil=results["values"]["len_coil"][1])
+        expected_results = CalculationController(params).get_current_results()
+        self.assertAlmostEqual(results["outputs"]["inductance"]["data"][1], expected_results["inductance"]["data"])
+        np.testing.assert_allclose(nemi["data"][1], np.asarray(expected_results["NEMI"]["data"])[:, 1:])
+
+    def test_process_pool(self):
+        serial_path = os.path.join(self.output_dir.name, "serial.h5")
+        pool_path = os.path.join(self.output_dir.name, "pool.h5")
+        run_sweep(self.parameters, self.designs, serial_path, outputs=["impedance"], chunk_size=4)
+        run_sweep(self.parameters, self.designs, pool_path, outputs=["impedance"], chunk_size=4, n_workers=2)
+        np.testing.assert_array_equal(load_results(serial_path)["outputs"]["impedance"]["data"],
+                                      load_results(pool_path)["outputs"]["impedance"]["data"])
+
+if __name__ == '__main__':
+    unittest.main()